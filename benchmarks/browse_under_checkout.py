@@ -0,0 +1,164 @@
+"""Browse latency while several tills check out concurrently, before and after the WAL storage profile.
+
+"before" reproduces the original access pattern: a fresh rollback-journal
+connection per call (Python's default 5s lock timeout) and each write committing on its own.
+"after" goes through Database, i.e. the pooled WAL connections and the
+group-committing writer thread.
+
+    python -m benchmarks.browse_under_checkout --products 5000 --tills 4 --seconds 5
+"""
+import argparse
+import contextlib
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from utils.database import Database
+
+SOURCE_DB = Database.DB_PATH
+BRANCH_ID = 1
+
+
+def prepare_database(path, products):
+    shutil.copy(SOURCE_DB, path)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = DELETE")
+    start_id = conn.execute("SELECT COALESCE(MAX(ProductID), 0) + 1 FROM Products").fetchone()[0]
+    category_id = conn.execute("SELECT MIN(CategoryID) FROM Categories").fetchone()[0]
+    ids = range(start_id, start_id + products)
+    conn.executemany(
+        "INSERT INTO Products (ProductID, ProductName, CategoryID, Price) VALUES (?, ?, ?, ?)",
+        ((i, f"Bench product {i}", category_id, 1.0 + i % 50) for i in ids),
+    )
+    conn.executemany(
+        "INSERT INTO BranchStock (BranchID, ProductID, StockQuantity) VALUES (?, ?, ?)",
+        ((BRANCH_ID, i, 1_000_000) for i in ids),
+    )
+    customer_id = conn.execute("SELECT MIN(CustomerID) FROM Customers").fetchone()[0]
+    conn.commit()
+    conn.close()
+    return list(ids), customer_id
+
+
+def legacy_connect(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def legacy_browse(path):
+    conn = legacy_connect(path)
+    try:
+        conn.execute("""
+            SELECT p.ProductID, p.ProductName, bs.StockQuantity, p.Price, p.CategoryID, p.ProductImage
+            FROM Products p
+            JOIN BranchStock bs ON p.ProductID = bs.ProductID
+            WHERE bs.BranchID = ? AND bs.StockQuantity > 0 AND p.ProductName LIKE ?
+        """, (BRANCH_ID, "%product 1%")).fetchall()
+    finally:
+        conn.close()
+
+
+def legacy_checkout(path, customer_id, product_id):
+    conn = legacy_connect(path)
+    try:
+        conn.execute(
+            "UPDATE BranchStock SET StockQuantity = StockQuantity + ? WHERE BranchID = ? AND ProductID = ?",
+            (-1, BRANCH_ID, product_id),
+        )
+        conn.commit()
+        cursor = conn.execute("INSERT INTO Orders (CustomerID, OrderDate) VALUES (?, DATE('now'))", (customer_id,))
+        conn.execute(
+            "INSERT INTO CustomerOrders (OrderID, ProductID, OrderQuantity) VALUES (?, ?, ?)",
+            (cursor.lastrowid, product_id, 1),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def database_browse(path):
+    Database.fetch_available_products(BRANCH_ID, search="product 1")
+
+
+def database_checkout(path, customer_id, product_id):
+    Database.adjust_stock_quantity(BRANCH_ID, product_id, -1)
+    Database.add_customer_order(customer_id, {product_id: {"quantity": 1, "branch": BRANCH_ID}})
+
+
+def run(label, path, product_ids, customer_id, tills, seconds, browse, checkout):
+    stop = threading.Event()
+    errors = {"browse": 0, "checkout": 0}
+    checkouts = [0]
+    lock = threading.Lock()
+
+    def till(offset):
+        i = offset
+        while not stop.is_set():
+            try:
+                checkout(path, customer_id, product_ids[i % len(product_ids)])
+                with lock:
+                    checkouts[0] += 1
+            except sqlite3.Error:
+                with lock:
+                    errors["checkout"] += 1
+            i += tills
+
+    latencies = []
+    # Database's write paths print debug lines on every call; keep them out of the report.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        threads = [threading.Thread(target=till, args=(n,)) for n in range(tills)]
+        for thread in threads:
+            thread.start()
+
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                browse(path)
+                latencies.append(time.perf_counter() - start)
+            except sqlite3.Error:
+                errors["browse"] += 1
+
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    latencies.sort()
+    if latencies:
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        mean = statistics.fmean(latencies) * 1000
+    else:
+        p50 = p99 = mean = float("nan")
+    print(
+        f"{label:>7}: browses={len(latencies):6d} mean={mean:7.2f}ms p50={p50:7.2f}ms p99={p99:7.2f}ms "
+        f"checkouts={checkouts[0]:6d} browse_errors={errors['browse']} checkout_errors={errors['checkout']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--tills", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before_path = os.path.join(tmp, "before.db")
+        product_ids, customer_id = prepare_database(before_path, args.products)
+        run("before", before_path, product_ids, customer_id, args.tills, args.seconds, legacy_browse, legacy_checkout)
+
+        after_path = os.path.join(tmp, "after.db")
+        prepare_database(after_path, args.products)
+        Database.DB_PATH = after_path
+        run("after", after_path, product_ids, customer_id, args.tills, args.seconds, database_browse, database_checkout)
+        Database.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Sustained checkouts per second across parallel tills, per-row checkout versus the set-based engine.
+
+"per-row" reproduces the previous checkout: stock taken line by line through the writer, then the
+Orders row and one CustomerOrders insert per line, each insert firing BeforeInsertCustomerOrder
+(recreated on this copy of the database).
+"set-based" calls Database.checkout, which takes stock for every line with one statement and
+inserts the lines with executemany.
+
+Every till checks out baskets of --lines random products for --seconds; afterwards the stock taken
+is compared with the quantities ordered.
+
+    python -m benchmarks.checkout_throughput --tills 4 --lines 5 --seconds 5
+"""
+import argparse
+import contextlib
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from utils.database import Database
+
+SOURCE_DB = Database.DB_PATH
+BRANCH_ID = 1
+START_STOCK = 1_000_000
+
+LEGACY_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS BeforeInsertCustomerOrder
+    BEFORE INSERT ON CustomerOrders
+    FOR EACH ROW
+    BEGIN
+        SELECT CASE
+            WHEN (SELECT StockQuantity
+                  FROM BranchStock
+                  WHERE BranchID = (SELECT BranchID FROM Orders WHERE OrderID = NEW.OrderID)
+                    AND ProductID = NEW.ProductID) < NEW.OrderQuantity
+            THEN
+                RAISE(ABORT, 'Insufficient stock for the requested order')
+        END;
+    END
+"""
+
+
+def prepare_database(path, products):
+    shutil.copy(SOURCE_DB, path)
+    conn = sqlite3.connect(path)
+    start_id = conn.execute("SELECT COALESCE(MAX(ProductID), 0) + 1 FROM Products").fetchone()[0]
+    category_id = conn.execute("SELECT MIN(CategoryID) FROM Categories").fetchone()[0]
+    ids = range(start_id, start_id + products)
+    conn.executemany(
+        "INSERT INTO Products (ProductID, ProductName, CategoryID, Price) VALUES (?, ?, ?, ?)",
+        ((i, f"Bench product {i}", category_id, 1.0) for i in ids),
+    )
+    conn.executemany(
+        "INSERT INTO BranchStock (BranchID, ProductID, StockQuantity) VALUES (?, ?, ?)",
+        ((BRANCH_ID, i, START_STOCK) for i in ids),
+    )
+    customer_id = conn.execute("SELECT MIN(CustomerID) FROM Customers").fetchone()[0]
+    conn.commit()
+    conn.close()
+    return list(ids), customer_id
+
+
+def per_row_checkout(customer_id, lines):
+    for branch_id, product_id, quantity in lines:
+        if Database.reserve_stock(branch_id, product_id, quantity) is None:
+            raise ValueError("Insufficient stock.")
+
+    def write(cursor):
+        cursor.execute("INSERT INTO Orders (CustomerID, OrderDate) VALUES (?, DATE('now'))", (customer_id,))
+        order_id = cursor.lastrowid
+        for _, product_id, quantity in lines:
+            cursor.execute(
+                "INSERT INTO CustomerOrders (OrderID, ProductID, OrderQuantity) VALUES (?, ?, ?)",
+                (order_id, product_id, quantity),
+            )
+        return order_id
+
+    return Database.writer().execute(write)
+
+
+def set_based_checkout(customer_id, lines):
+    result = Database.checkout(customer_id, lines)
+    if result["OrderID"] is None:
+        raise ValueError("Insufficient stock.")
+    return result["OrderID"]
+
+
+def run(label, path, product_ids, customer_id, tills, lines, seconds, checkout, legacy_trigger):
+    Database.DB_PATH = path
+    conn = Database.connect()
+    try:
+        if legacy_trigger:
+            conn.execute(LEGACY_TRIGGER)
+            conn.commit()
+        first_order = conn.execute("SELECT COALESCE(MAX(OrderID), 0) FROM Orders").fetchone()[0]
+    finally:
+        conn.close()
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies = []
+    errors = [0]
+
+    def till(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            basket = [(BRANCH_ID, product_id, rng.randint(1, 3)) for product_id in rng.sample(product_ids, lines)]
+            start = time.perf_counter()
+            try:
+                checkout(customer_id, basket)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+            except (sqlite3.Error, ValueError):
+                with lock:
+                    errors[0] += 1
+
+    # Database's write paths print debug lines on every call; keep them out of the report.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        threads = [threading.Thread(target=till, args=(n,)) for n in range(tills)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+    conn = Database.connect()
+    try:
+        taken = conn.execute(
+            "SELECT SUM(? - StockQuantity) FROM BranchStock WHERE BranchID = ? AND ProductID >= ?",
+            (START_STOCK, BRANCH_ID, product_ids[0]),
+        ).fetchone()[0]
+        ordered = conn.execute(
+            "SELECT COALESCE(SUM(OrderQuantity), 0) FROM CustomerOrders WHERE OrderID > ?", (first_order,)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    Database.close_pool()
+
+    latencies.sort()
+    count = len(latencies)
+    p50 = latencies[count // 2] * 1000 if count else float("nan")
+    p99 = latencies[min(count - 1, int(count * 0.99))] * 1000 if count else float("nan")
+    mean = statistics.fmean(latencies) * 1000 if count else float("nan")
+    print(
+        f"{label:>9}: checkouts={count:6d} ({count / elapsed:8.1f}/s) mean={mean:6.2f}ms p50={p50:6.2f}ms "
+        f"p99={p99:6.2f}ms errors={errors[0]} stock_taken={taken} units_ordered={ordered}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--tills", type=int, default=4)
+    parser.add_argument("--lines", type=int, default=5)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, checkout, legacy_trigger in (("per-row", per_row_checkout, True),
+                                                ("set-based", set_based_checkout, False)):
+            path = os.path.join(tmp, f"{label}.db")
+            product_ids, customer_id = prepare_database(path, args.products)
+            run(label, path, product_ids, customer_id, args.tills, args.lines, args.seconds, checkout,
+                legacy_trigger)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""File size and throughput of each export format, per table: XML, CSV, JSON Lines and columnar.
+
+    python -m benchmarks.formats --scale 0.1 [--compression none gz bz2 xz] [--tables Orders Products] [--import]
+
+Every table of a generated dataset (or --dataset) is exported in every format and compression,
+then read back in full; --import also times importing it into an emptied copy of the table. Sizes
+are also shown relative to uncompressed XML, the format XMLUtils has always written.
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.suite import ensure_dataset
+from custom_xml_utils.formats import FORMATS, export_table, import_table
+from custom_xml_utils.snapshot import snapshot_tables
+from custom_xml_utils.xml_utils import COMPRESSORS, open_compressed
+from utils.database import Database
+
+COMPRESSIONS = ["none"] + [extension.lstrip(".") for extension in COMPRESSORS]
+
+
+def read_all(path, codec):
+    with open_compressed(path) as file:
+        _, records = codec.read(file)
+        return sum(1 for _ in records)
+
+
+def empty_table(db_path, table):
+    conn = sqlite3.connect(db_path)
+    try:
+        # Foreign keys off, so emptying a parent table does not cascade into the tables that refer to it.
+        conn.execute("PRAGMA foreign_keys = OFF")
+        conn.execute(f"DELETE FROM {table}")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def measure(db_path, workdir, table, format, compression, with_import):
+    codec = FORMATS[format]
+    path = os.path.join(workdir, table + codec.extension + ("" if compression == "none" else "." + compression))
+    start = time.perf_counter()
+    rows = export_table(table, path)
+    export_s = time.perf_counter() - start
+    start = time.perf_counter()
+    read_rows = read_all(path, codec)
+    read_s = time.perf_counter() - start
+    result = {
+        "rows": rows,
+        "bytes": os.path.getsize(path),
+        "export_rows_per_s": rows / export_s if export_s else 0.0,
+        "read_rows_per_s": read_rows / read_s if read_s else 0.0,
+    }
+    if with_import:
+        empty_table(db_path, table)
+        start = time.perf_counter()
+        import_table(path)
+        import_s = time.perf_counter() - start
+        result["import_rows_per_s"] = rows / import_s if import_s else 0.0
+    os.remove(path)
+    return result
+
+
+def run(dataset, tables, formats, compressions, with_import):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, "formats.db")
+        shutil.copy(dataset, db_path)
+        Database.DB_PATH = db_path
+        for table in tables or snapshot_tables(db_path):
+            for format in formats:
+                for compression in compressions:
+                    results[f"{table} {format} {compression}"] = measure(
+                        db_path, workdir, table, format, compression, with_import
+                    )
+        Database.close_pool()
+    return results
+
+
+def print_results(results, with_import):
+    print(f"{'table':18} {'format':9} {'comp':5} {'rows':>8} {'KB':>10} {'vs xml':>7} {'export r/s':>11} "
+          f"{'read r/s':>11}" + (f" {'import r/s':>11}" if with_import else ""))
+    for key, row in results.items():
+        table, format, compression = key.split(" ")
+        xml = results.get(f"{table} xml none")
+        ratio = f"{row['bytes'] / xml['bytes']:7.1%}" if xml and xml["bytes"] else f"{'':7}"
+        line = (f"{table:18} {format:9} {compression:5} {row['rows']:8d} {row['bytes'] / 1024:10.1f} {ratio} "
+                f"{row['export_rows_per_s']:11.0f} {row['read_rows_per_s']:11.0f}")
+        if with_import:
+            line += f" {row['import_rows_per_s']:11.0f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dataset", help="Database to export (default: one generated at --scale).")
+    parser.add_argument("--scale", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--data-dir", help="Keep generated datasets here and reuse them on later runs.")
+    parser.add_argument("--tables", nargs="+", help="Tables to export (default: all).")
+    parser.add_argument("--formats", nargs="+", choices=sorted(FORMATS), default=list(FORMATS))
+    parser.add_argument("--compression", nargs="+", choices=COMPRESSIONS, default=["none", "gz"])
+    parser.add_argument("--import", dest="with_import", action="store_true", help="Also time importing each file.")
+    parser.add_argument("--out", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = args.dataset or ensure_dataset(args.data_dir or tmp, args.scale, args.seed)
+        results = run(dataset, args.tables, args.formats, args.compression, args.with_import)
+    print_results(results, args.with_import)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Builds a synthetic autodatabase at a chosen scale factor, deterministic from a seed.
+
+    python -m benchmarks.generate_dataset --scale 10 --seed 1 --out /tmp/autodatabase_sf10.db
+
+The tables, indexes, views and triggers are copied from the shipped database and the Database
+migrations are then applied, so the result has exactly the schema the application runs against.
+Rows per scale factor (1.0) are in SCALE_ROWS; orders are spread over --years up to --end-date.
+
+Product images reuse the shipped image BLOBs, so sizes are realistic and the thumbnail code can
+decode them. Hashing a password takes ~100 ms, so customers and staff share PASSWORD_COUNT hashes:
+the password of customer or employee N is "password{N % PASSWORD_COUNT}".
+"""
+import argparse
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from utils.database import Database
+from utils.encryption import hash_password
+from utils.migrations import migrate
+
+SOURCE_DB = Database.DB_PATH
+PASSWORD_COUNT = 8
+BATCH_SIZE = 50_000
+
+SCALE_ROWS = {
+    "branches": 10,
+    "suppliers": 20,
+    "products": 2_000,
+    "customers": 5_000,
+    "employees_per_branch": 15,
+    "orders_per_customer": 6,
+    "branch_orders_per_branch_per_year": 150,
+}
+
+# Reference tables keep their shipped rows; the views and the discount logic depend on their ids.
+COPIED_TABLES = ("MembershipLevels", "JobRoles", "Categories")
+GENERATED_TABLES = ("Branches", "Suppliers", "Products", "SupplierProducts", "BranchStock", "Employees",
+                    "Customers", "Orders", "CustomerOrders", "BranchOrders")
+
+FIRST_NAMES = ("Oliver", "Amelia", "George", "Isla", "Harry", "Ava", "Noah", "Mia", "Jack", "Ivy", "Leo", "Grace",
+               "Arthur", "Freya", "Oscar", "Lily", "Charlie", "Emily", "Jacob", "Sophia", "Thomas", "Ella")
+SURNAMES = ("Smith", "Jones", "Taylor", "Brown", "Williams", "Wilson", "Johnson", "Davies", "Patel", "Wright",
+            "Robinson", "Thompson", "Evans", "Walker", "White", "Roberts", "Green", "Hall", "Wood", "Jackson")
+TOWNS = ("Birmingham", "London", "Manchester", "Glasgow", "Edinburgh", "Liverpool", "Leeds", "Bristol",
+         "Sheffield", "Newcastle upon Tyne", "Hereford", "Cardiff", "Belfast", "Nottingham", "Leicester",
+         "Coventry", "Bradford", "Plymouth", "Derby", "Southampton", "Portsmouth", "York", "Exeter", "Bath")
+PART_ADJECTIVES = ("Premium", "Heavy Duty", "Sport", "Economy", "Performance", "All-Weather", "Ceramic",
+                   "Universal", "Compact", "Pro", "Classic", "Long Life")
+PART_NOUNS = ("Brake Pads", "Brake Rotors", "Oil Filter", "Air Filter", "Spark Plugs", "Car Battery",
+              "Wiper Blades", "Headlight Bulb", "Floor Mats", "Car Cover", "Amplifier", "Speaker Set",
+              "Subwoofer", "Dashboard Camera", "Engine Oil 5L", "Coolant", "Wheel Bearings", "Fuel Pump",
+              "Alternator", "Timing Belt", "Radiator", "Clutch Kit", "Shock Absorber", "Tyre Inflator")
+SUPPLIER_WORDS = ("Auto", "Car", "Motor", "Parts", "Drive", "Torque", "Gear", "Road", "Spark", "Piston")
+
+
+def counts_for(scale, years):
+    branches = max(1, round(SCALE_ROWS["branches"] * scale))
+    customers = max(1, round(SCALE_ROWS["customers"] * scale))
+    return {
+        "branches": branches,
+        "suppliers": max(1, round(SCALE_ROWS["suppliers"] * scale)),
+        "products": max(1, round(SCALE_ROWS["products"] * scale)),
+        "customers": customers,
+        "employees": branches * SCALE_ROWS["employees_per_branch"],
+        "orders": round(customers * SCALE_ROWS["orders_per_customer"] * years / 3),
+        "branch_orders": round(branches * SCALE_ROWS["branch_orders_per_branch_per_year"] * years),
+    }
+
+
+def rng_for(seed, table):
+    # One stream per table, so changing one table's size does not reshuffle the others.
+    return random.Random(f"{seed}:{table}")
+
+
+def copy_schema(source, target):
+    """Creates the shipped tables in target and returns the index/view/trigger DDL to run after loading."""
+    objects = source.execute("""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+        ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 WHEN 'view' THEN 2 ELSE 3 END, rowid
+    """).fetchall()
+    deferred = []
+    for kind, name, sql in objects:
+        if kind == "table":
+            target.execute(sql)
+        else:
+            deferred.append(sql)
+    return deferred
+
+
+def bulk_insert(conn, table, columns, rows):
+    statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            conn.executemany(statement, batch)
+            total += len(batch)
+            batch.clear()
+    if batch:
+        conn.executemany(statement, batch)
+        total += len(batch)
+    return total
+
+
+def generate(out, scale=1.0, seed=1, years=3, end_date=date(2025, 1, 31), image_fraction=0.4, source_db=SOURCE_DB,
+             verbose=True):
+    counts = counts_for(scale, years)
+    if os.path.exists(out):
+        os.remove(out)
+
+    source = sqlite3.connect(f"file:{source_db}?mode=ro", uri=True)
+    conn = sqlite3.connect(out, isolation_level=None)
+    # Nothing to protect while the file is being built; the application's pragmas apply on next open.
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+
+    def log(message):
+        if verbose:
+            print(message)
+
+    started = time.perf_counter()
+    deferred = copy_schema(source, conn)
+    conn.execute("BEGIN")
+
+    reference = {}
+    for table in COPIED_TABLES:
+        rows = source.execute(f"SELECT * FROM {table}").fetchall()
+        columns = [column[1] for column in source.execute(f"PRAGMA table_info({table})")]
+        bulk_insert(conn, table, columns, rows)
+        reference[table] = [row[0] for row in rows]
+    images = [row[0] for row in source.execute("SELECT ProductImage FROM Products WHERE ProductImage IS NOT NULL")]
+    source.close()
+
+    rng = rng_for(seed, "passwords")
+    passwords = [hash_password(f"password{n}", salt=rng.randbytes(16)) for n in range(PASSWORD_COUNT)]
+
+    branch_ids = range(1, counts["branches"] + 1)
+    bulk_insert(conn, "Branches", ("BranchID", "Location"), (
+        (i, TOWNS[(i - 1) % len(TOWNS)] + ("" if i <= len(TOWNS) else f" {(i - 1) // len(TOWNS) + 1}"))
+        for i in branch_ids
+    ))
+
+    rng = rng_for(seed, "suppliers")
+    supplier_ids = range(1, counts["suppliers"] + 1)
+
+    def suppliers():
+        for i in supplier_ids:
+            name = f"{rng.choice(SUPPLIER_WORDS)}{rng.choice(SUPPLIER_WORDS)} {i}"
+            yield i, name, f"sales{i}@{name.split()[0].lower()}.example.com"
+    bulk_insert(conn, "Suppliers", ("SupplierID", "SupplierName", "ContactDetails"), suppliers())
+
+    rng = rng_for(seed, "products")
+    product_ids = range(1, counts["products"] + 1)
+    prices = {}
+
+    def products():
+        for i in product_ids:
+            price = round(rng.lognormvariate(3.6, 0.9), 2) + 0.99
+            prices[i] = price
+            image = images[rng.randrange(len(images))] if images and rng.random() < image_fraction else None
+            yield (i, f"{rng.choice(PART_ADJECTIVES)} {rng.choice(PART_NOUNS)} {i}",
+                   rng.choice(reference["Categories"]), price, image)
+    bulk_insert(conn, "Products", ("ProductID", "ProductName", "CategoryID", "Price", "ProductImage"), products())
+    log(f"products: {counts['products']} ({time.perf_counter() - started:.1f}s)")
+
+    rng = rng_for(seed, "supplier_products")
+    supplied_by = {}
+
+    def supplier_products():
+        for product_id in product_ids:
+            chosen = rng.sample(supplier_ids, min(len(supplier_ids), rng.randint(1, 3)))
+            supplied_by[product_id] = chosen
+            for supplier_id in chosen:
+                yield supplier_id, product_id
+    bulk_insert(conn, "SupplierProducts", ("SupplierID", "ProductID"), supplier_products())
+
+    rng = rng_for(seed, "branch_stock")
+    stocked = {}
+
+    def branch_stock():
+        for branch_id in branch_ids:
+            stocked[branch_id] = [product_id for product_id in product_ids if rng.random() < 0.6] or [1]
+            for product_id in stocked[branch_id]:
+                yield branch_id, product_id, rng.choice((0, 0, 1, 2, 5)) if rng.random() < 0.1 else rng.randint(5, 200)
+    bulk_insert(conn, "BranchStock", ("BranchID", "ProductID", "StockQuantity"), branch_stock())
+
+    rng = rng_for(seed, "employees")
+
+    def employees():
+        for i in range(1, counts["employees"] + 1):
+            branch_id = (i - 1) // SCALE_ROWS["employees_per_branch"] + 1
+            role = reference["JobRoles"][0] if (i - 1) % SCALE_ROWS["employees_per_branch"] == 0 \
+                else rng.choice(reference["JobRoles"])
+            yield (i, rng.choice(FIRST_NAMES), rng.choice(SURNAMES), f"07{i:09d}", branch_id, role,
+                   passwords[i % PASSWORD_COUNT])
+    bulk_insert(conn, "Employees",
+                ("EmployeeID", "FirstName", "Surname", "ContactNumber", "BranchID", "JobRoleID", "Password"),
+                employees())
+
+    rng = rng_for(seed, "customers")
+    home_branch = {}
+
+    def customers():
+        for i in range(1, counts["customers"] + 1):
+            first, surname = rng.choice(FIRST_NAMES), rng.choice(SURNAMES)
+            home_branch[i] = rng.choice(branch_ids)
+            yield (i, first, surname, f"01{rng.randrange(10 ** 9):09d}", rng.choice(reference["MembershipLevels"]),
+                   f"{first.lower()}.{surname.lower()}{i}@example.com", passwords[i % PASSWORD_COUNT], home_branch[i])
+    bulk_insert(conn, "Customers",
+                ("CustomerID", "FirstName", "Surname", "ContactNumber", "MembershipLevelID", "Email", "Password",
+                 "BranchID"), customers())
+    log(f"customers: {counts['customers']} ({time.perf_counter() - started:.1f}s)")
+
+    days = years * 365
+    first_day = end_date - timedelta(days=days - 1)
+    rng = rng_for(seed, "orders")
+    order_lines = []
+
+    def orders():
+        for order_id in range(1, counts["orders"] + 1):
+            customer_id = rng.randint(1, counts["customers"])
+            order_date = first_day + timedelta(days=rng.randrange(days))
+            branch_products = stocked[home_branch[customer_id]]
+            for product_id in rng.sample(branch_products, min(len(branch_products), rng.randint(1, 5))):
+                order_lines.append((order_id, product_id, rng.randint(1, 4)))
+            yield order_id, customer_id, order_date.isoformat()
+    bulk_insert(conn, "Orders", ("OrderID", "CustomerID", "OrderDate"), orders())
+    bulk_insert(conn, "CustomerOrders", ("OrderID", "ProductID", "OrderQuantity"), order_lines)
+    log(f"orders: {counts['orders']} with {len(order_lines)} lines ({time.perf_counter() - started:.1f}s)")
+    order_lines.clear()
+
+    rng = rng_for(seed, "branch_orders")
+
+    def branch_orders():
+        for order_id in range(1, counts["branch_orders"] + 1):
+            product_id = rng.choice(product_ids)
+            yield (order_id, rng.choice(branch_ids), rng.choice(supplied_by[product_id]), product_id,
+                   rng.randint(5, 50), (first_day + timedelta(days=rng.randrange(days))).isoformat())
+    bulk_insert(conn, "BranchOrders",
+                ("OrderID", "BranchID", "SupplierID", "ProductID", "OrderQuantity", "OrderDate"), branch_orders())
+    conn.execute("COMMIT")
+
+    # Indexes and triggers are built once over the loaded tables instead of row by row.
+    for sql in deferred:
+        conn.execute(sql)
+    migrate(conn)
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.close()
+
+    log(f"built {out} at scale {scale} in {time.perf_counter() - started:.1f}s "
+        f"({os.path.getsize(out) / 1024 / 1024:.1f} MB)")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date(2025, 1, 31))
+    parser.add_argument("--image-fraction", type=float, default=0.4, help="Share of products with an image.")
+    args = parser.parse_args()
+    generate(args.out, args.scale, args.seed, args.years, args.end_date, args.image_fraction)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""Simulates many tills and staff terminals sharing one database file through the real Database API.
+
+    python -m benchmarks.load_simulator --customers 8 --staff 2 --seconds 30 [--mode processes]
+
+Customers log in, browse their branch with random filters, reserve stock for a few products (as
+the browse page does), then either check out or log out and have the reservation released. Staff
+log in once, then page through inventory, place supplier orders and edit product prices.
+
+--mode threads runs everyone in this process on one connection pool and writer, like a single
+till application; --mode processes gives every simulated user its own process, pool and writer,
+so they contend for the file's write lock the way separate terminals do.
+
+Runs use a copy of --dataset, or of a dataset generated at --scale, which must come from
+benchmarks.generate_dataset since customers and staff log in with its known passwords. At the end the
+report shows throughput and latency per operation, how many calls failed with SQLITE_BUSY or
+SQLITE_LOCKED, and stock-consistency violations: stock rows that differ from what the successful
+reservations, releases and supplier orders account for, negative stock, and ordered units that do
+not match the units checked out. The exit status is 1 when a violation is found.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from benchmarks.generate_dataset import PASSWORD_COUNT, generate
+from utils.database import Database
+from utils.instrumentation import LatencyStats
+
+CUSTOMER_OPERATIONS = ("login", "browse", "reserve", "checkout", "logout")
+STAFF_OPERATIONS = ("staff_login", "inventory", "supplier_order", "edit_product")
+
+
+def lock_error(error):
+    """"busy" or "locked" when error (or the sqlite3 error it wraps) is SQLITE_BUSY/SQLITE_LOCKED, else None."""
+    while error is not None:
+        name = getattr(error, "sqlite_errorname", None)
+        if name:
+            if name.startswith("SQLITE_BUSY"):
+                return "busy"
+            if name.startswith("SQLITE_LOCKED"):
+                return "locked"
+        message = str(error)
+        if "database table is locked" in message:
+            return "locked"
+        if "database is locked" in message or "database is busy" in message:
+            return "busy"
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def load_fixtures(path, customers):
+    """Credentials, products and supplier pairs the simulated users pick from."""
+    conn = sqlite3.connect(path)
+    try:
+        logins = [(email, f"password{customer_id % PASSWORD_COUNT}") for customer_id, email in conn.execute(
+            "SELECT CustomerID, Email FROM Customers ORDER BY random() LIMIT ?", (max(100, customers * 10),)
+        )]
+        staff_logins = [(employee_id, f"password{employee_id % PASSWORD_COUNT}")
+                        for (employee_id,) in conn.execute("SELECT EmployeeID FROM Employees")]
+        return {
+            "logins": logins,
+            "staff_logins": staff_logins,
+            "branches": [row[0] for row in conn.execute("SELECT BranchID FROM Branches")],
+            "categories": [row[0] for row in conn.execute("SELECT CategoryID FROM Categories")],
+            "products": dict(conn.execute("SELECT ProductID, CategoryID FROM Products")),
+            "supplier_products": conn.execute("SELECT SupplierID, ProductID FROM SupplierProducts").fetchall(),
+        }
+    finally:
+        conn.close()
+
+
+def stock_snapshot(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {(branch_id, product_id): quantity for branch_id, product_id, quantity in conn.execute(
+            "SELECT BranchID, ProductID, StockQuantity FROM BranchStock"
+        )}
+    finally:
+        conn.close()
+
+
+class Session:
+    """One simulated user's measurements, and the stock changes its successful calls account for."""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.lock_errors = Counter()
+        self.outcomes = Counter()
+        self.stock_changes = Counter()
+        self.ordered_units = 0
+        self.last_error = None
+        self.employee = None
+
+    def call(self, operation, fn, *args, **kwargs):
+        """Runs and times one API call; returns (ok, result)."""
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.latencies[operation].append(time.perf_counter() - start)
+            self.errors[operation] += 1
+            kind = lock_error(e)
+            if kind:
+                self.lock_errors[kind] += 1
+            self.last_error = f"{operation}: {type(e).__name__}: {e}"
+            return False, None
+        self.latencies[operation].append(time.perf_counter() - start)
+        return True, result
+
+    def as_dict(self):
+        return {
+            "latencies": dict(self.latencies),
+            "errors": dict(self.errors),
+            "lock_errors": dict(self.lock_errors),
+            "outcomes": dict(self.outcomes),
+            # Tuple keys do not survive JSON; a list of rows travels between processes just as well.
+            "stock_changes": [(branch_id, product_id, change)
+                              for (branch_id, product_id), change in self.stock_changes.items() if change],
+            "ordered_units": self.ordered_units,
+            "last_error": self.last_error,
+        }
+
+
+def customer_session(session, fixtures, think):
+    rng = session.rng
+    email, password = rng.choice(fixtures["logins"])
+    ok, customer = session.call("login", Database.authenticate_customer, email, password)
+    if not ok or customer is None:
+        session.outcomes["login_failed"] += 1
+        return
+    branch_id = customer["BranchID"]
+
+    products = []
+    for _ in range(rng.randint(1, 3)):
+        filters = {"branch_id": branch_id}
+        if rng.random() < 0.5:
+            filters["category_id"] = rng.choice(fixtures["categories"])
+        if rng.random() < 0.3:
+            filters["min_price"] = rng.choice((5, 10, 20))
+            filters["max_price"] = filters["min_price"] * rng.choice((2, 5, 10))
+        start = time.perf_counter()
+        ok, page = session.call("browse", Database.fetch_available_products, **filters, limit=50, offset=0)
+        if ok:
+            ok, _ = session.call("browse", Database.count_available_products, **filters)
+        if ok:
+            products.extend(row[0] for row in page)
+        think(start)
+
+    basket = {}
+    for product_id in rng.sample(products, min(len(products), rng.randint(1, 5))):
+        if product_id in basket:
+            continue
+        quantity = rng.randint(1, 3)
+        ok, remaining = session.call("reserve", Database.reserve_stock, branch_id, product_id, quantity)
+        if not ok:
+            continue
+        if remaining is None:
+            session.outcomes["reserve_rejected"] += 1
+            continue
+        session.stock_changes[(branch_id, product_id)] -= quantity
+        basket[product_id] = {"branch": branch_id, "quantity": quantity}
+
+    if basket and rng.random() < 0.8:
+        ok, order_id = session.call("checkout", Database.add_customer_order, customer["CustomerID"], basket)
+        if ok and order_id is not None:
+            session.outcomes["checkouts"] += 1
+            session.ordered_units += sum(item["quantity"] for item in basket.values())
+            basket = {}
+        elif ok:
+            session.outcomes["checkout_rejected"] += 1
+
+    # Logging out puts anything still reserved back, as customer_portal.logout_user does.
+    items = [(item["branch"], product_id, item["quantity"]) for product_id, item in basket.items()]
+    if items:
+        ok, _ = session.call("logout", Database.release_stock, items)
+        if ok:
+            for branch_id, product_id, quantity in items:
+                session.stock_changes[(branch_id, product_id)] += quantity
+    session.outcomes["customer_sessions"] += 1
+
+
+def staff_session(session, fixtures, think):
+    rng = session.rng
+    if session.employee is None:
+        ok, session.employee = session.call("staff_login", Database.authenticate_staff,
+                                            *rng.choice(fixtures["staff_logins"]))
+        if not ok or session.employee is None:
+            session.outcomes["login_failed"] += 1
+            return
+    branch_id = rng.choice(fixtures["branches"])
+    start = time.perf_counter()
+    session.call("inventory", Database.fetch_inventory_page, branch_id, page_size=100)
+    think(start)
+
+    if rng.random() < 0.6:
+        supplier_id, product_id = rng.choice(fixtures["supplier_products"])
+        quantity = rng.randint(10, 50)
+        ok, _ = session.call("supplier_order", Database.place_order, branch_id, supplier_id, product_id, quantity)
+        if ok:
+            session.stock_changes[(branch_id, product_id)] += quantity
+    else:
+        product_id = rng.choice(list(fixtures["products"]))
+        session.call("edit_product", Database.update_product, product_id, fixtures["products"][product_id],
+                     round(rng.uniform(5, 200), 2))
+    session.outcomes["staff_sessions"] += 1
+
+
+def run_user(role, index, db_path, fixtures, seconds, seed, think_ms):
+    """Runs one simulated user for seconds and returns its Session as a dict."""
+    Database.DB_PATH = db_path
+    session = Session(f"{seed}:{role}:{index}")
+
+    def think(start):
+        if think_ms:
+            time.sleep(max(0.0, think_ms / 1000 - (time.perf_counter() - start)))
+
+    work = customer_session if role == "customer" else staff_session
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        work(session, fixtures, think)
+    return session.as_dict()
+
+
+def run_user_process(*args):
+    # Database prints debug lines on every write; keep them out of the report. redirect_stdout swaps
+    # sys.stdout for the whole process, so threads mode does this once around all of its threads.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            return run_user(*args)
+        finally:
+            # Also stops this worker's AuthService processes, which would otherwise hang its exit.
+            Database.close_pool()
+
+
+def simulate(db_path, customers, staff, seconds, mode="threads", seed=1, think_ms=0):
+    fixtures = load_fixtures(db_path, customers)
+    before = stock_snapshot(db_path)
+    conn = sqlite3.connect(db_path)
+    first_order = conn.execute("SELECT COALESCE(MAX(OrderID), 0) FROM Orders").fetchone()[0]
+    conn.close()
+
+    users = [("customer", n) for n in range(customers)] + [("staff", n) for n in range(staff)]
+    started = time.perf_counter()
+    if mode == "processes":
+        with ProcessPoolExecutor(max_workers=len(users), mp_context=get_context("spawn")) as executor:
+            futures = [executor.submit(run_user_process, role, index, db_path, fixtures, seconds, seed, think_ms)
+                       for role, index in users]
+            sessions = [future.result() for future in futures]
+    else:
+        Database.DB_PATH = db_path
+        sessions = [None] * len(users)
+
+        def target(slot, role, index):
+            sessions[slot] = run_user(role, index, db_path, fixtures, seconds, seed, think_ms)
+
+        threads = [threading.Thread(target=target, args=(slot, role, index))
+                   for slot, (role, index) in enumerate(users)]
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        Database.close_pool()
+    elapsed = time.perf_counter() - started
+
+    return report(db_path, sessions, before, first_order, elapsed)
+
+
+def report(db_path, sessions, before, first_order, elapsed):
+    stats = defaultdict(LatencyStats)
+    errors = Counter()
+    lock_errors = Counter()
+    outcomes = Counter()
+    expected = Counter(before)
+    ordered_units = 0
+    last_errors = []
+    for session in sessions:
+        for operation, latencies in session["latencies"].items():
+            for seconds in latencies:
+                stats[operation].record(seconds)
+        errors.update(session["errors"])
+        lock_errors.update(session["lock_errors"])
+        outcomes.update(session["outcomes"])
+        for branch_id, product_id, change in session["stock_changes"]:
+            expected[(branch_id, product_id)] += change
+        ordered_units += session["ordered_units"]
+        if session["last_error"]:
+            last_errors.append(session["last_error"])
+
+    after = stock_snapshot(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        units_in_orders = conn.execute(
+            "SELECT COALESCE(SUM(OrderQuantity), 0) FROM CustomerOrders WHERE OrderID > ?", (first_order,)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+    violations = [
+        {"BranchID": branch_id, "ProductID": product_id, "expected": expected.get((branch_id, product_id)),
+         "actual": after.get((branch_id, product_id))}
+        for branch_id, product_id in sorted(set(expected) | set(after))
+        if expected.get((branch_id, product_id)) != after.get((branch_id, product_id))
+    ]
+    negative = sum(1 for quantity in after.values() if quantity < 0)
+
+    operations = {}
+    for operation in CUSTOMER_OPERATIONS + STAFF_OPERATIONS:
+        if operation in stats:
+            row = stats[operation].as_dict()
+            row["errors"] = errors[operation]
+            row["ops_per_s"] = row["calls"] / elapsed
+            operations[operation] = row
+    return {
+        "seconds": elapsed,
+        "operations": operations,
+        "outcomes": dict(outcomes),
+        "sessions_per_s": (outcomes["customer_sessions"] + outcomes["staff_sessions"]) / elapsed,
+        "busy": lock_errors["busy"],
+        "locked": lock_errors["locked"],
+        "errors": sum(errors.values()),
+        "last_errors": last_errors[:10],
+        "stock_violations": violations,
+        "negative_stock_rows": negative,
+        "units_checked_out": ordered_units,
+        "units_in_new_orders": units_in_orders,
+    }
+
+
+def print_report(result):
+    print(f"{'operation':16} {'calls':>7} {'errors':>7} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'max ms':>9}")
+    for operation, row in result["operations"].items():
+        print(f"{operation:16} {row['calls']:7d} {row['errors']:7d} {row['ops_per_s']:9.1f} {row['p50_ms']:9.2f} "
+              f"{row['p95_ms']:9.2f} {row['p99_ms']:9.2f} {row['max_ms']:9.2f}")
+    outcomes = result["outcomes"]
+    print(f"sessions: {outcomes.get('customer_sessions', 0)} customer, {outcomes.get('staff_sessions', 0)} staff "
+          f"({result['sessions_per_s']:.1f}/s over {result['seconds']:.1f}s); checkouts={outcomes.get('checkouts', 0)} "
+          f"reserve_rejected={outcomes.get('reserve_rejected', 0)} login_failed={outcomes.get('login_failed', 0)}")
+    print(f"errors: {result['errors']} (SQLITE_BUSY={result['busy']}, SQLITE_LOCKED={result['locked']})")
+    for message in result["last_errors"]:
+        print(f"  {message}")
+    print(f"stock violations: {len(result['stock_violations'])}, negative stock rows: "
+          f"{result['negative_stock_rows']}, units checked out={result['units_checked_out']} "
+          f"in new orders={result['units_in_new_orders']}")
+    for violation in result["stock_violations"][:10]:
+        print(f"  {violation}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=8)
+    parser.add_argument("--staff", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--mode", choices=("threads", "processes"), default="threads")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Minimum time per browse step.")
+    parser.add_argument("--dataset", help="A database built by benchmarks.generate_dataset (copied, not modified).")
+    parser.add_argument("--scale", type=float, default=0.1, help="Scale to generate when --dataset is not given.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="Write the report to this JSON file.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "autodatabase.db")
+        if args.dataset:
+            shutil.copy(args.dataset, path)
+        else:
+            generate(path, args.scale, args.seed, verbose=False)
+        result = simulate(path, args.customers, args.staff, args.seconds, args.mode, args.seed, args.think_ms)
+
+    print_report(result)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+    consistent = (not result["stock_violations"] and not result["negative_stock_rows"]
+                  and result["units_checked_out"] == result["units_in_new_orders"])
+    return 0 if consistent else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
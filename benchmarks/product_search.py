@@ -0,0 +1,100 @@
+"""Product search latency as the catalogue grows: FTS5 index versus the old leading-wildcard LIKE.
+
+    python -m benchmarks.product_search --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import contextlib
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from utils.database import Database
+
+SOURCE_DB = Database.DB_PATH
+BRANCH_ID = 1
+ADJECTIVES = ["Premium", "Sport", "Heavy Duty", "Compact", "Classic", "Performance", "Universal", "Pro"]
+NOUNS = ["Brake Pads", "Oil Filter", "Wiper Blades", "Spark Plugs", "Floor Mats", "Car Cover", "Amplifier",
+         "Air Filter", "Wheel Bearings", "Dash Camera", "Battery", "Subwoofer"]
+QUERIES = ["brake", "wiper bla", "M4242", "sport oil filter"]
+
+
+def build_catalogue(path, size, seed=1):
+    rng = random.Random(seed)
+    shutil.copy(SOURCE_DB, path)
+    Database.DB_PATH = path
+    # Opening the pool creates ProductSearch and its triggers before the bulk load.
+    Database.pool()
+    conn = Database.connect()
+    try:
+        category_ids = [row[0] for row in conn.execute("SELECT CategoryID FROM Categories")]
+        start_id = conn.execute("SELECT COALESCE(MAX(ProductID), 0) + 1 FROM Products").fetchone()[0]
+        batch = 50_000
+        for offset in range(0, size, batch):
+            ids = range(start_id + offset, start_id + min(offset + batch, size))
+            conn.executemany(
+                "INSERT INTO Products (ProductID, ProductName, CategoryID, Price) VALUES (?, ?, ?, ?)",
+                ((i, f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} M{i}", rng.choice(category_ids),
+                  round(rng.uniform(1, 500), 2)) for i in ids),
+            )
+            conn.executemany(
+                "INSERT INTO BranchStock (BranchID, ProductID, StockQuantity) VALUES (?, ?, ?)",
+                ((BRANCH_ID, i, rng.randint(1, 50)) for i in ids),
+            )
+            conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+
+def like_search(term):
+    conn = Database.connect()
+    try:
+        return conn.execute("""
+            SELECT p.ProductID, p.ProductName, bs.StockQuantity, p.Price, p.CategoryID
+            FROM Products p
+            JOIN BranchStock bs ON p.ProductID = bs.ProductID
+            WHERE bs.BranchID = ? AND bs.StockQuantity > 0 AND p.ProductName LIKE ?
+        """, (BRANCH_ID, f"%{term}%")).fetchall()
+    finally:
+        conn.close()
+
+
+def fts_search(term):
+    return Database.fetch_available_products(BRANCH_ID, search=term)
+
+
+def time_query(fn, term, repeat):
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(fn(term))
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'products':>9} {'query':>18} {'rows':>6} {'like p50':>10} {'fts p50':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f"catalogue_{size}.db")
+            build_catalogue(path, size)
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results = [(term, time_query(like_search, term, args.repeat), time_query(fts_search, term, args.repeat))
+                           for term in QUERIES]
+            for term, (like_ms, _), (fts_ms, rows) in results:
+                print(f"{size:>9} {term:>18} {rows:>6} {like_ms:>8.2f}ms {fts_ms:>8.2f}ms")
+            Database.close_pool()
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Commits and latency of restoring a basket's stock at logout, for 1, 10 and 100-line baskets.
+
+"legacy" reproduces the original logout: a fresh connection and a commit for every basket line.
+"per-line" calls Database.adjust_stock_quantity once per line through the pooled writer.
+"batched" restores the whole basket with one Database.release_stock call.
+
+Commits are counted with a trace callback on every connection involved.
+
+    python -m benchmarks.stock_release --repeat 50
+"""
+import argparse
+import contextlib
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from utils.database import Database
+
+SOURCE_DB = Database.DB_PATH
+BRANCH_ID = 1
+BASKET_SIZES = (1, 10, 100)
+
+
+class CommitCounter:
+    def __init__(self):
+        self.commits = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, conn):
+        conn.set_trace_callback(self._trace)
+
+    def _trace(self, statement):
+        if statement.strip().upper().startswith(("COMMIT", "END")):
+            with self.lock:
+                self.commits += 1
+
+
+def prepare_database(path, lines):
+    shutil.copy(SOURCE_DB, path)
+    conn = sqlite3.connect(path)
+    start_id = conn.execute("SELECT COALESCE(MAX(ProductID), 0) + 1 FROM Products").fetchone()[0]
+    category_id = conn.execute("SELECT MIN(CategoryID) FROM Categories").fetchone()[0]
+    ids = range(start_id, start_id + lines)
+    conn.executemany(
+        "INSERT INTO Products (ProductID, ProductName, CategoryID, Price) VALUES (?, ?, ?, ?)",
+        ((i, f"Bench product {i}", category_id, 1.0) for i in ids),
+    )
+    conn.executemany(
+        "INSERT INTO BranchStock (BranchID, ProductID, StockQuantity) VALUES (?, ?, ?)",
+        ((BRANCH_ID, i, 0) for i in ids),
+    )
+    conn.commit()
+    conn.close()
+    return [(BRANCH_ID, product_id, 1) for product_id in ids]
+
+
+def legacy_release(path, items, counter):
+    for branch_id, product_id, quantity in items:
+        conn = sqlite3.connect(path)
+        counter(conn)
+        try:
+            conn.execute(
+                "UPDATE BranchStock SET StockQuantity = StockQuantity + ? WHERE BranchID = ? AND ProductID = ?",
+                (quantity, branch_id, product_id),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def per_line_release(path, items, counter):
+    for branch_id, product_id, quantity in items:
+        Database.adjust_stock_quantity(branch_id, product_id, quantity)
+
+
+def batched_release(path, items, counter):
+    Database.release_stock(items)
+
+
+def measure(label, release, lines, repeat, tmp):
+    path = os.path.join(tmp, f"{label}-{lines}.db")
+    items = prepare_database(path, lines)
+    counter = CommitCounter()
+    Database.DB_PATH = path
+    Database.CONNECTION_HOOKS.append(counter)
+    try:
+        Database.pool()
+        counter.commits = 0
+        latencies = []
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(repeat):
+                start = time.perf_counter()
+                release(path, items, counter)
+                latencies.append(time.perf_counter() - start)
+
+        conn = sqlite3.connect(path)
+        restored = conn.execute(
+            "SELECT SUM(StockQuantity) FROM BranchStock WHERE BranchID = ? AND ProductID >= ?",
+            (BRANCH_ID, items[0][1]),
+        ).fetchone()[0]
+        conn.close()
+    finally:
+        Database.CONNECTION_HOOKS.remove(counter)
+        Database.close_pool()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    mean = statistics.fmean(latencies) * 1000
+    assert restored == lines * repeat, f"{label}: expected {lines * repeat} units back, found {restored}"
+    print(
+        f"{label:>8} lines={lines:4d}: commits/logout={counter.commits / repeat:7.1f} "
+        f"mean={mean:8.2f}ms p50={p50:8.2f}ms p99={p99:8.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for lines in BASKET_SIZES:
+            for label, release in (("legacy", legacy_release), ("per-line", per_line_release),
+                                   ("batched", batched_release)):
+                measure(label, release, lines, args.repeat, tmp)
+
+
+if __name__ == "__main__":
+    main()
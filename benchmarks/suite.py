@@ -0,0 +1,413 @@
+"""Times every public Database method, XMLUtils operation and ProductImages operation on generated datasets.
+
+    python -m benchmarks.suite run --scales 0.1 1 --out results.json [--data-dir datasets]
+    python -m benchmarks.suite compare baseline.json results.json [--threshold 0.2] [--field p95_ms]
+
+Each scale is built with benchmarks.generate_dataset (kept in --data-dir when given, so later runs
+reuse it) and benchmarked on a fresh copy in its own process, so peak RSS is per scale. Every case
+runs --warmup untimed calls, then up to --repeat timed calls or --max-seconds, whichever ends first.
+Results hold calls, errors, rows, bytes, ops/s, latency percentiles and peak RSS for each case.
+
+compare exits with status 1 when a case got slower than the threshold allows (and by more than
+--min-ms, to ignore timer noise), so it can gate a CI job. Nothing here needs a Tk display.
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import resource
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+from benchmarks.generate_dataset import PASSWORD_COUNT, counts_for, generate
+from custom_xml_utils.xml_utils import XMLUtils
+from media.product_images import ProductImages
+from media.thumbnails import Image, make_thumbnail
+from utils.database import Database
+from utils.encryption import hash_password
+from utils.index_advisor import sample_arguments
+from utils.instrumentation import UNINSTRUMENTED_METHODS, LatencyStats, compare, result_rows, value_size
+
+HIGHER_IS_WORSE = ("p50_ms", "p95_ms", "p99_ms", "mean_ms", "max_ms", "peak_rss_kb")
+
+
+def peak_rss_kb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS.
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+
+def dataset_path(data_dir, scale, seed):
+    return os.path.join(data_dir, f"autodatabase-sf{scale:g}-seed{seed}.db")
+
+
+def ensure_dataset(data_dir, scale, seed):
+    path = dataset_path(data_dir, scale, seed)
+    if not os.path.exists(path):
+        generate(path, scale, seed, verbose=False)
+    return path
+
+
+class Cases:
+    """(group, name, call) for everything the suite times, with the fixtures those calls need.
+
+    Writes come after reads, deletes last, and calls that consume a row (deletes, signups) take a
+    fresh id from a counter on every call so they stay comparable however often they repeat.
+    """
+
+    def __init__(self, conn, workdir):
+        self.a = sample_arguments(conn)
+        self.workdir = workdir
+
+        def ids(query):
+            # Read on first use, so the rows added by the earlier write cases can be deleted too.
+            conn = Database.connect()
+            try:
+                rows = conn.execute(query).fetchall()
+            finally:
+                conn.close()
+            for row in rows:
+                yield row[0]
+
+        # Ids from the far end of each table, so deletes do not remove the rows the reads use.
+        self.order_ids = ids("SELECT OrderID FROM Orders ORDER BY OrderID DESC")
+        self.supplier_order_ids = ids("SELECT OrderID FROM BranchOrders ORDER BY OrderID DESC")
+        self.employee_ids = ids("SELECT EmployeeID FROM Employees ORDER BY EmployeeID DESC")
+        self.customer_ids = ids("""
+            SELECT CustomerID FROM Customers
+            WHERE CustomerID NOT IN (SELECT CustomerID FROM Orders) ORDER BY CustomerID DESC
+        """)
+        self.product_ids = ids("""
+            SELECT ProductID FROM Products
+            WHERE ProductID NOT IN (SELECT ProductID FROM CustomerOrders)
+              AND ProductID NOT IN (SELECT ProductID FROM BranchOrders) ORDER BY ProductID DESC
+        """)
+        self.stocked = [row[0] for row in conn.execute(
+            "SELECT ProductID FROM BranchStock WHERE BranchID = ? AND StockQuantity > 0 LIMIT 50",
+            (self.a["branch_id"],),
+        )]
+        self.image_product_id = (conn.execute(
+            "SELECT ProductID FROM Products WHERE ProductImage IS NOT NULL ORDER BY ProductID LIMIT 1"
+        ).fetchone() or (self.a["product_id"],))[0]
+        self.image = Database.fetch_product_image(self.image_product_id) or b"\xff\xd8\xff" + bytes(4096)
+        self.counter = itertools.count(1)
+
+        # Generated customers log in with "password{CustomerID % PASSWORD_COUNT}".
+        self.password = f"password{self.a['customer_id'] % PASSWORD_COUNT}"
+        self.hashed_password = hash_password("benchmark")
+
+        self.image_file = os.path.join(workdir, "image.jpg")
+        with open(self.image_file, "wb") as file:
+            file.write(self.image)
+        self.xml_orders = os.path.join(workdir, "Orders.xml")
+        self.xml_products = os.path.join(workdir, "Products.xml")
+        self.xml_modified = os.path.join(workdir, "Orders-modified.xml")
+        self.xml_import = os.path.join(workdir, "BranchOrders-import.xml")
+
+    def basket(self, lines=3):
+        start = next(self.counter) % max(1, len(self.stocked))
+        chosen = (self.stocked[start:] + self.stocked[:start])[:lines]
+        return [(self.a["branch_id"], product_id, 1) for product_id in chosen]
+
+    def prepare_xml(self):
+        """Writes the files the XML read, modify and import cases work on."""
+        XMLUtils.export_to_xml("Orders", self.xml_orders)
+        conn = Database.connect()
+        try:
+            rows = conn.execute(
+                "SELECT BranchID, SupplierID, ProductID, OrderQuantity, OrderDate FROM BranchOrders LIMIT 1000"
+            ).fetchall()
+        finally:
+            conn.close()
+        # Without OrderID, so every import appends fresh rows instead of failing on the primary key.
+        root = ET.Element("BranchOrders")
+        for row in rows:
+            record = ET.SubElement(root, "record")
+            for column, value in zip(("BranchID", "SupplierID", "ProductID", "OrderQuantity", "OrderDate"), row):
+                ET.SubElement(record, column).text = str(value)
+        ET.ElementTree(root).write(self.xml_import)
+
+    def writer_job(self, fn, *args):
+        return Database.writer().execute(fn, *args)
+
+    def all(self):
+        a = self.a
+        db = [
+            ("fetch_all_staff", lambda: Database.fetch_all_staff()),
+            ("fetch_staff_page", lambda: Database.fetch_staff_page(100)),
+            ("fetch_all_customers", lambda: Database.fetch_all_customers()),
+            ("fetch_customers_page", lambda: Database.fetch_customers_page(100)),
+            ("fetch_all_products", lambda: Database.fetch_all_products()),
+            ("fetch_products_page", lambda: Database.fetch_products_page(100, sort_by=["-Price"])),
+            ("fetch_supplier_products", lambda: Database.fetch_supplier_products(a["supplier_id"], limit=50)),
+            ("count_supplier_products", lambda: Database.count_supplier_products(a["supplier_id"])),
+            ("fetch_all_suppliers", lambda: Database.fetch_all_suppliers()),
+            ("fetch_inventory", lambda: Database.fetch_inventory(a["branch_id"])),
+            ("fetch_inventory_page", lambda: Database.fetch_inventory_page(a["branch_id"], page_size=100)),
+            ("authenticate_customer", lambda: Database.authenticate_customer(a["email"], self.password)),
+            ("authenticate_staff", lambda: Database.authenticate_staff(
+                a["employee_id"], f"password{a['employee_id'] % PASSWORD_COUNT}")),
+            ("fetch_all_supplier_orders", lambda: Database.fetch_all_supplier_orders()),
+            ("fetch_supplier_orders_page", lambda: Database.fetch_supplier_orders_page(100)),
+            ("fetch_order_details", lambda: Database.fetch_order_details(a["order_id"])),
+            ("fetch_past_orders", lambda: Database.fetch_past_orders(a["customer_id"])),
+            ("fetch_past_orders_page", lambda: Database.fetch_past_orders_page(a["customer_id"], 20)),
+            ("fetch_all_categories", lambda: Database.fetch_all_categories()),
+            ("fetch_category_id", lambda: Database.fetch_category_id(Database.fetch_all_categories()[0])),
+            ("fetch_all_job_roles", lambda: Database.fetch_all_job_roles()),
+            ("fetch_basket", lambda: Database.fetch_basket(a["customer_id"])),
+            ("fetch_available_products", lambda: Database.fetch_available_products(a["branch_id"], limit=50)),
+            ("count_available_products", lambda: Database.count_available_products(a["branch_id"])),
+            ("fetch_all_branches", lambda: Database.fetch_all_branches()),
+            ("fetch_branch_id", lambda: Database.fetch_branch_id(a["location"])),
+            ("fetch_product_thumbnails", lambda: Database.fetch_product_thumbnails(self.stocked)),
+            ("fetch_products_missing_thumbnails", lambda: Database.fetch_products_missing_thumbnails()),
+            ("fetch_product_images", lambda: Database.fetch_product_images(self.stocked)),
+            ("fetch_product_image", lambda: Database.fetch_product_image(self.image_product_id)),
+            ("fetch_stock_quantity", lambda: Database.fetch_stock_quantity(a["branch_id"], a["product_id"])),
+            ("fetch_branch_stock_id", lambda: Database.fetch_branch_stock_id(a["branch_id"], a["product_id"])),
+            ("signup_customer", lambda: Database.signup_customer(
+                "Bench", "Customer", "07000000000", 1, f"bench{next(self.counter)}@example.com", "benchmark",
+                a["branch_id"])),
+            ("add_staff", lambda: Database.add_staff(
+                "Bench", "Staff", f"08{next(self.counter):09d}", a["branch_id"], 1, self.hashed_password)),
+            ("add_product", lambda: Database.add_product("Bench product", a["category_id"], 9.99)),
+            ("update_product", lambda: Database.update_product(a["product_id"], a["category_id"], 9.99)),
+            ("update_product_image", lambda: Database.update_product_image(self.image_product_id, self.image)),
+            ("save_product_thumbnails", lambda: Database.save_product_thumbnails([])),
+            ("save_product_thumbnail", lambda: self.writer_job(
+                Database.save_product_thumbnail, self.image_product_id, self.image[:4096])),
+            ("update_customer", lambda: Database.update_customer(a["customer_id"], "07000000000", 1)),
+            ("update_staff", lambda: Database.update_staff(a["employee_id"], "07000000001", a["branch_id"], 1)),
+            ("place_order", lambda: Database.place_order(a["branch_id"], a["supplier_id"], a["product_id"], 100)),
+            ("add_supplier_order", lambda: Database.add_supplier_order(
+                a["branch_id"], a["supplier_id"], a["product_id"], 10, "2025-01-01")),
+            ("adjust_stock_quantity", lambda: Database.adjust_stock_quantity(a["branch_id"], a["product_id"], 1)),
+            ("reserve_stock", lambda: Database.reserve_stock(a["branch_id"], a["product_id"], 1)),
+            ("reserve_stock_batch", lambda: Database.reserve_stock_batch(self.basket(5))),
+            ("decrement_stock", lambda: self.writer_job(
+                Database.decrement_stock, a["branch_id"], a["product_id"], 1)),
+            ("release_stock", lambda: Database.release_stock(self.basket(5))),
+            ("checkout", lambda: Database.checkout(a["customer_id"], self.basket(3))),
+            ("add_customer_order", lambda: Database.add_customer_order(a["customer_id"], {
+                product_id: {"branch": branch_id, "quantity": quantity}
+                for branch_id, product_id, quantity in self.basket(3)})),
+            ("add_to_basket", lambda: Database.add_to_basket(a["customer_id"], a["product_id"], 1, a["branch_id"],
+                                                             "Collection")),
+            ("checkout_basket", lambda: Database.checkout_basket(a["customer_id"], {a["product_id"]: {"quantity": 1}})),
+            ("delete_supplier_order", lambda: Database.delete_supplier_order(next(self.supplier_order_ids))),
+            ("delete_order", lambda: Database.delete_order(next(self.order_ids))),
+            ("delete_staff", lambda: Database.delete_staff(next(self.employee_ids))),
+            ("delete_customer", lambda: Database.delete_customer(next(self.customer_ids))),
+            ("delete_product", lambda: Database.delete_product(next(self.product_ids))),
+        ]
+        xml = [
+            ("export_to_xml Orders", lambda: XMLUtils.export_to_xml("Orders", self.xml_orders)),
+            ("export_to_xml Products", lambda: XMLUtils.export_to_xml("Products", self.xml_products)),
+            ("retrieve_data_from_xml", lambda: XMLUtils.retrieve_data_from_xml(self.xml_orders, "CustomerID")),
+            ("modify_xml_field", lambda: XMLUtils.modify_xml_field(
+                self.xml_orders, self.xml_modified, "CustomerID", str(a["customer_id"]), "0")),
+            # The sidecar index is built by the first (warmup) call and reused after that.
+            ("retrieve_data_from_xml indexed", lambda: XMLUtils.retrieve_data_from_xml(
+                self.xml_orders, "CustomerID", use_index=True)),
+            ("find_records indexed", lambda: XMLUtils.find_records(self.xml_orders, "CustomerID", str(a["customer_id"]))),
+            ("modify_xml_field indexed", lambda: XMLUtils.modify_xml_field(
+                self.xml_orders, self.xml_modified, "CustomerID", str(a["customer_id"]), "0", use_index=True)),
+            ("import_from_xml", lambda: XMLUtils.import_from_xml(self.xml_import)),
+        ]
+        images = [
+            ("store_image", lambda: ProductImages.store_image(self.image_product_id, self.image_file)),
+            ("export_image", lambda: ProductImages.export_image(self.image_product_id, self.workdir)),
+        ]
+        if Image is not None:
+            images.append(("make_thumbnail", lambda: make_thumbnail(self.image)))
+        return ([("Database", name, call) for name, call in db]
+                + [("XMLUtils", name, call) for name, call in xml]
+                + [("ProductImages", name, call) for name, call in images])
+
+
+def public_database_methods():
+    return sorted(
+        name for name, attr in vars(Database).items()
+        if isinstance(attr, staticmethod) and not name.startswith("_") and name not in UNINSTRUMENTED_METHODS
+    )
+
+
+def time_case(call, warmup, repeat, max_seconds):
+    for _ in range(warmup):
+        try:
+            call()
+        except Exception:
+            pass
+
+    stats = LatencyStats()
+    last_error = None
+    started = time.perf_counter()
+    while stats.calls < repeat and (stats.calls == 0 or time.perf_counter() - started < max_seconds):
+        start = time.perf_counter()
+        try:
+            result = call()
+        except Exception as e:
+            stats.record(time.perf_counter() - start, error=True)
+            last_error = f"{type(e).__name__}: {e}"
+            continue
+        stats.record(time.perf_counter() - start, result_rows(result), value_size(result))
+    elapsed = time.perf_counter() - started
+
+    row = stats.as_dict()
+    row["ops_per_s"] = stats.calls / elapsed if elapsed else 0.0
+    if last_error:
+        row["last_error"] = last_error
+    return row
+
+
+def run_scale(scale, seed, data_dir, warmup, repeat, max_seconds, only=None):
+    """Benchmarks one scale factor; meant to run in a fresh process so peak RSS belongs to this scale."""
+    source = ensure_dataset(data_dir, scale, seed)
+    workdir = tempfile.mkdtemp(prefix="benchmark-suite-")
+    path = os.path.join(workdir, "autodatabase.db")
+    shutil.copy(source, path)
+    Database.DB_PATH = path
+
+    results = {}
+    baseline_rss = peak_rss_kb()
+    try:
+        conn = Database.connect()
+        try:
+            cases = Cases(conn, workdir)
+        finally:
+            conn.close()
+
+        # Database and XMLUtils print progress and debug lines on every call; keep them out of the report.
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            cases.prepare_xml()
+            for group, name, call in cases.all():
+                if only and not any(part in name for part in only):
+                    continue
+                before = peak_rss_kb()
+                row = time_case(call, warmup, repeat, max_seconds)
+                row["group"] = group
+                row["peak_rss_kb"] = peak_rss_kb()
+                row["rss_growth_kb"] = row["peak_rss_kb"] - before
+                results[name] = row
+    finally:
+        Database.close_pool()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    covered = {name.split()[0] for name in results}
+    return {
+        "dataset": counts_for(scale, 3),
+        "dataset_mb": os.path.getsize(source) / 1024 / 1024,
+        "baseline_rss_kb": baseline_rss,
+        "peak_rss_kb": peak_rss_kb(),
+        "not_covered": [name for name in public_database_methods() if name not in covered] if not only else [],
+        "cases": results,
+    }
+
+
+def run(scales, seed, data_dir, warmup, repeat, max_seconds, only=None):
+    results = {
+        "taken": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "seed": seed,
+        "warmup": warmup,
+        "repeat": repeat,
+        "max_seconds": max_seconds,
+        "scales": {},
+    }
+    for scale in scales:
+        ensure_dataset(data_dir, scale, seed)
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            results["scales"][f"{scale:g}"] = executor.submit(
+                run_scale, scale, seed, data_dir, warmup, repeat, max_seconds, only
+            ).result()
+    return results
+
+
+def print_results(results):
+    for scale, entry in results["scales"].items():
+        print(f"scale {scale} ({entry['dataset_mb']:.1f} MB, peak RSS {entry['peak_rss_kb'] / 1024:.1f} MB)")
+        print(f"  {'case':42} {'calls':>6} {'err':>4} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+              f"{'rss +KB':>8}")
+        for name, row in entry["cases"].items():
+            print(f"  {name[:42]:42} {row['calls']:6d} {row['errors']:4d} {row['ops_per_s']:10.1f} "
+                  f"{row['p50_ms']:9.3f} {row['p95_ms']:9.3f} {row['p99_ms']:9.3f} {row['rss_growth_kb']:8d}")
+        if entry["not_covered"]:
+            print(f"  not covered: {', '.join(entry['not_covered'])}")
+
+
+def regressions(before, after, field="p95_ms", threshold=0.2, min_ms=0.05):
+    """(scale, case, before, after, ratio) for every case in both runs that got worse beyond threshold."""
+    found = []
+    for scale in sorted(set(before["scales"]) & set(after["scales"])):
+        for name, old, new, change in compare(before["scales"][scale], after["scales"][scale], "cases", field):
+            if change is None or change <= 0 or not old:
+                continue
+            if field.endswith("_ms") and change < min_ms:
+                continue
+            if new / old - 1 > threshold:
+                found.append((scale, name, old, new, new / old))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run")
+    run_parser.add_argument("--scales", type=float, nargs="+", default=[0.1, 1.0])
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--data-dir", help="Keep generated datasets here and reuse them on later runs.")
+    run_parser.add_argument("--warmup", type=int, default=1)
+    run_parser.add_argument("--repeat", type=int, default=50)
+    run_parser.add_argument("--max-seconds", type=float, default=2.0, help="Time budget per case.")
+    run_parser.add_argument("--only", nargs="+", help="Only cases whose name contains one of these.")
+    run_parser.add_argument("--out", help="Write the results to this JSON file.")
+
+    compare_parser = sub.add_parser("compare")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    compare_parser.add_argument("--field", choices=HIGHER_IS_WORSE, default="p95_ms")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown, 0.2 = 20%%.")
+    compare_parser.add_argument("--min-ms", type=float, default=0.05, help="Ignore smaller absolute changes.")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        if args.data_dir:
+            os.makedirs(args.data_dir, exist_ok=True)
+            results = run(args.scales, args.seed, args.data_dir, args.warmup, args.repeat, args.max_seconds,
+                          args.only)
+        else:
+            with tempfile.TemporaryDirectory() as data_dir:
+                results = run(args.scales, args.seed, data_dir, args.warmup, args.repeat, args.max_seconds,
+                              args.only)
+        print_results(results)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as file:
+                json.dump(results, file, indent=2)
+        return 0
+
+    with open(args.before, encoding="utf-8") as file:
+        before = json.load(file)
+    with open(args.after, encoding="utf-8") as file:
+        after = json.load(file)
+    found = regressions(before, after, args.field, args.threshold, args.min_ms)
+    for scale, name, old, new, ratio in found:
+        print(f"REGRESSION scale {scale} {name}: {args.field} {old:.3f} -> {new:.3f} ({ratio:.2f}x)")
+    print(f"{len(found)} regression(s) beyond {args.threshold:.0%} in {args.field}.")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""Incremental export and import of the change-tracked tables (utils.schema.CHANGE_TRACKED_TABLES).
+
+    python -m custom_xml_utils.delta register nightly [--watermark 1234]
+    python -m custom_xml_utils.delta export deltas/2025-02-01 --consumer nightly [--format jsonl] [--gzip]
+    python -m custom_xml_utils.delta import deltas/2025-02-01
+    python -m custom_xml_utils.delta ack nightly deltas/2025-02-01
+
+Triggers (schema migrations 8 and 10) log every inserted, updated and deleted primary key of the tracked
+tables in ChangeLog under an increasing change sequence, keeping only each key's latest change. A
+delta holds the rows changed after a watermark, as they are now, and the keys deleted after it,
+all read in one transaction, up to the sequence the manifest records as "until". That sequence is
+the watermark for the next delta; a full snapshot records its own as "change_sequence", so a new
+copy starts from the snapshot and then applies deltas from there, in order.
+
+A consumer is a named reader of the log. Once a delta has been applied, acknowledging it moves the
+consumer's watermark to the delta's "until", and the log is compacted: entries every consumer has
+seen are deleted. Asking for changes from before the compacted point is an error, because some of
+them are gone.
+"""
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+from custom_xml_utils.formats import FORMATS, codec_for, fetch_rows
+from custom_xml_utils.snapshot import MANIFEST, file_sha256
+from custom_xml_utils.xml_utils import XMLUtils, open_compressed
+from utils.database import Database
+from utils.schema import CHANGE_TRACKED_TABLES, change_sequence
+
+KEY_COLUMNS = ("Key1", "Key2")
+# Columns the importing database maintains itself, from its own triggers: never copied over a row.
+DERIVED_COLUMNS = {"Products": ("ImageVersion",)}
+
+
+def consumer_watermark(cursor, consumer):
+    cursor.execute("SELECT Watermark FROM ChangeConsumers WHERE Name = ?", (consumer,))
+    row = cursor.fetchone()
+    if row is None:
+        raise ValueError(f"Unknown change consumer: {consumer}")
+    return row[0]
+
+
+def register_consumer(consumer, watermark=None):
+    """Adds (or resets) a consumer at watermark, by default the latest change; returns the watermark."""
+    conn = Database.connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        if watermark is None:
+            watermark = change_sequence(cursor)
+        compacted = cursor.execute("SELECT CompactedThrough FROM ChangeLogState").fetchone()[0]
+        if watermark < compacted:
+            raise ValueError(f"Changes up to {compacted} have been compacted; register at {compacted} or later.")
+        cursor.execute(
+            "INSERT INTO ChangeConsumers (Name, Watermark) VALUES (?, ?) "
+            "ON CONFLICT (Name) DO UPDATE SET Watermark = excluded.Watermark",
+            (consumer, watermark),
+        )
+        conn.commit()
+        return watermark
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.close()
+
+
+def _key_join(table):
+    return " AND ".join(f"t.{column} = c.{key}" for column, key in zip(CHANGE_TRACKED_TABLES[table], KEY_COLUMNS))
+
+
+def _write(path, codec, table_name, columns, cursor, chunk_size):
+    with open_compressed(path, "wb") as file:
+        rows = codec.write(file, table_name, columns, fetch_rows(cursor, chunk_size))
+    return {"file": os.path.basename(path), "rows": rows, "bytes": os.path.getsize(path), "sha256": file_sha256(path)}
+
+
+def export_changes(output_dir, since=None, consumer=None, format="xml", compress=False, chunk_size=1000):
+    """Writes the changes after since (default: consumer's watermark) to output_dir; returns the manifest.
+
+    For each tracked table, <Table><ext> holds the rows inserted or updated, and
+    <Table>.deleted<ext> the primary keys of the rows deleted. Both, and manifest.json, are
+    written from one read transaction.
+    """
+    codec = FORMATS[format]
+    extension = codec.extension + (".gz" if compress else "")
+    os.makedirs(output_dir, exist_ok=True)
+    conn = Database.connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN")
+        if since is None:
+            if consumer is None:
+                raise ValueError("Give the watermark to export changes since, or a registered consumer.")
+            since = consumer_watermark(cursor, consumer)
+        compacted = cursor.execute("SELECT CompactedThrough FROM ChangeLogState").fetchone()[0]
+        if since < compacted:
+            raise ValueError(f"Changes up to {compacted} have been compacted; start again from a full snapshot.")
+        until = change_sequence(cursor)
+        manifest = {
+            "taken_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "database": Database.DB_PATH,
+            "schema_version": cursor.execute("SELECT MAX(Version) FROM SchemaVersion").fetchone()[0],
+            "format": codec.name,
+            "since": since,
+            "until": until,
+            "tables": {},
+        }
+
+        for table, keys in CHANGE_TRACKED_TABLES.items():
+            columns = [column[1] for column in cursor.execute(f"PRAGMA table_info({table})").fetchall()]
+            cursor.execute(
+                f"SELECT {', '.join('t.' + column for column in columns)} "
+                f"FROM ChangeLog c JOIN {table} t ON {_key_join(table)} "
+                "WHERE c.TableName = ? AND c.Sequence > ? AND c.Sequence <= ? AND c.Operation <> 'D' "
+                "ORDER BY c.Sequence",
+                (table, since, until),
+            )
+            changed = _write(os.path.join(output_dir, table + extension), codec, table, columns, cursor, chunk_size)
+            cursor.execute(
+                f"SELECT {', '.join(KEY_COLUMNS[:len(keys)])} FROM ChangeLog "
+                "WHERE TableName = ? AND Sequence > ? AND Sequence <= ? AND Operation = 'D' ORDER BY Sequence",
+                (table, since, until),
+            )
+            deleted = _write(
+                os.path.join(output_dir, table + ".deleted" + extension), codec, table, list(keys), cursor, chunk_size
+            )
+            manifest["tables"][table] = {"changed": changed, "deleted": deleted}
+    finally:
+        conn.rollback()
+        conn.close()
+
+    manifest_path = os.path.join(output_dir, MANIFEST)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest
+
+
+def _read_records(path, cursor, table):
+    """Yields (columns, converted values) for the records of a delta file."""
+    codec = codec_for(path)
+    converters = XMLUtils._column_converters(cursor, table, codec.base64_blobs)
+    record_converters = {}
+    with open_compressed(path) as file:
+        _, records = codec.read(file)
+        for columns, values in records:
+            if columns not in record_converters:
+                record_converters[columns] = XMLUtils._record_converters(table, converters, columns)
+            yield columns, [
+                convert(value) if value.__class__ is str else value
+                for convert, value in zip(record_converters[columns], values)
+            ]
+
+
+def _upsert_statement(table, columns):
+    """INSERT that updates the existing row on a primary key conflict, unless it already has these values."""
+    keys = CHANGE_TRACKED_TABLES[table]
+    derived = DERIVED_COLUMNS.get(table, ())
+    others = [column for column in columns if column not in keys and column not in derived]
+    statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+    if not others:
+        return statement + f"ON CONFLICT ({', '.join(keys)}) DO NOTHING"
+    # Unchanged rows are skipped, so applying a delta twice writes nothing the second time. A row
+    # whose price changed gets its ProductImage written back unchanged, which the image triggers
+    # ignore (migration 9), so its ImageVersion and thumbnail are kept.
+    return statement + (
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in others)} "
+        f"WHERE ({', '.join(f'{table}.{column}' for column in others)}) "
+        f"IS NOT ({', '.join(f'excluded.{column}' for column in others)})"
+    )
+
+
+def _apply(cursor, records, statement_for, batch_size):
+    batches = {}
+    rows = 0
+    for columns, values in records:
+        batch = batches.setdefault(columns, [])
+        batch.append(values)
+        if len(batch) >= batch_size:
+            cursor.executemany(statement_for(columns), batch)
+            rows += len(batch)
+            batch.clear()
+    for columns, batch in batches.items():
+        if batch:
+            cursor.executemany(statement_for(columns), batch)
+            rows += len(batch)
+    return rows
+
+
+def verify_changes(input_dir):
+    """Checks the files in input_dir against its manifest; returns a list of problems, empty if none."""
+    with open(os.path.join(input_dir, MANIFEST), encoding="utf-8") as file:
+        manifest = json.load(file)
+    problems = []
+    for table, entries in manifest["tables"].items():
+        for entry in entries.values():
+            path = os.path.join(input_dir, entry["file"])
+            if not os.path.exists(path):
+                problems.append(f"{table}: {entry['file']} is missing")
+            elif os.path.getsize(path) != entry["bytes"] or file_sha256(path) != entry["sha256"]:
+                problems.append(f"{table}: {entry['file']} does not match its checksum")
+    return problems
+
+
+def import_changes(input_dir, batch_size=1000):
+    """Applies the delta in input_dir in one transaction; returns the manifest.
+
+    Deleted keys are removed first, children before parents, then the changed rows are inserted
+    or updated in place, parents first. Foreign keys are only checked at commit, so a row may
+    refer to one that comes later in the delta. Deltas must be applied in order of their watermarks.
+    """
+    problems = verify_changes(input_dir)
+    if problems:
+        raise ValueError("; ".join(problems))
+    with open(os.path.join(input_dir, MANIFEST), encoding="utf-8") as file:
+        manifest = json.load(file)
+
+    conn = Database.connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        # Reset by the commit or rollback. ON DELETE actions still happen straight away.
+        cursor.execute("PRAGMA defer_foreign_keys = ON")
+        tables = [table for table in CHANGE_TRACKED_TABLES if table in manifest["tables"]]
+        for table in reversed(tables):
+            path = os.path.join(input_dir, manifest["tables"][table]["deleted"]["file"])
+            _apply(
+                cursor, _read_records(path, cursor, table),
+                lambda columns: f"DELETE FROM {table} WHERE {' AND '.join(f'{column} = ?' for column in columns)}",
+                batch_size,
+            )
+        for table in tables:
+            path = os.path.join(input_dir, manifest["tables"][table]["changed"]["file"])
+            _apply(cursor, _read_records(path, cursor, table), lambda columns: _upsert_statement(table, columns), batch_size)
+        conn.commit()
+        return manifest
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.close()
+
+
+def acknowledge_changes(consumer, watermark):
+    """Records that consumer has applied the changes up to watermark, then compacts the change log.
+
+    Returns the number of log entries removed: those up to the lowest watermark of all consumers.
+    """
+    conn = Database.connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        consumer_watermark(cursor, consumer)
+        cursor.execute(
+            "UPDATE ChangeConsumers SET Watermark = MAX(Watermark, ?) WHERE Name = ?", (watermark, consumer)
+        )
+        horizon = cursor.execute("SELECT MIN(Watermark) FROM ChangeConsumers").fetchone()[0]
+        cursor.execute("DELETE FROM ChangeLog WHERE Sequence <= ?", (horizon,))
+        removed = cursor.rowcount
+        cursor.execute("UPDATE ChangeLogState SET CompactedThrough = MAX(CompactedThrough, ?)", (horizon,))
+        conn.commit()
+        return removed
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export, import and acknowledge deltas of the change-tracked tables.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    register_parser = sub.add_parser("register", help="Add a consumer, starting at the latest change.")
+    register_parser.add_argument("consumer")
+    register_parser.add_argument("--watermark", type=int, help="Start here instead, e.g. a snapshot's change_sequence.")
+    export_parser = sub.add_parser("export")
+    export_parser.add_argument("output_dir")
+    since = export_parser.add_mutually_exclusive_group(required=True)
+    since.add_argument("--since", type=int)
+    since.add_argument("--consumer")
+    export_parser.add_argument("--format", choices=sorted(FORMATS), default="xml")
+    export_parser.add_argument("--gzip", action="store_true")
+    import_parser = sub.add_parser("import")
+    import_parser.add_argument("input_dir")
+    ack_parser = sub.add_parser("ack", help="Mark a delta as applied by a consumer and compact the change log.")
+    ack_parser.add_argument("consumer")
+    ack_parser.add_argument("delta", help="The delta's directory, or its 'until' watermark.")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "register":
+            print(f"{args.consumer} starts after change {register_consumer(args.consumer, args.watermark)}")
+        elif args.command == "export":
+            manifest = export_changes(args.output_dir, args.since, args.consumer, args.format, args.gzip)
+            rows = sum(entry["changed"]["rows"] for entry in manifest["tables"].values())
+            deleted = sum(entry["deleted"]["rows"] for entry in manifest["tables"].values())
+            print(f"Exported changes {manifest['since']}-{manifest['until']}: {rows} rows changed, {deleted} deleted")
+        elif args.command == "import":
+            manifest = import_changes(args.input_dir)
+            print(f"Applied changes {manifest['since']}-{manifest['until']} from {args.input_dir}")
+        else:
+            if os.path.isdir(args.delta):
+                with open(os.path.join(args.delta, MANIFEST), encoding="utf-8") as file:
+                    watermark = json.load(file)["until"]
+            else:
+                watermark = int(args.delta)
+            removed = acknowledge_changes(args.consumer, watermark)
+            print(f"{args.consumer} is at change {watermark}; {removed} change log entries compacted")
+    except (ValueError, sqlite3.Error) as e:
+        raise SystemExit(f"Error: {e}")
+    finally:
+        Database.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""Streaming export and import of tables as XML, CSV, JSON Lines or a compact binary columnar format.
+
+    python -m custom_xml_utils.formats export Customers customers.col.xz
+    python -m custom_xml_utils.formats import customers.jsonl.gz [--table Customers]
+
+The format comes from the file name (.xml, .csv, .jsonl or .col, optionally followed by .gz, .bz2
+or .xz for compression) unless it is given with --format. Every format is a Codec with the same two
+streaming methods, so no table or file is ever held whole: write() takes rows as they are fetched,
+and read() hands back records as the file is read. Imports go through XMLUtils.import_records, so
+every format gets the same batching, type conversion, index deferral and transaction handling as
+XMLUtils.import_from_xml.
+
+CSV has no way to mark NULL or binary data: an empty field imports as NULL, and BLOBs are written
+as base64 text and decoded again for columns declared BLOB.
+"""
+import abc
+import argparse
+import base64
+import csv
+import io
+import itertools
+import json
+import os
+import struct
+import sys
+from array import array
+
+from custom_xml_utils.xml_utils import (
+    XMLUtils, compression_extension, open_compressed, read_xml_records, write_xml_value,
+)
+from utils.database import Database
+
+
+class Codec(abc.ABC):
+    """A file format.
+
+    write(file, table_name, columns, rows) writes rows (tuples in column order) to a binary file and
+    returns how many it wrote. read(file) returns (table name, or None if the format does not record
+    it, records), records being an iterator of (column names, values) tuples that reads the rest of
+    the file as it is consumed.
+    """
+
+    name = None
+    extension = None
+    # Set when BLOBs are written as base64 text the format cannot mark, so imports decode BLOB columns.
+    base64_blobs = False
+
+    @abc.abstractmethod
+    def write(self, file, table_name, columns, rows):
+        pass
+
+    @abc.abstractmethod
+    def read(self, file):
+        pass
+
+
+class XMLCodec(Codec):
+    """The XMLUtils layout: <Table><record><Column>value</Column>...</record>...</Table>."""
+
+    name = "xml"
+    extension = ".xml"
+
+    def write(self, file, table_name, columns, rows):
+        count = 0
+        with io.TextIOWrapper(file, encoding="utf-8") as output:
+            output.write(f"<?xml version='1.0' encoding='utf-8'?>\n<{table_name}>\n")
+            for row in rows:
+                output.write("<record>")
+                for name, value in zip(columns, row):
+                    write_xml_value(output, name, value)
+                output.write("</record>\n")
+                count += 1
+            output.write(f"</{table_name}>\n")
+        return count
+
+    def read(self, file):
+        return read_xml_records(file)
+
+
+class CSVCodec(Codec):
+    """A header row of column names, then one row per record; the table name is not recorded."""
+
+    name = "csv"
+    extension = ".csv"
+    base64_blobs = True
+
+    def write(self, file, table_name, columns, rows):
+        count = 0
+        with io.TextIOWrapper(file, encoding="utf-8", newline="") as output:
+            writer = csv.writer(output)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow([
+                    base64.b64encode(value).decode("ascii") if isinstance(value, bytes) else value for value in row
+                ])
+                count += 1
+        return count
+
+    def read(self, file):
+        # Base64 images are far longer than csv's default 128 KB field limit (a process-wide setting).
+        csv.field_size_limit(max(csv.field_size_limit(), 2 ** 31 - 1))
+        reader = csv.reader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+        columns = tuple(next(reader, ()))
+
+        def records():
+            for row in reader:
+                yield columns, [value if value != "" else None for value in row]
+
+        return None, records()
+
+
+class JSONLCodec(Codec):
+    """A header object {"table": ..., "columns": [...]}, then one JSON array of values per line;
+    BLOBs are written as {"base64": "..."}."""
+
+    name = "jsonl"
+    extension = ".jsonl"
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, bytes):
+            return {"base64": base64.b64encode(value).decode("ascii")}
+        raise TypeError(f"Cannot write {type(value).__name__} as JSON")
+
+    @staticmethod
+    def _decode(values):
+        return [base64.b64decode(value["base64"]) if isinstance(value, dict) else value for value in values]
+
+    def write(self, file, table_name, columns, rows):
+        encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=self._encode)
+        count = 0
+        with io.TextIOWrapper(file, encoding="utf-8") as output:
+            output.write(encoder.encode({"table": table_name, "columns": list(columns)}) + "\n")
+            for row in rows:
+                output.write(encoder.encode(row) + "\n")
+                count += 1
+        return count
+
+    def read(self, file):
+        lines = io.TextIOWrapper(file, encoding="utf-8")
+        header = json.loads(next(lines, "{}") or "{}")
+        columns = tuple(header.get("columns", ()))
+
+        def records():
+            for line in lines:
+                if line.strip():
+                    values = json.loads(line)
+                    yield columns, self._decode(values) if any(isinstance(value, dict) for value in values) else values
+
+        return header.get("table"), records()
+
+
+# Column chunk kinds in the columnar format.
+NULLS, INTEGER, REAL, TEXT, BLOB, MIXED = range(6)
+# Integer widths, narrowest first; a chunk uses the narrowest that holds all its values.
+INTEGER_TYPECODES = [
+    (typecode, -(1 << (8 * array(typecode).itemsize - 1)), (1 << (8 * array(typecode).itemsize - 1)) - 1)
+    for typecode in "bhiq"
+]
+
+
+class ColumnarCodec(Codec):
+    """Binary format laid out by column, in blocks of BLOCK_ROWS rows, built with struct and array.
+
+    After the magic number and a header (table name and column names, each a length-prefixed UTF-8
+    string), each block is its row count followed by one chunk per column, and a zero row count ends
+    the file. A chunk is (kind, has-nulls flag, payload length), then a NULL bitmap if flagged,
+    then the payload: the values as the narrowest integer array that holds them, a double array,
+    or for text and BLOBs an array of lengths followed by the data. A column holding more than one
+    type in a block is written value by value, each with a type tag. All numbers are little-endian.
+    """
+
+    name = "columnar"
+    extension = ".col"
+    MAGIC = b"SQLCOL1\n"
+    BLOCK_ROWS = 4096
+
+    @staticmethod
+    def _array_bytes(values):
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values.tobytes()
+
+    @staticmethod
+    def _bytes_array(typecode, data):
+        values = array(typecode)
+        values.frombytes(data)
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    @staticmethod
+    def _string(value):
+        data = value.encode("utf-8")
+        return struct.pack("<H", len(data)) + data
+
+    @staticmethod
+    def _read_exactly(file, size):
+        data = file.read(size)
+        if len(data) != size:
+            raise ValueError("Columnar file is truncated")
+        return data
+
+    @classmethod
+    def _read_string(cls, file):
+        (size,) = struct.unpack("<H", cls._read_exactly(file, 2))
+        return cls._read_exactly(file, size).decode("utf-8")
+
+    @classmethod
+    def _encode_column(cls, values):
+        """Returns (kind, NULL bitmap or None, payload) for one column of a block."""
+        types = {type(value) for value in values if value is not None}
+        if len(types) > 1 or not types <= {int, float, str, bytes}:
+            payload = bytearray()
+            for value in values:
+                if value is None:
+                    payload += b"n"
+                elif isinstance(value, int):
+                    payload += b"i" + struct.pack("<q", value)
+                elif isinstance(value, float):
+                    payload += b"f" + struct.pack("<d", value)
+                else:
+                    data = value.encode("utf-8") if isinstance(value, str) else bytes(value)
+                    payload += (b"t" if isinstance(value, str) else b"b") + struct.pack("<I", len(data)) + data
+            return MIXED, None, bytes(payload)
+
+        nulls = None
+        if any(value is None for value in values):
+            nulls = bytearray((len(values) + 7) // 8)
+            for position, value in enumerate(values):
+                if value is None:
+                    nulls[position >> 3] |= 1 << (position & 7)
+        present = [value for value in values if value is not None]
+        if not present:
+            return NULLS, nulls, b""
+
+        first = present[0]
+        if isinstance(first, int):
+            low, high = min(present), max(present)
+            typecode = next(code for code, smallest, largest in INTEGER_TYPECODES if smallest <= low and high <= largest)
+            filled = [0 if value is None else value for value in values]
+            return INTEGER, nulls, typecode.encode("ascii") + cls._array_bytes(array(typecode, filled))
+        if isinstance(first, float):
+            return REAL, nulls, cls._array_bytes(array("d", [0.0 if value is None else value for value in values]))
+        if isinstance(first, str):
+            # Lengths in characters, so the whole chunk is decoded in one go and then sliced.
+            lengths = array("I", [0 if value is None else len(value) for value in values])
+            return TEXT, nulls, cls._array_bytes(lengths) + "".join(present).encode("utf-8")
+        lengths = array("I", [0 if value is None else len(value) for value in values])
+        return BLOB, nulls, cls._array_bytes(lengths) + b"".join(present)
+
+    @classmethod
+    def _decode_column(cls, kind, count, nulls, payload):
+        if kind == MIXED:
+            values, position = [], 0
+            while position < len(payload):
+                tag = payload[position:position + 1]
+                position += 1
+                if tag == b"n":
+                    values.append(None)
+                elif tag in (b"i", b"f"):
+                    values.append(struct.unpack_from("<q" if tag == b"i" else "<d", payload, position)[0])
+                    position += 8
+                else:
+                    (size,) = struct.unpack_from("<I", payload, position)
+                    data = payload[position + 4:position + 4 + size]
+                    values.append(data.decode("utf-8") if tag == b"t" else bytes(data))
+                    position += 4 + size
+            return values
+
+        if kind == NULLS:
+            values = [None] * count
+        elif kind == INTEGER:
+            values = cls._bytes_array(chr(payload[0]), payload[1:]).tolist()
+        elif kind == REAL:
+            values = cls._bytes_array("d", payload).tolist()
+        else:
+            lengths = cls._bytes_array("I", payload[:4 * count])
+            data = payload[4 * count:]
+            if kind == TEXT:
+                data = data.decode("utf-8")
+            ends = list(itertools.accumulate(lengths))
+            values = [data[end - length:end] for end, length in zip(ends, lengths)]
+        if nulls is not None:
+            for position in range(count):
+                if nulls[position >> 3] >> (position & 7) & 1:
+                    values[position] = None
+        return values
+
+    def write(self, file, table_name, columns, rows):
+        file.write(self.MAGIC + self._string(table_name) + struct.pack("<H", len(columns)))
+        for column in columns:
+            file.write(self._string(column))
+        count = 0
+        rows = iter(rows)
+        while True:
+            block = list(itertools.islice(rows, self.BLOCK_ROWS))
+            if not block:
+                break
+            file.write(struct.pack("<I", len(block)))
+            for values in zip(*block):
+                kind, nulls, payload = self._encode_column(values)
+                file.write(struct.pack("<BBI", kind, nulls is not None, len(payload)))
+                if nulls is not None:
+                    file.write(nulls)
+                file.write(payload)
+            count += len(block)
+        file.write(struct.pack("<I", 0))
+        return count
+
+    def read(self, file):
+        if self._read_exactly(file, len(self.MAGIC)) != self.MAGIC:
+            raise ValueError("Not a columnar export file")
+        table_name = self._read_string(file)
+        (column_count,) = struct.unpack("<H", self._read_exactly(file, 2))
+        columns = tuple(self._read_string(file) for _ in range(column_count))
+
+        def records():
+            while True:
+                (count,) = struct.unpack("<I", self._read_exactly(file, 4))
+                if not count:
+                    return
+                block = []
+                for _ in columns:
+                    kind, has_nulls, size = struct.unpack("<BBI", self._read_exactly(file, 6))
+                    nulls = self._read_exactly(file, (count + 7) // 8) if has_nulls else None
+                    block.append(self._decode_column(kind, count, nulls, self._read_exactly(file, size)))
+                for values in zip(*block):
+                    yield columns, values
+
+        return table_name, records()
+
+
+FORMATS = {codec.name: codec for codec in (XMLCodec(), CSVCodec(), JSONLCodec(), ColumnarCodec())}
+
+
+def codec_for(path, format=None):
+    """The codec named format, or else the one whose extension path ends with (before any compression extension)."""
+    if format:
+        return FORMATS[format]
+    stem = path[:len(path) - len(compression_extension(path))]
+    for codec in FORMATS.values():
+        if stem.endswith(codec.extension):
+            return codec
+    raise ValueError(f"Cannot tell the format of {path}; name it .xml, .csv, .jsonl or .col, or give the format.")
+
+
+def fetch_rows(cursor, chunk_size):
+    while True:
+        chunk = cursor.fetchmany(chunk_size)
+        if not chunk:
+            return
+        yield from chunk
+
+
+def export_table(table_name, output_file, format=None, chunk_size=1000):
+    """Exports a table to output_file from one read transaction, chunk_size rows at a time; returns the row count."""
+    codec = codec_for(output_file, format)
+    conn = Database.connect()
+    cursor = conn.cursor()
+    try:
+        columns = [column[1] for column in cursor.execute(f"PRAGMA table_info({table_name})").fetchall()]
+        if not columns:
+            raise ValueError(f"No such table: {table_name}")
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute(f"SELECT {', '.join(columns)} FROM {table_name}")
+            with open_compressed(output_file, "wb") as file:
+                return codec.write(file, table_name, columns, fetch_rows(cursor, chunk_size))
+        finally:
+            conn.rollback()
+    finally:
+        conn.close()
+
+
+def import_table(input_file, table_name=None, format=None, batch_size=1000, checkpoint=None, defer_indexes=None):
+    """Imports input_file into table_name, by default the table the file names or, for CSV, the file
+    name up to its first dot; returns the row count. See XMLUtils.import_records for the options."""
+    codec = codec_for(input_file, format)
+    with open_compressed(input_file) as file:
+        file_table, records = codec.read(file)
+        table_name = table_name or file_table or os.path.basename(input_file).split(".")[0]
+        return XMLUtils.import_records(
+            table_name, records, batch_size, checkpoint, defer_indexes, base64_blobs=codec.base64_blobs
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import a table as XML, CSV, JSON Lines or columnar.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_parser = sub.add_parser("export")
+    export_parser.add_argument("table")
+    export_parser.add_argument("output_file")
+    export_parser.add_argument("--format", choices=sorted(FORMATS))
+    import_parser = sub.add_parser("import")
+    import_parser.add_argument("input_file")
+    import_parser.add_argument("--table", help="Target table (default: from the file).")
+    import_parser.add_argument("--format", choices=sorted(FORMATS))
+    import_parser.add_argument("--checkpoint", type=int, help="Commit every N rows instead of once.")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        rows = export_table(args.table, args.output_file, args.format)
+        print(f"Exported {rows} rows of {args.table} to {args.output_file}")
+    else:
+        rows = import_table(args.input_file, args.table, args.format, checkpoint=args.checkpoint)
+        print(f"Imported {rows} rows from {args.input_file}")
+    Database.close_pool()
+
+
+if __name__ == "__main__":
+    main()
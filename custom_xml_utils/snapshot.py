@@ -0,0 +1,167 @@
+"""Consistent export of every table in the database, one XML file per table plus a manifest.
+
+    python -m custom_xml_utils.snapshot backups/2025-01-31 [--workers 4] [--gzip]
+    python -m custom_xml_utils.snapshot --verify backups/2025-01-31
+
+Exporting tables one by one with XMLUtils.export_to_xml gives each table its own point in time, so
+an order can be in the Orders file without its lines in CustomerOrders. Here the database is first
+copied with the SQLite backup API in a single step, which reads it in one transaction: the copy is
+one point in time, and in WAL mode tills keep writing while it is taken. The tables are then
+exported from that frozen copy by worker processes in parallel, largest first, and the copy is
+deleted. manifest.json lists every file with its row count, size and SHA-256, and the change
+sequence the snapshot was taken at, from which custom_xml_utils.delta exports can carry it forward.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from custom_xml_utils.xml_utils import XMLUtils
+from utils.database import Database
+from utils.schema import change_sequence
+
+MANIFEST = "manifest.json"
+
+
+def take_snapshot(path):
+    """Copies the database to path in one backup step, i.e. one read transaction."""
+    source = Database.connect()
+    target = sqlite3.connect(path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def snapshot_tables(path):
+    """The snapshot's tables, largest first; SQLite's own tables and FTS index tables are left out."""
+    conn = sqlite3.connect(path)
+    try:
+        virtual = [name for name, in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE 'CREATE VIRTUAL TABLE%'"
+        )]
+        tables = [
+            name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")
+            if not name.startswith("sqlite_") and name not in virtual
+            and not any(name.startswith(f"{table}_") for table in virtual)
+        ]
+        try:
+            sizes = dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"))
+        except sqlite3.OperationalError:
+            # SQLite built without the dbstat table: keep the name order.
+            sizes = {}
+        return sorted(tables, key=lambda table: -sizes.get(table, 0))
+    finally:
+        conn.close()
+
+
+def file_sha256(path):
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+def export_table(snapshot_path, table_name, output_file):
+    """Worker: exports one table of the snapshot; returns its manifest entry."""
+    Database.DB_PATH = snapshot_path
+    try:
+        rows = XMLUtils.export_to_xml(table_name, output_file)
+    finally:
+        Database.close_pool()
+    if rows is None:
+        raise RuntimeError(f"Exporting {table_name} failed")
+    return {
+        "file": os.path.basename(output_file),
+        "rows": rows,
+        "bytes": os.path.getsize(output_file),
+        "sha256": file_sha256(output_file),
+    }
+
+
+def export_snapshot(output_dir, workers=None, compress=False):
+    """Exports every table as of one moment to output_dir; returns the manifest (also written as manifest.json)."""
+    os.makedirs(output_dir, exist_ok=True)
+    fd, snapshot_path = tempfile.mkstemp(prefix="snapshot-", suffix=".db", dir=output_dir)
+    os.close(fd)
+    try:
+        take_snapshot(snapshot_path)
+        taken_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        conn = sqlite3.connect(snapshot_path)
+        try:
+            schema_version = conn.execute("SELECT MAX(Version) FROM SchemaVersion").fetchone()[0]
+            # Where deltas of the change-tracked tables pick up from (see custom_xml_utils.delta).
+            sequence = change_sequence(conn.cursor())
+        finally:
+            conn.close()
+        manifest = {
+            "taken_at": taken_at, "database": Database.DB_PATH, "schema_version": schema_version,
+            "change_sequence": sequence, "tables": {},
+        }
+
+        tables = snapshot_tables(snapshot_path)
+        extension = ".xml.gz" if compress else ".xml"
+        # Spawned, not forked: the caller may be running Tk and the database threads.
+        with ProcessPoolExecutor(
+            max_workers=workers or min(os.cpu_count() or 1, len(tables)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = {
+                table: executor.submit(export_table, snapshot_path, table, os.path.join(output_dir, table + extension))
+                for table in tables
+            }
+            for table in sorted(tables):
+                manifest["tables"][table] = futures[table].result()
+
+        manifest_path = os.path.join(output_dir, MANIFEST)
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(manifest_path + ".tmp", manifest_path)
+        return manifest
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(snapshot_path + suffix):
+                os.remove(snapshot_path + suffix)
+
+
+def verify_snapshot(output_dir):
+    """Checks the files in output_dir against its manifest; returns a list of problems, empty if none."""
+    with open(os.path.join(output_dir, MANIFEST), encoding="utf-8") as file:
+        manifest = json.load(file)
+    problems = []
+    for table, entry in manifest["tables"].items():
+        path = os.path.join(output_dir, entry["file"])
+        if not os.path.exists(path):
+            problems.append(f"{table}: {entry['file']} is missing")
+        elif os.path.getsize(path) != entry["bytes"] or file_sha256(path) != entry["sha256"]:
+            problems.append(f"{table}: {entry['file']} does not match its checksum")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export every table from one consistent snapshot of the database.")
+    parser.add_argument("output_dir")
+    parser.add_argument("--workers", type=int, help="Export processes (default: one per core, at most one per table).")
+    parser.add_argument("--gzip", action="store_true", help="Write .xml.gz files.")
+    parser.add_argument("--verify", action="store_true", help="Check an existing export against its manifest instead.")
+    args = parser.parse_args()
+
+    if args.verify:
+        problems = verify_snapshot(args.output_dir)
+        for problem in problems:
+            print(problem)
+        print("Snapshot OK" if not problems else f"{len(problems)} problem(s) found")
+        raise SystemExit(1 if problems else 0)
+
+    manifest = export_snapshot(args.output_dir, args.workers, args.gzip)
+    Database.close_pool()
+    rows = sum(entry["rows"] for entry in manifest["tables"].values())
+    print(f"Exported {len(manifest['tables'])} tables, {rows} rows, to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
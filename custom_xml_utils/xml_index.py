@@ -0,0 +1,126 @@
+import os
+import sqlite3
+
+from custom_xml_utils.xml_utils import compression_extension, scan_records
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Source (
+    MTimeNs INTEGER NOT NULL,
+    Size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS Fields (
+    Name TEXT PRIMARY KEY
+);
+-- One row per record that has the field: its value and the byte offsets of the record's start and end tags.
+CREATE TABLE IF NOT EXISTS Entries (
+    Field TEXT NOT NULL,
+    Start INTEGER NOT NULL,
+    EndTag INTEGER NOT NULL,
+    Value,
+    PRIMARY KEY (Field, Start)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_entries_value ON Entries(Field, Value);
+"""
+
+
+class XMLIndex:
+    """Sidecar index of an XML file in the XMLUtils layout, kept next to it in <file>.idx (an SQLite file).
+
+    For every field it has been asked about it maps values to the byte offsets of the records that
+    hold them, so a point lookup is a B-tree search and a seek rather than a parse of the whole file,
+    and a field's values can be listed without reading the file at all. A field is indexed by one
+    scan of the file the first time it is used. The index remembers the file's modification time
+    and size and is emptied and rebuilt, field by field, as soon as either changes.
+
+    Offsets into a compressed stream cannot be seeked to, so compressed files are not indexed.
+    """
+
+    SUFFIX = ".idx"
+
+    def __init__(self, xml_path):
+        if compression_extension(xml_path):
+            raise ValueError(f"Compressed XML files cannot be indexed: {xml_path}")
+        self.xml_path = xml_path
+        self.path = xml_path + self.SUFFIX
+
+    def _connect(self):
+        """Opens the index, emptying it first if the XML file has changed since it was built."""
+        conn = sqlite3.connect(self.path, isolation_level=None)
+        # The index can always be rebuilt from the file, so it is not worth an fsync per write.
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SCHEMA)
+        stat = os.stat(self.xml_path)
+        source = (stat.st_mtime_ns, stat.st_size)
+        if conn.execute("SELECT MTimeNs, Size FROM Source").fetchone() != source:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Checked again under the write lock, in case another process has just rebuilt it.
+                if conn.execute("SELECT MTimeNs, Size FROM Source").fetchone() != source:
+                    conn.execute("DELETE FROM Entries")
+                    conn.execute("DELETE FROM Fields")
+                    conn.execute("DELETE FROM Source")
+                    conn.execute("INSERT INTO Source (MTimeNs, Size) VALUES (?, ?)", source)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                conn.close()
+                raise
+        return conn
+
+    def _ensure_field(self, conn, field_name):
+        if conn.execute("SELECT 1 FROM Fields WHERE Name = ?", (field_name,)).fetchone():
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if not conn.execute("SELECT 1 FROM Fields WHERE Name = ?", (field_name,)).fetchone():
+                conn.executemany(
+                    "INSERT INTO Entries (Field, Start, EndTag, Value) VALUES (?, ?, ?, ?)",
+                    self._entries(field_name),
+                )
+                conn.execute("INSERT INTO Fields (Name) VALUES (?)", (field_name,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _entries(self, field_name):
+        for columns, values, start, end_tag in scan_records(self.xml_path):
+            if field_name in columns:
+                yield field_name, start, end_tag, values[columns.index(field_name)]
+
+    def build(self, *field_names):
+        """Indexes field_names now rather than on first use."""
+        conn = self._connect()
+        try:
+            for field_name in field_names:
+                self._ensure_field(conn, field_name)
+        finally:
+            conn.close()
+
+    def lookup(self, field_name, value):
+        """(start, end_tag) offsets of the records whose field_name is value, in file order."""
+        conn = self._connect()
+        try:
+            self._ensure_field(conn, field_name)
+            if value is None:
+                rows = conn.execute(
+                    "SELECT Start, EndTag FROM Entries WHERE Field = ? AND Value IS NULL ORDER BY Start", (field_name,)
+                )
+            else:
+                rows = conn.execute(
+                    "SELECT Start, EndTag FROM Entries WHERE Field = ? AND Value = ? ORDER BY Start", (field_name, value)
+                )
+            return rows.fetchall()
+        finally:
+            conn.close()
+
+    def values(self, field_name):
+        """field_name's value in every record that has it, in file order."""
+        conn = self._connect()
+        try:
+            self._ensure_field(conn, field_name)
+            return [row[0] for row in conn.execute(
+                "SELECT Value FROM Entries WHERE Field = ? ORDER BY Start", (field_name,)
+            )]
+        finally:
+            conn.close()
@@ -1,89 +1,589 @@
+import base64
+import bz2
+import gzip
+import io
+import lzma
+import os
+import re
+import shutil
 import sqlite3
+import tempfile
 import xml.etree.ElementTree as ET
+import xml.parsers.expat
+from xml.sax.saxutils import escape
+
+from utils.database import Database
+
+# Bytes of BLOB read per step; a multiple of 3 so the base64 pieces join into one valid encoding.
+BLOB_READ_SIZE = 3 * 64 * 1024
+# Base64 image data barely compresses further at higher levels; level 1 is about 30% faster than 9
+# for a file about 2% larger.
+GZIP_LEVEL = 1
+# Bytes of XML fed to the parser per step when importing or scanning.
+XML_READ_SIZE = 64 * 1024
+
+REAL_PATTERN = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?")
+INTEGER_RANGE = range(-2 ** 63, 2 ** 63)
+# Stands for an absent field; equal to no value, None included.
+MISSING = object()
+
+
+# File name endings that mean a compressed file, and how to open one.
+COMPRESSORS = {
+    ".gz": lambda path, mode: gzip.open(path, mode, compresslevel=GZIP_LEVEL),
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+}
+
+
+def compression_extension(path):
+    """".gz", ".bz2" or ".xz" when path names a compressed file, else ""."""
+    return next((extension for extension in COMPRESSORS if path.endswith(extension)), "")
+
+
+def open_compressed(path, mode="rb"):
+    """Opens a file in binary mode, compressed or decompressed by the extension its name ends with."""
+    extension = compression_extension(path)
+    if extension:
+        return COMPRESSORS[extension](path, mode)
+    return open(path, mode)
+
+
+def column_affinity(declared_type):
+    """SQLite's affinity for a declared column type, by the rules in https://sqlite.org/datatype3.html."""
+    declared = (declared_type or "").upper()
+    if "INT" in declared:
+        return "INTEGER"
+    if "CHAR" in declared or "CLOB" in declared or "TEXT" in declared:
+        return "TEXT"
+    if not declared or "BLOB" in declared:
+        return "BLOB"
+    if "REAL" in declared or "FLOA" in declared or "DOUB" in declared:
+        return "REAL"
+    return "NUMERIC"
+
+
+def to_numeric(text):
+    """Converts text the way INTEGER and NUMERIC affinity would: integers, then reals (whole ones as
+    integers), leaving anything else as text."""
+    try:
+        value = int(text)
+    except ValueError:
+        value = None
+    # int() also accepts digit separators, which SQLite does not.
+    if value is not None and "_" not in text:
+        return value if value in INTEGER_RANGE else float(value)
+    stripped = text.strip()
+    if REAL_PATTERN.fullmatch(stripped):
+        value = float(stripped)
+        return int(value) if value.is_integer() and int(value) in INTEGER_RANGE else value
+    return text
+
+
+def to_real(text):
+    stripped = text.strip()
+    return float(stripped) if REAL_PATTERN.fullmatch(stripped) else text
+
+
+CONVERTERS = {"INTEGER": to_numeric, "NUMERIC": to_numeric, "REAL": to_real, "TEXT": str, "BLOB": str}
+
+
+class RecordReader:
+    """XMLParser target that turns <Table><record><Column>value</Column>...</record>...</Table> into
+    (column names, values) tuples as the file is fed in, without building elements for it.
+
+    Values are the element text, None for an empty element, or bytes for one marked encoding="base64".
+    Completed records collect in records until the caller takes them.
+    """
+
+    def __init__(self):
+        self.table_name = None
+        self.records = []
+        self._depth = 0
+        self._columns = []
+        self._values = []
+        self._text = []
+        self._base64 = False
+
+    def start(self, tag, attrib):
+        self._depth += 1
+        if self._depth == 3:
+            self._text = []
+            self._base64 = attrib.get("encoding") == "base64"
+        elif self._depth == 1:
+            self.table_name = tag
+
+    def data(self, data):
+        if self._depth == 3:
+            self._text.append(data)
+
+    def end(self, tag):
+        if self._depth == 3:
+            value = "".join(self._text) if self._text else None
+            if self._base64:
+                value = base64.b64decode(value or "")
+            self._columns.append(tag)
+            self._values.append(value)
+        elif self._depth == 2:
+            self.records.append((tuple(self._columns), self._values))
+            self._columns, self._values = [], []
+        self._depth -= 1
+
+    def close(self):
+        return self.table_name
+
+
+class RecordSpanReader(RecordReader):
+    """RecordReader driven by pyexpat directly, so it can also note where each record is in the
+    file: spans[i] is (byte offset of the record's start tag, byte offset of its end tag) for records[i]."""
+
+    def __init__(self):
+        super().__init__()
+        self.spans = []
+        self._start = None
+        self.parser = xml.parsers.expat.ParserCreate()
+        self.parser.buffer_text = True
+        self.parser.StartElementHandler = self.start
+        self.parser.CharacterDataHandler = self.data
+        self.parser.EndElementHandler = self.end
+
+    # start and end repeat RecordReader's rather than calling it: they run for every element.
+    def start(self, tag, attrib):
+        self._depth += 1
+        if self._depth == 3:
+            self._text = []
+            self._base64 = attrib.get("encoding") == "base64"
+        elif self._depth == 2:
+            self._start = self.parser.CurrentByteIndex
+        elif self._depth == 1:
+            self.table_name = tag
+
+    def end(self, tag):
+        if self._depth == 3:
+            value = "".join(self._text) if self._text else None
+            if self._base64:
+                value = base64.b64decode(value or "")
+            self._columns.append(tag)
+            self._values.append(value)
+        elif self._depth == 2:
+            self.records.append((tuple(self._columns), self._values))
+            self.spans.append((self._start, self.parser.CurrentByteIndex))
+            self._columns, self._values = [], []
+        self._depth -= 1
+
+
+def scan_records(path):
+    """Yields (columns, values, start, end_tag) for every record of an XML file, reading it a piece at a
+    time; start and end_tag are the byte offsets (uncompressed, for compressed files) of the record's tags."""
+    reader = RecordSpanReader()
+    with open_compressed(path) as file:
+        while True:
+            chunk = file.read(XML_READ_SIZE)
+            reader.parser.Parse(chunk, not chunk)
+            for (columns, values), (start, end_tag) in zip(reader.records, reader.spans):
+                yield columns, values, start, end_tag
+            reader.records.clear()
+            reader.spans.clear()
+            if not chunk:
+                return
+
+
+def write_xml_value(output, name, value):
+    """Writes one column of a record: empty for NULL, base64 for a BLOB, escaped text otherwise."""
+    if value is None:
+        output.write(f"<{name} />")
+    elif isinstance(value, bytes):
+        output.write(f'<{name} encoding="base64">{base64.b64encode(value).decode("ascii")}</{name}>')
+    else:
+        output.write(f"<{name}>{escape(str(value))}</{name}>")
+
+
+def read_xml_records(file):
+    """Reads an XML file in the XMLUtils layout a piece at a time; returns (table name, records), records
+    being an iterator of (column names, values) tuples that reads the rest of the file as it is consumed."""
+    reader = RecordReader()
+    parser = ET.XMLParser(target=reader)
+    # Read as far as the root element, so the table is known before any record is asked for.
+    while reader.table_name is None:
+        chunk = file.read(XML_READ_SIZE)
+        if not chunk:
+            parser.close()
+            break
+        parser.feed(chunk)
+
+    def records():
+        while True:
+            chunk = file.read(XML_READ_SIZE)
+            if chunk:
+                parser.feed(chunk)
+            else:
+                parser.close()
+            yield from reader.records
+            reader.records.clear()
+            if not chunk:
+                return
+
+    return reader.table_name, records()
+
+
+def field_value(columns, values, field_name):
+    """The value of a record's first field_name element, as find() would pick it, or MISSING if it has none."""
+    try:
+        return values[columns.index(field_name)]
+    except ValueError:
+        return MISSING
+
+
+def read_record(file, length):
+    """Reads one record's XML from file, positioned at its start tag; length is the distance to its end tag."""
+    data = file.read(length)
+    end_tag = bytearray()
+    while not end_tag.endswith(b">"):
+        byte = file.read(1)
+        if not byte:
+            break
+        end_tag += byte
+    return data + bytes(end_tag)
+
+
+def record_dict(data):
+    """{column: value} for one record's XML, BLOBs decoded."""
+    return {
+        child.tag: base64.b64decode(child.text or "") if child.get("encoding") == "base64" else child.text
+        for child in ET.fromstring(data)
+    }
+
 
 class XMLUtils:
+    # (database path, lower-cased table name) -> (schema version, PRAGMA table_info rows); see _column_converters.
+    _table_info = {}
+
     @staticmethod
-    def export_to_xml(table_name, output_file):
-        """Exports a table's data to an XML file."""
-        conn = sqlite3.connect("database/autodatabase.db")
+    def _export_columns(cursor, table_name):
+        """Returns (column names, BLOB column names, select list); BLOB columns are selected as
+        typeof() and, when not actually a BLOB, their value, so BLOBs can be streamed by rowid."""
+        columns = cursor.execute(f"PRAGMA table_info({table_name})").fetchall()
+        if not columns:
+            raise sqlite3.OperationalError(f"no such table: {table_name}")
+        column_names = [column[1] for column in columns]
+        blob_columns = {column[1] for column in columns if column[2].upper() == "BLOB"}
+        select = ["rowid"]
+        for name in column_names:
+            if name in blob_columns:
+                select += [f"typeof({name})", f"CASE WHEN typeof({name}) = 'blob' THEN NULL ELSE {name} END"]
+            else:
+                select.append(name)
+        return column_names, blob_columns, select
+
+    @staticmethod
+    def _write_blob(output, conn, table_name, column, rowid):
+        with conn.blobopen(table_name, column, rowid, readonly=True) as blob:
+            while True:
+                data = blob.read(BLOB_READ_SIZE)
+                if not data:
+                    break
+                output.write(base64.b64encode(data).decode("ascii"))
+
+    @staticmethod
+    def _write_record(output, conn, table_name, column_names, blob_columns, row):
+        rowid, position = row[0], 1
+        output.write("<record>")
+        for name in column_names:
+            if name in blob_columns:
+                kind, value = row[position], row[position + 1]
+                position += 2
+                if kind == "blob":
+                    output.write(f'<{name} encoding="base64">')
+                    XMLUtils._write_blob(output, conn, table_name, name, rowid)
+                    output.write(f"</{name}>")
+                    continue
+            else:
+                value = row[position]
+                position += 1
+
+            write_xml_value(output, name, value)
+        output.write("</record>\n")
+
+    @staticmethod
+    def export_to_xml(table_name, output_file, chunk_size=1000, compress=None):
+        """Exports a table's data to an XML file, streaming it so memory use does not grow with the table.
+
+        Rows are fetched chunk_size at a time inside one read transaction and written as they
+        arrive. BLOBs are written base64-encoded, marked encoding="base64", and read from the
+        database piece by piece. By default the file is compressed when output_file ends in .gz,
+        .bz2 or .xz; compress=True gzips it whatever its name, False never compresses it. Returns
+        the number of rows exported.
+        """
+        if compress is None:
+            open_output = open_compressed
+        elif compress:
+            open_output = COMPRESSORS[".gz"]
+        else:
+            open_output = open
+        conn = Database.connect()
         cursor = conn.cursor()
 
         try:
-            cursor.execute(f"SELECT * FROM {table_name}")
-            rows = cursor.fetchall()
-            column_names = [description[0] for description in cursor.description]
-
-            root = ET.Element(table_name)
-            for row in rows:
-                record = ET.SubElement(root, "record")
-                for col_name, col_value in zip(column_names, row):
-                    element = ET.SubElement(record, col_name)
-                    element.text = str(col_value) if col_value is not None else ""
-
-            tree = ET.ElementTree(root)
-            tree.write(output_file)
+            column_names, blob_columns, select = XMLUtils._export_columns(cursor, table_name)
+            rows = 0
+            # One read transaction, so the rows and the BLOBs streamed by rowid come from the same snapshot.
+            cursor.execute("BEGIN")
+            try:
+                with open_output(output_file, "wb") as raw, \
+                        io.TextIOWrapper(raw, encoding="utf-8") as output:
+                    output.write(f"<?xml version='1.0' encoding='utf-8'?>\n<{table_name}>\n")
+                    cursor.execute(f"SELECT {', '.join(select)} FROM {table_name}")
+                    while True:
+                        chunk = cursor.fetchmany(chunk_size)
+                        if not chunk:
+                            break
+                        for row in chunk:
+                            XMLUtils._write_record(output, conn, table_name, column_names, blob_columns, row)
+                        rows += len(chunk)
+                    output.write(f"</{table_name}>\n")
+            finally:
+                conn.rollback()
             print(f"Exported {table_name} to {output_file}")
+            return rows
         except sqlite3.Error as e:
             print(f"Error exporting to XML: {e}")
         finally:
             conn.close()
 
     @staticmethod
-    def import_from_xml(input_file):
-        """Imports data from an XML file into the database."""
-        tree = ET.parse(input_file)
-        root = tree.getroot()
-        table_name = root.tag
+    def _column_converters(cursor, table_name, base64_blobs=False):
+        """Returns {lower-cased column name: converter} for a table, from PRAGMA table_info read once per
+        schema version. With base64_blobs, text in columns declared BLOB is decoded from base64."""
+        key = (Database.DB_PATH, table_name.lower())
+        schema_version = cursor.execute("PRAGMA schema_version").fetchone()[0]
+        cached = XMLUtils._table_info.get(key)
+        if cached is None or cached[0] != schema_version:
+            columns = cursor.execute(f"PRAGMA table_info({table_name})").fetchall()
+            if not columns:
+                raise sqlite3.OperationalError(f"no such table: {table_name}")
+            cached = XMLUtils._table_info[key] = (schema_version, columns)
+        return {
+            column[1].lower(): base64.b64decode if base64_blobs and "BLOB" in column[2].upper()
+            else CONVERTERS[column_affinity(column[2])]
+            for column in cached[1]
+        }
+
+    @staticmethod
+    def _record_converters(table_name, converters, columns):
+        missing = [column for column in columns if column.lower() not in converters]
+        if missing:
+            raise sqlite3.OperationalError(f"table {table_name} has no column named {missing[0]}")
+        return [converters[column.lower()] for column in columns]
+
+    @staticmethod
+    def _deferrable_indexes(cursor, table_name):
+        """Returns (name, sql) of the table's indexes that can be dropped for a bulk load and rebuilt after it.
+
+        UNIQUE indexes are kept, since they enforce constraints while the rows go in, and so is
+        every index if a trigger on the table queries the table itself (as PreventDuplicateEmployee
+        does), since without them the trigger would scan the table for every row.
+        """
+        reads_table = re.compile(rf"\b(FROM|JOIN)\s+{re.escape(table_name)}\b", re.IGNORECASE)
+        triggers = cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ? COLLATE NOCASE", (table_name,)
+        ).fetchall()
+        if any(reads_table.search(sql) for sql, in triggers):
+            return []
+        return cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? COLLATE NOCASE "
+            "AND sql IS NOT NULL AND sql NOT LIKE 'CREATE UNIQUE%'",
+            (table_name,),
+        ).fetchall()
+
+    @staticmethod
+    def _insert_batches(cursor, table_name, batches):
+        """Inserts and empties every queued batch, in the order their column sets were first seen; returns the row count."""
+        rows = 0
+        for columns, values in batches.items():
+            if columns:
+                statement = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+            else:
+                statement = f"INSERT INTO {table_name} DEFAULT VALUES"
+            cursor.executemany(statement, values)
+            rows += len(values)
+        batches.clear()
+        return rows
+
+    @staticmethod
+    def import_records(table_name, records, batch_size=1000, checkpoint=None, defer_indexes=None, base64_blobs=False):
+        """Inserts (column names, values) records into table_name; returns the number of rows inserted.
+
+        This is the import side shared by every file format (see custom_xml_utils.formats). Records
+        with the same columns are inserted together, batch_size at a time, with executemany; text
+        values are converted to their column's type (INTEGER, REAL, NUMERIC or TEXT affinity, from
+        PRAGMA table_info cached per schema version), and with base64_blobs, text in BLOB columns is
+        decoded from base64. Records are consumed as they are inserted, so an iterator that reads
+        its file lazily keeps memory use flat.
 
-        conn = sqlite3.connect("database/autodatabase.db")
+        The import is one transaction, all or nothing, unless checkpoint is given: then it commits
+        after every checkpoint rows (at the next batch), so other writers are not held off for the
+        whole file, and a failure keeps the rows committed before it. A single-transaction import
+        into an empty table drops the table's secondary indexes and rebuilds them once at the end,
+        which is much faster than updating them row by row; defer_indexes=True does this for a
+        table that already has rows, False never does. sqlite3 errors are raised.
+        """
+        conn = Database.connect()
         cursor = conn.cursor()
 
         try:
-            for record in root:
-                columns = [child.tag for child in record]
-                values = [child.text for child in record]
-                placeholders = ", ".join(["?" for _ in columns])
-                cursor.execute(
-                    f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})",
-                    values,
-                )
+            converters = XMLUtils._column_converters(cursor, table_name, base64_blobs)
+            cursor.execute("BEGIN IMMEDIATE")
+            deferred = []
+            if checkpoint is None and defer_indexes is not False:
+                if defer_indexes or not cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {table_name})").fetchone()[0]:
+                    deferred = XMLUtils._deferrable_indexes(cursor, table_name)
+            for name, _ in deferred:
+                cursor.execute(f"DROP INDEX {name}")
+
+            batches = {}
+            # Converters per column set, looked up once rather than for every value.
+            record_converters = {}
+            queued = rows = committed = 0
+            for columns, values in records:
+                if columns not in record_converters:
+                    record_converters[columns] = XMLUtils._record_converters(table_name, converters, columns)
+                batches.setdefault(columns, []).append([
+                    convert(value) if value.__class__ is str else value
+                    for convert, value in zip(record_converters[columns], values)
+                ])
+                queued += 1
+                if queued < batch_size:
+                    continue
+
+                rows += XMLUtils._insert_batches(cursor, table_name, batches)
+                queued = 0
+                if checkpoint and rows - committed >= checkpoint:
+                    conn.commit()
+                    committed = rows
+                    cursor.execute("BEGIN IMMEDIATE")
+
+            rows += XMLUtils._insert_batches(cursor, table_name, batches)
+            for _, sql in deferred:
+                cursor.execute(sql)
             conn.commit()
-            print(f"Imported data from {input_file} into {table_name}")
-        except sqlite3.Error as e:
-            print(f"Error importing from XML: {e}")
+            return rows
         finally:
+            if conn.in_transaction:
+                conn.rollback()
             conn.close()
 
     @staticmethod
-    def retrieve_data_from_xml(input_file, field_name):
-        """Retrieve specific data from a given XML field."""
-        tree = ET.parse(input_file)
-        root = tree.getroot()
+    def import_from_xml(input_file, batch_size=1000, checkpoint=None, defer_indexes=None):
+        """Imports data from an XML file into the database, streaming it so memory use does not grow with the file.
 
-        results = []
+        The file is fed to the parser a piece at a time and RecordReader hands back plain tuples,
+        so no element tree is kept; see import_records for batching, type conversion,
+        checkpoint and defer_indexes. Returns the number of rows imported.
+        """
         try:
-            for record in root.findall("record"):
-                field = record.find(field_name)
-                if field is not None:
-                    results.append(field.text)
-        except Exception as e:
-            print(f"Error retrieving data from XML: {e}")
+            with open_compressed(input_file) as file:
+                table_name, records = read_xml_records(file)
+                rows = XMLUtils.import_records(table_name, records, batch_size, checkpoint, defer_indexes)
+            print(f"Imported data from {input_file} into {table_name}")
+            return rows
+        except sqlite3.Error as e:
+            print(f"Error importing from XML: {e}")
+
+    @staticmethod
+    def _index(input_file, use_index):
+        """The sidecar XMLIndex for input_file when use_index is set and the file can have one, else None."""
+        if not use_index or compression_extension(input_file):
+            return None
+        from custom_xml_utils.xml_index import XMLIndex
+        return XMLIndex(input_file)
+
+    @staticmethod
+    def retrieve_data_from_xml(input_file, field_name, use_index=False):
+        """Retrieve specific data from a given XML field.
+
+        The file is scanned once, a piece at a time; with use_index the values come from the
+        file's sidecar index instead (see XMLIndex), which is worth it when the file is read repeatedly.
+        """
+        index = XMLUtils._index(input_file, use_index)
+        if index is not None:
+            results = index.values(field_name)
+        else:
+            results = [
+                value for value in (
+                    field_value(columns, values, field_name) for columns, values, _, _ in scan_records(input_file)
+                ) if value is not MISSING
+            ]
         print(f"Retrieved data for field '{field_name}': {results}")
         return results
 
     @staticmethod
-    def modify_xml_field(input_file, output_file, field_name, old_value, new_value):
-        """Modify specific fields in an XML file."""
-        tree = ET.parse(input_file)
-        root = tree.getroot()
+    def find_records(input_file, field_name, value, use_index=True):
+        """Returns the records (as {column: value} dicts) whose field_name is value.
+
+        With use_index, records are found through the sidecar index, a B-tree lookup and a seek per
+        record; otherwise, and for compressed files, by scanning the file.
+        """
+        index = XMLUtils._index(input_file, use_index)
+        if index is None:
+            return [
+                dict(zip(columns, values)) for columns, values, _, _ in scan_records(input_file)
+                if field_value(columns, values, field_name) == value
+            ]
+        records = []
+        with open(input_file, "rb") as file:
+            for start, end_tag in index.lookup(field_name, value):
+                file.seek(start)
+                records.append(record_dict(read_record(file, end_tag - start)))
+        return records
+
+    @staticmethod
+    def _copy_bytes(source, target, count):
+        while count > 0:
+            data = source.read(min(count, BLOB_READ_SIZE))
+            if not data:
+                break
+            target.write(data)
+            count -= len(data)
 
+    @staticmethod
+    def _rewrite_records(input_file, output_file, spans, field_name, new_value):
+        """Copies input_file to output_file unchanged except for the records at spans (sorted (start, end_tag)
+        offsets), whose first field_name is set to new_value. Writes a temporary file and renames it over
+        output_file, so output_file may be input_file."""
+        suffix = ".tmp" + compression_extension(output_file)
+        fd, temporary = tempfile.mkstemp(suffix=suffix, dir=os.path.dirname(os.path.abspath(output_file)))
+        os.close(fd)
         try:
-            for record in root.findall("record"):
-                field = record.find(field_name)
-                if field is not None and field.text == old_value:
-                    field.text = new_value
-        except Exception as e:
-            print(f"Error modifying XML field: {e}")
-
-        tree.write(output_file)
+            with open_compressed(input_file) as source, open_compressed(temporary, "wb") as target:
+                position = 0
+                for start, end_tag in spans:
+                    XMLUtils._copy_bytes(source, target, start - position)
+                    record = ET.fromstring(read_record(source, end_tag - start))
+                    record.find(field_name).text = new_value
+                    target.write(ET.tostring(record))
+                    position = source.tell()
+                shutil.copyfileobj(source, target, BLOB_READ_SIZE)
+            os.replace(temporary, output_file)
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+    @staticmethod
+    def modify_xml_field(input_file, output_file, field_name, old_value, new_value, use_index=False):
+        """Modify specific fields in an XML file.
+
+        Records are rewritten one at a time while the rest of the file is copied through unchanged,
+        so no tree of the file is built. The records to change are found by scanning the file, or
+        with use_index through its sidecar index. Returns the number of records changed.
+        """
+        index = XMLUtils._index(input_file, use_index)
+        if index is not None:
+            spans = index.lookup(field_name, old_value)
+        else:
+            spans = [
+                (start, end_tag) for columns, values, start, end_tag in scan_records(input_file)
+                if field_value(columns, values, field_name) == old_value
+            ]
+        XMLUtils._rewrite_records(input_file, output_file, spans, field_name, new_value)
         print(f"Modified XML file saved to {output_file}")
+        return len(spans)
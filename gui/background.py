@@ -0,0 +1,126 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
+import threading
+
+
+class BackgroundTasks:
+    """Runs blocking work (SQL, image decoding, password hashing) off the Tk thread.
+
+    Results are handed back to the Tk loop with after(); anything still pending when the owning
+    window is destroyed is cancelled and its callbacks are dropped.
+    """
+
+    IO_WORKERS = 4
+    POLL_INTERVAL_MS = 25
+
+    _io_pool = None
+    _process_pool = None
+    _pool_lock = threading.Lock()
+
+    def __init__(self, window):
+        self.window = window
+        self.pending = set()
+        self.dropped = {}
+        self.closed = False
+        window.bind("<Destroy>", self._on_destroy, add="+")
+
+    @classmethod
+    def io_pool(cls):
+        with cls._pool_lock:
+            if cls._io_pool is None:
+                cls._io_pool = ThreadPoolExecutor(max_workers=cls.IO_WORKERS, thread_name_prefix="gui-io")
+            return cls._io_pool
+
+    @classmethod
+    def process_pool(cls):
+        with cls._pool_lock:
+            if cls._process_pool is None:
+                # Forking a process that is running Tk and the database threads is unsafe; start clean workers.
+                cls._process_pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+            return cls._process_pool
+
+    def run(self, fn, *args, on_success=None, on_error=None, busy=(), status=None, status_text="Loading...",
+            process=False, on_dropped=None, on_progress=None):
+        """Submits fn(*args) and calls on_success(result) or on_error(exception) back on the Tk thread.
+
+        Widgets in busy are disabled and status (a Label) shows status_text until the call finishes.
+        process=True runs fn in the process pool, for CPU-bound work such as key derivation; fn and
+        its arguments must then be picklable. on_dropped(result) is called instead of on_success if
+        the window is destroyed after fn has started but before its result is handed back, for work
+        that must be undone when nobody is left to receive it; it runs on whichever thread gets there
+        first, so it must not touch Tk.
+
+        With on_progress, fn is also given a progress keyword argument: a callable it can call from
+        its thread, whose latest arguments are passed to on_progress on the Tk thread at the next poll.
+        """
+        pool = self.process_pool() if process else self.io_pool()
+        reported = []
+        if on_progress is not None:
+            # Reports are appended from fn's thread and only the latest is shown; appending and deleting a
+            # slice are atomic, so no lock is needed.
+            future = pool.submit(fn, *args, progress=lambda *values: reported.append(values))
+        else:
+            future = pool.submit(fn, *args)
+        self.pending.add(future)
+        if on_dropped is not None:
+            self.dropped[future] = on_dropped
+
+        for widget in busy:
+            widget.config(state="disabled")
+        if status is not None:
+            status.config(text=status_text)
+
+        def finish():
+            self.pending.discard(future)
+            self.dropped.pop(future, None)
+            if self.closed or future.cancelled():
+                return
+            for widget in busy:
+                if widget.winfo_exists():
+                    widget.config(state="normal")
+            if status is not None and status.winfo_exists():
+                status.config(text="")
+
+            error = future.exception()
+            if error is not None:
+                if on_error is not None:
+                    on_error(error)
+                else:
+                    print(f"Background task failed: {error}")
+            elif on_success is not None:
+                on_success(future.result())
+
+        def poll():
+            if self.closed:
+                return
+            count = len(reported)
+            if count:
+                values = reported[count - 1]
+                del reported[:count]
+                on_progress(*values)
+            if future.done():
+                finish()
+            else:
+                self.window.after(self.POLL_INTERVAL_MS, poll)
+
+        self.window.after(self.POLL_INTERVAL_MS, poll)
+        return future
+
+    def cancel_all(self):
+        for future in list(self.pending):
+            if not future.cancel() and future in self.dropped:
+                future.add_done_callback(self._drop_callback(self.dropped[future]))
+        self.pending.clear()
+        self.dropped.clear()
+
+    @staticmethod
+    def _drop_callback(on_dropped):
+        def dropped(future):
+            if not future.cancelled() and future.exception() is None:
+                on_dropped(future.result())
+        return dropped
+
+    def _on_destroy(self, event):
+        if event.widget is self.window:
+            self.closed = True
+            self.cancel_all()
@@ -1,7 +1,7 @@
-import io
 import tkinter as tk
-from tkinter import Toplevel, Label, Button, Entry, messagebox, StringVar, ttk, Frame, Scrollbar, Canvas
-from PIL import Image, ImageTk
+from tkinter import Toplevel, Label, Button, Entry, messagebox, StringVar, ttk
+from gui.background import BackgroundTasks
+from gui.product_list import ProductList
 from utils.database import Database
 
 
@@ -16,6 +16,7 @@ class BrowseProducts:
         self.parent.withdraw()
         self.browse_window.title("Browse Products")
         self.browse_window.geometry("800x600")
+        self.tasks = BackgroundTasks(self.browse_window)
 
         self.create_product_browsing()
 
@@ -46,36 +47,34 @@ class BrowseProducts:
         Label(filter_frame, text="Max Price:").grid(row=1, column=2, padx=5, pady=5)
         Entry(filter_frame, textvariable=max_price_var).grid(row=1, column=3, padx=5, pady=5)
 
-        Button(filter_frame, text="Apply Filters", command=lambda: populate_products_list()).grid(row=2, column=0, columnspan=4, pady=10)
+        apply_button = Button(filter_frame, text="Apply Filters", command=lambda: populate_products_list())
+        apply_button.grid(row=2, column=0, columnspan=4, pady=10)
 
-        try:
-            categories = Database.fetch_all_categories()
+        categories = []
+
+        def show_categories(result):
+            categories[:] = result
             category_dropdown["values"] = [category[1] for category in categories]
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to fetch categories: {e}")
+
+        self.tasks.run(
+            Database.fetch_all_categories,
+            on_success=show_categories,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to fetch categories: {e}"),
+        )
 
         results_label = Label(self.browse_window, text="", font=("Arial", 12))
         results_label.pack(pady=10)
 
-        product_frame = Frame(self.browse_window)
-        product_frame.pack(fill="both", expand=True)
-
-        canvas = Canvas(product_frame)
-        canvas.pack(side="left", fill="both", expand=True)
-
-        scrollbar = Scrollbar(product_frame, orient="vertical", command=canvas.yview)
-        scrollbar.pack(side="right", fill="y")
-
-        canvas.configure(yscrollcommand=scrollbar.set)
-        canvas.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-
-        inner_frame = Frame(canvas)
-        canvas.create_window((0, 0), window=inner_frame, anchor="nw")
+        product_list = ProductList(
+            self.browse_window,
+            describe=lambda p: (p[0], p[1], p[3], f"ProductID: {p[0]} | CategoryID={p[4]} | Stock={p[2]}", p[5]),
+            action_text="Add to Basket",
+            on_action=self.open_quantity_dialog,
+            tasks=self.tasks,
+        )
+        product_list.pack(fill="both", expand=True)
 
         def populate_products_list():
-            for widget in inner_frame.winfo_children():
-                widget.destroy()
-
             search = search_var.get().strip()
             selected_category = category_var.get().strip()
             category_id = None
@@ -83,48 +82,29 @@ class BrowseProducts:
                 category_id = next((category[0] for category in categories if category[1] == selected_category), None)
             min_price = float(min_price_var.get()) if min_price_var.get().strip() else None
             max_price = float(max_price_var.get()) if max_price_var.get().strip() else None
-
-            try:
-                products = Database.fetch_available_products(
-                    branch_id=self.branch_id,
-                    search=search,
-                    category_id=category_id,
-                    min_price=min_price,
-                    max_price=max_price,
+            filters = dict(
+                branch_id=self.branch_id,
+                search=search,
+                category_id=category_id,
+                min_price=min_price,
+                max_price=max_price,
+            )
+
+            def show_results(total):
+                results_label.config(text=f"{total} results found.")
+                product_list.load(
+                    total,
+                    lambda offset, limit: Database.fetch_available_products(**filters, limit=limit, offset=offset),
                 )
-                results_label.config(text=f"{len(products)} results found.")
-
-                for product in products:
-                    product_frame = Frame(inner_frame, borderwidth=1, relief="solid", pady=10, padx=10)
-                    product_frame.pack(fill="x", pady=5)
-
-                    if product[-1]:
-                        try:
-                            image_data = io.BytesIO(product[-1])
-                            image = Image.open(image_data)
-                            image.thumbnail((100, 100))
-                            photo = ImageTk.PhotoImage(image)
-                            image_label = Label(product_frame, image=photo)
-                            image_label.image = photo
-                            image_label.pack(side="left", padx=10)
-                        except Exception as e:
-                            print(f"Error displaying image for ProductID {product[0]}: {e}")
-                            Label(product_frame, text="No Image", font=("Arial", 10)).pack(side="left", padx=10)
-                    else:
-                        Label(product_frame, text="No Image", font=("Arial", 10)).pack(side="left", padx=10)
-
-                    info_frame = Frame(product_frame)
-                    info_frame.pack(side="left", fill="x", expand=True)
-
-                    Label(info_frame, text=product[1], font=("Arial", 14, "bold")).pack(anchor="w")
-                    Label(info_frame, text=f"Price: £{product[3]:.2f}", font=("Arial", 12)).pack(anchor="w")
-                    Label(info_frame, text=f"ProductID: {product[0]} | CategoryID={product[4]} | Stock={product[2]}",
-                          font=("Arial", 10)).pack(anchor="w")
-
-                    Button(info_frame, text="Add to Basket", command=lambda p=product: self.open_quantity_dialog(p)).pack(anchor="e")
-
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to fetch products: {e}")
+
+            self.tasks.run(
+                lambda: Database.count_available_products(**filters),
+                on_success=show_results,
+                on_error=lambda e: messagebox.showerror("Error", f"Failed to fetch products: {e}"),
+                busy=(apply_button,),
+                status=results_label,
+                status_text="Searching...",
+            )
 
         populate_products_list()
 
@@ -156,25 +136,26 @@ class BrowseProducts:
         product_id = product[0]
         branch_id = self.branch_id
 
-        try:
-            stock_quantity = Database.fetch_stock_quantity(branch_id, product_id)
-            if stock_quantity < quantity:
+        def reserved(remaining):
+            if remaining is None:
                 messagebox.showerror("Error", "Insufficient stock.")
                 return
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to fetch stock: {e}")
-            return
-
-        try:
-            Database.adjust_stock_quantity(branch_id, product_id, -quantity)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to update stock: {e}")
-            return
-
-        if product_id in self.basket:
-            self.basket[product_id]['quantity'] += quantity
-        else:
-            self.basket[product_id] = {'product': product, 'quantity': quantity, 'branch': branch_id}
-
-        print(f"Basket after adding: {self.basket}")
-        messagebox.showinfo("Success", f"Added {quantity} of {product[1]} to basket.")
+            # The basket is shared with the customer portal, so it is only changed here, on the Tk thread.
+            if product_id in self.basket:
+                self.basket[product_id]['quantity'] += quantity
+            else:
+                self.basket[product_id] = {'product': product, 'quantity': quantity, 'branch': branch_id}
+            print(f"Basket after adding: {self.basket}")
+            messagebox.showinfo("Success", f"Added {quantity} of {product[1]} to basket.")
+
+        def dropped(remaining):
+            # The window closed before the stock could go into the basket: give it back.
+            if remaining is not None:
+                Database.release_stock([(branch_id, product_id, quantity)])
+
+        self.tasks.run(
+            Database.reserve_stock, branch_id, product_id, quantity,
+            on_success=reserved,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to update stock: {e}"),
+            on_dropped=dropped,
+        )
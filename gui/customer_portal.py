@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import Toplevel, Label, Button, StringVar, Entry, messagebox, ttk
 import re
 from utils.database import Database
+from gui.background import BackgroundTasks
 from gui.view_past_orders import ViewPastOrders
 from gui.view_basket import ViewBasket
 from gui.browse_products import BrowseProducts
@@ -16,6 +17,7 @@ class CustomerPortal:
         self.parent.withdraw()
         self.customer_portal_window.title("Customer Portal")
         self.customer_portal_window.geometry("500x400")
+        self.tasks = BackgroundTasks(self.customer_portal_window)
         self.create_login_screen()
 
     def create_login_screen(self):
@@ -67,42 +69,46 @@ class CustomerPortal:
                    customer["BranchID"]
                )).pack(pady=10)
 
-        Button(self.customer_portal_window, text="Logout", command=self.logout_user).pack(pady=10)
+        self.logout_button = Button(self.customer_portal_window, text="Logout", command=self.logout_user)
+        self.logout_button.pack(pady=10)
 
     def logout_user(self):
-        try:
-            print(f"Basket at logout: {self.basket}")
-            for product_id, item in self.basket.items():
-                print(f"Processing ProductID={product_id}, Item={item}")
-                quantity = item['quantity']
-                branch_id = item['branch']
-
-                if not isinstance(branch_id, int):
-                    print(f"Invalid BranchID for product {product_id}: {branch_id}")
-                    messagebox.showwarning("Warning",
-                                           f"Invalid branch for product {product_id}. Skipping stock adjustment.")
-                    continue
-
-                try:
-                    Database.adjust_stock_quantity(branch_id, product_id, quantity)
-                except Exception as e:
-                    print(f"Error adjusting stock for ProductID={product_id}, BranchID={branch_id}: {e}")
-                    messagebox.showerror("Error", f"Failed to adjust stock for product {product_id}")
-                    return
-
-            self.basket.clear()
+        print(f"Basket at logout: {self.basket}")
+        items = []
+        for product_id, item in self.basket.items():
+            quantity = item['quantity']
+            branch_id = item['branch']
+
+            if not isinstance(branch_id, int):
+                print(f"Invalid BranchID for product {product_id}: {branch_id}")
+                messagebox.showwarning("Warning",
+                                       f"Invalid branch for product {product_id}. Skipping stock adjustment.")
+                continue
+            items.append((branch_id, product_id, quantity))
+
+        # Taken and cleared before the release starts, so a second click cannot release the same stock
+        # again; it is put back if the release fails.
+        basket = dict(self.basket)
+        self.basket.clear()
+
+        def released(result):
             messagebox.showinfo("Success", "You have been logged out and stock reinstated.")
-        except Exception as e:
-            print(f"Error during logout: {e}")
-            messagebox.showerror("Error", f"Failed to log out properly: {e}")
-        finally:
             self.create_login_screen()
 
+        def failed(error):
+            print(f"Error during logout: {error}")
+            self.basket.update(basket)
+            messagebox.showerror("Error", f"Failed to log out properly: {error}")
+            self.create_login_screen()
+
+        self.tasks.run(Database.release_stock, items, on_success=released, on_error=failed, busy=(self.logout_button,))
+
     def open_login(self):
         login_window = Toplevel(self.customer_portal_window)
         self.customer_portal_window.withdraw()
         login_window.title("Customer Login")
         login_window.geometry("400x300")
+        tasks = BackgroundTasks(login_window)
 
         email_var = StringVar()
         password_var = StringVar()
@@ -119,8 +125,7 @@ class CustomerPortal:
                 messagebox.showerror("Error", "Email and password cannot be empty.")
                 return
 
-            try:
-                customer = Database.authenticate_customer(email, password)
+            def logged_in(customer):
                 if customer:
                     messagebox.showinfo("Success", f"Welcome, {customer['FirstName']}!")
                     login_window.destroy()
@@ -128,17 +133,28 @@ class CustomerPortal:
                     self.create_dashboard(customer)
                 else:
                     messagebox.showerror("Error", "Invalid Email or Password.")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to login: {e}")
 
-        Button(login_window, text="Login", command=submit_login).pack(pady=10)
+            tasks.run(
+                Database.authenticate_customer, email, password,
+                on_success=logged_in,
+                on_error=lambda e: messagebox.showerror("Error", f"Failed to login: {e}"),
+                busy=(login_button,),
+                status=status_label,
+                status_text="Logging in...",
+            )
+
+        login_button = Button(login_window, text="Login", command=submit_login)
+        login_button.pack(pady=10)
         Button(login_window, text="Back", command=lambda: self.back_to_customer_portal(login_window)).pack(pady=10)
+        status_label = Label(login_window, text="")
+        status_label.pack(pady=5)
 
     def open_signup(self):
         signup_window = Toplevel(self.customer_portal_window)
         self.customer_portal_window.withdraw()
         signup_window.title("Sign Up")
         signup_window.geometry("400x500")
+        tasks = BackgroundTasks(signup_window)
 
         fields = ["First Name", "Last Name", "Email", "Password", "Contact Number"]
         entries = {}
@@ -156,10 +172,18 @@ class CustomerPortal:
 
         Label(signup_window, text="Branch").pack(pady=5)
         branch_var = StringVar()
-        branches = Database.fetch_all_branches()
-        branch_dropdown = ttk.Combobox(signup_window, textvariable=branch_var, values=branches, state="readonly")
+        branch_dropdown = ttk.Combobox(signup_window, textvariable=branch_var, state="readonly")
         branch_dropdown.pack(pady=5)
 
+        def show_branches(branches):
+            branch_dropdown["values"] = branches
+
+        tasks.run(
+            Database.fetch_all_branches,
+            on_success=show_branches,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to fetch branches: {e}"),
+        )
+
         def validate_and_format_name(name):
             if not re.match(r"^[a-zA-Z- ]+$", name):
                 return None
@@ -208,21 +232,28 @@ class CustomerPortal:
 
                 membership_level_id = int(membership_level_var.get())
 
-                Database.signup_customer(
+                def signed_up(result):
+                    messagebox.showinfo("Success", "Account created successfully.")
+                    self.back_to_customer_portal(signup_window)
+
+                tasks.run(
+                    Database.signup_customer,
                     formatted_first_name,
                     formatted_last_name,
                     data["Contact Number"],
                     membership_level_id,
                     data["Email"],
                     data["Password"],
-                    branch_id
+                    branch_id,
+                    on_success=signed_up,
+                    on_error=lambda e: messagebox.showerror("Error", f"Failed to sign up: {e}"),
+                    busy=(submit_button,),
                 )
-                messagebox.showinfo("Success", "Account created successfully.")
-                self.back_to_customer_portal(signup_window)
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to sign up: {e}")
 
-        Button(signup_window, text="Submit", command=submit_signup).pack(pady=10)
+        submit_button = Button(signup_window, text="Submit", command=submit_signup)
+        submit_button.pack(pady=10)
         Button(signup_window, text="Back", command=lambda: self.back_to_customer_portal(signup_window)).pack(pady=10)
 
     def back_to_customer_portal(self, window):
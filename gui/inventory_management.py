@@ -1,5 +1,7 @@
 import tkinter as tk
 from tkinter import Toplevel, Label, Button, Entry, messagebox, ttk
+from gui.background import BackgroundTasks
+from gui.paged_treeview import TreeviewPager
 from utils.database import Database
 
 
@@ -11,6 +13,7 @@ class InventoryManagement:
         self.parent.withdraw()
         self.inventory_window.title("Inventory Management")
         self.inventory_window.geometry("800x500")
+        self.tasks = BackgroundTasks(self.inventory_window)
         self.create_widgets()
 
     def create_widgets(self):
@@ -27,8 +30,13 @@ class InventoryManagement:
         self.product_filter = Entry(filter_frame)
         self.product_filter.grid(row=0, column=3, padx=5, pady=5)
 
-        Button(filter_frame, text="Apply Filters", command=self.apply_filters).grid(row=0, column=4, padx=5, pady=5)
-        Button(filter_frame, text="Clear Filters", command=self.clear_filters).grid(row=0, column=5, padx=5, pady=5)
+        self.apply_button = Button(filter_frame, text="Apply Filters", command=self.apply_filters)
+        self.apply_button.grid(row=0, column=4, padx=5, pady=5)
+        self.clear_button = Button(filter_frame, text="Clear Filters", command=self.clear_filters)
+        self.clear_button.grid(row=0, column=5, padx=5, pady=5)
+
+        self.status_label = Label(self.inventory_window, text="")
+        self.status_label.pack()
 
         columns = ("BranchID", "ProductID", "StockQuantity")
         self.inventory_table = ttk.Treeview(self.inventory_window, columns=columns, show="headings")
@@ -37,19 +45,28 @@ class InventoryManagement:
             self.inventory_table.column(col, width=150)
         self.inventory_table.pack(fill="both", expand=True, padx=10, pady=10)
 
+        self.branch_id = None
+        self.product_id = None
+        self.inventory_pager = TreeviewPager(
+            self.inventory_table,
+            lambda page_size, token, sort_by: Database.fetch_inventory_page(
+                self.branch_id, self.product_id, page_size, token, sort_by),
+            self.tasks,
+            sortable=columns,
+            status=self.status_label,
+            busy=(self.apply_button, self.clear_button),
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to fetch inventory: {e}"),
+        )
+
         Button(self.inventory_window, text="Back",
                command=lambda: self.navigation_manager.back(self.inventory_window)).pack(pady=10)
 
         self.populate_inventory_table()
 
     def populate_inventory_table(self, branch_id=None, product_id=None):
-        try:
-            records = Database.fetch_inventory(branch_id, product_id)
-            self.inventory_table.delete(*self.inventory_table.get_children())
-            for record in records:
-                self.inventory_table.insert("", "end", values=record)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to fetch inventory: {e}")
+        self.branch_id = branch_id
+        self.product_id = product_id
+        self.inventory_pager.reload()
 
     def apply_filters(self):
         branch_id = self.branch_filter.get().strip()
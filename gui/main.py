@@ -1,8 +1,12 @@
+import atexit
+import logging
+import os
 import tkinter as tk
 from gui.customer_portal import CustomerPortal
 from gui.navigation_manager import NavigationManager
 from gui.staff_portal import StaffPortal
 from custom_xml_utils.xml_utils import XMLUtils
+from utils import instrumentation
 
 
 class MainApplication:
@@ -32,6 +36,13 @@ class MainApplication:
 
 
 if __name__ == "__main__":
+    # DATABASE_METRICS=metrics.json records query metrics for the session and writes them on exit.
+    metrics_path = os.environ.get("DATABASE_METRICS")
+    if metrics_path:
+        logging.basicConfig(level=logging.INFO)
+        instrumentation.enable(slow_query_ms=float(os.environ.get("DATABASE_SLOW_QUERY_MS", "100")))
+        atexit.register(instrumentation.export_json, metrics_path)
+
     root = tk.Tk()
     app = MainApplication(root)
     root.mainloop()
@@ -1,5 +1,9 @@
+import os
 import tkinter as tk
-from tkinter import Toplevel, Label, Button, messagebox, ttk
+from tkinter import Toplevel, Label, Button, filedialog, messagebox, ttk
+from gui.background import BackgroundTasks
+from gui.paged_treeview import TreeviewPager
+from utils.bulk_import import import_people
 from utils.database import Database
 
 
@@ -11,6 +15,7 @@ class ManageCustomers:
         self.parent.withdraw()
         self.manage_customers_window.title("Manage Customers")
         self.manage_customers_window.geometry("700x500")
+        self.tasks = BackgroundTasks(self.manage_customers_window)
         self.create_widgets()
 
     def create_widgets(self):
@@ -23,21 +28,50 @@ class ManageCustomers:
             self.customer_table.column(col, width=100)
         self.customer_table.pack(fill="both", expand=True, padx=10, pady=10)
 
+        self.status_label = Label(self.manage_customers_window, text="")
+        self.status_label.pack()
+
+        self.customer_pager = TreeviewPager(
+            self.customer_table,
+            lambda page_size, token, sort_by: Database.fetch_customers_page(page_size, token, sort_by),
+            self.tasks,
+            sortable=("CustomerID", "FirstName", "Surname", "MembershipLevelID"),
+            status=self.status_label,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to fetch customers: {e}"),
+        )
+
         Button(self.manage_customers_window, text="Edit Customer", command=self.edit_customer_ui).pack(side="left", padx=10, pady=10)
         Button(self.manage_customers_window, text="Delete Customer", command=self.delete_customer_ui).pack(side="left", padx=10, pady=10)
+        Button(self.manage_customers_window, text="Import Customers", command=self.import_ui).pack(side="left", padx=10, pady=10)
         Button(self.manage_customers_window, text="Back",
                command=lambda: self.navigation_manager.back(self.manage_customers_window)).pack(side="left", padx=10, pady=10)
 
         self.populate_customer_table()
 
     def populate_customer_table(self):
-        try:
-            records = Database.fetch_all_customers()
-            self.customer_table.delete(*self.customer_table.get_children())
-            for record in records:
-                self.customer_table.insert("", "end", values=record)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to fetch customers: {e}")
+        self.customer_pager.reload()
+
+    def import_ui(self):
+        path = filedialog.askopenfilename(filetypes=[("CSV or XML", "*.csv;*.xml")])
+        if not path:
+            return
+        errors_path = os.path.splitext(path)[0] + ".errors.csv"
+
+        def imported(summary):
+            message = f"Imported {summary['imported']} of {summary['rows']} rows."
+            if summary["rejected"]:
+                message += f"\n{summary['rejected']} rejected rows were written to {errors_path}."
+            messagebox.showinfo("Import", message)
+            self.populate_customer_table()
+
+        self.tasks.run(
+            import_people, "customers", path, errors_path,
+            on_success=imported,
+            on_error=lambda e: messagebox.showerror("Error", f"Import failed: {e}"),
+            status=self.status_label,
+            status_text="Importing...",
+            on_progress=lambda done, total: self.status_label.config(text=f"Importing... {done}/{total} rows"),
+        )
 
     def edit_customer_ui(self):
         selected_item = self.customer_table.focus()
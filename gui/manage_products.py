@@ -1,5 +1,7 @@
 import tkinter as tk
 from tkinter import Toplevel, Label, Button, Entry, messagebox, ttk, filedialog
+from gui.background import BackgroundTasks
+from gui.paged_treeview import TreeviewPager
 from utils.database import Database
 import os
 
@@ -11,6 +13,7 @@ class ManageProducts:
         self.parent.withdraw()
         self.manage_products_window.title("Manage Products")
         self.manage_products_window.geometry("700x500")
+        self.tasks = BackgroundTasks(self.manage_products_window)
         self.create_widgets()
 
     def create_widgets(self):
@@ -23,22 +26,29 @@ class ManageProducts:
             self.product_table.column(col, width=150)
         self.product_table.pack(fill="both", expand=True, padx=10, pady=10)
 
+        self.status_label = Label(self.manage_products_window, text="")
+        self.status_label.pack()
+
+        self.product_pager = TreeviewPager(
+            self.product_table,
+            lambda page_size, token, sort_by: Database.fetch_products_page(page_size, token, sort_by),
+            self.tasks,
+            sortable=columns,
+            status=self.status_label,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to fetch products: {e}"),
+        )
+
         Button(self.manage_products_window, text="Add Product", command=self.add_product_ui).pack(side="left", padx=10, pady=10)
         Button(self.manage_products_window, text="Edit Product", command=self.edit_product_ui).pack(side="left", padx=10, pady=10)
-        Button(self.manage_products_window, text="Delete Product", command=self.delete_product_ui).pack(side="left", padx=10, pady=10)
+        self.delete_button = Button(self.manage_products_window, text="Delete Product", command=self.delete_product_ui)
+        self.delete_button.pack(side="left", padx=10, pady=10)
         Button(self.manage_products_window, text="Back",
                command=lambda: self.navigation_manager.back(self.manage_products_window)).pack(side="left", padx=10, pady=10)
 
         self.populate_product_table()
 
     def populate_product_table(self):
-        try:
-            records = Database.fetch_all_products()
-            self.product_table.delete(*self.product_table.get_children())
-            for record in records:
-                self.product_table.insert("", "end", values=record)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to fetch products: {e}")
+        self.product_pager.reload()
 
     def add_product_ui(self):
         add_window = Toplevel(self.manage_products_window)
@@ -76,61 +86,27 @@ class ManageProducts:
                     with open(product_image_path.get(), "rb") as file:
                         image_data = file.read()
 
-                Database.add_product(
+                def added(result):
+                    messagebox.showinfo("Success", "Product added successfully.")
+                    add_window.destroy()
+                    self.populate_product_table()
+
+                self.tasks.run(
+                    Database.add_product,
                     new_product["ProductName"],
                     int(new_product["CategoryID"]),
                     float(new_product["Price"]),
-                    image_data
+                    image_data,
+                    on_success=added,
+                    on_error=lambda e: messagebox.showerror("Error", f"Failed to add product: {e}"),
+                    status=self.status_label,
+                    status_text="Saving...",
                 )
-                messagebox.showinfo("Success", "Product added successfully.")
-                add_window.destroy()
-                self.populate_product_table()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to add product: {e}")
 
         Button(add_window, text="Submit", command=submit_add).grid(row=len(fields) + 1, column=0, columnspan=2, pady=10)
 
-    def edit_product_ui(self):
-        selected_item = self.product_table.focus()
-        if not selected_item:
-            messagebox.showerror("Error", "No product selected.")
-            return
-
-        product_data = self.product_table.item(selected_item, "values")
-        edit_window = Toplevel(self.manage_products_window)
-        edit_window.title("Edit Product")
-        edit_window.geometry("400x300")
-
-        fields = ["CategoryID", "Price"]
-        entries = {}
-
-        for idx, field in enumerate(fields):
-            Label(edit_window, text=field).grid(row=idx, column=0, padx=10, pady=5)
-            entry = Entry(edit_window)
-            entry.insert(0, product_data[2 + idx])
-            entry.grid(row=idx, column=1, padx=10, pady=5)
-            entries[field] = entry
-
-        def submit_edit():
-            try:
-                updates = {field: entries[field].get().strip() for field in fields}
-                if any(not value for value in updates.values()):
-                    messagebox.showerror("Error", "All fields must be filled.")
-                    return
-
-                Database.update_product(
-                    int(product_data[0]),
-                    int(updates["CategoryID"]),
-                    float(updates["Price"]),
-                )
-                messagebox.showinfo("Success", "Product updated successfully.")
-                edit_window.destroy()
-                self.populate_product_table()
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to update product: {e}")
-
-        Button(edit_window, text="Submit", command=submit_edit).grid(row=len(fields), column=0, columnspan=2, pady=10)
-
     def delete_product_ui(self):
         selected_item = self.product_table.focus()
         if not selected_item:
@@ -142,12 +118,18 @@ class ManageProducts:
         if not confirm:
             return
 
-        try:
-            Database.delete_product(int(product_data[0]))
+        def deleted(result):
             messagebox.showinfo("Success", "Product deleted successfully.")
             self.populate_product_table()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to delete product: {e}")
+
+        self.tasks.run(
+            Database.delete_product, int(product_data[0]),
+            on_success=deleted,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to delete product: {e}"),
+            busy=(self.delete_button,),
+            status=self.status_label,
+            status_text="Deleting...",
+        )
 
     def edit_product_ui(self):
         selected_item = self.product_table.focus()
@@ -192,20 +174,30 @@ class ManageProducts:
                     with open(product_image_path.get(), "rb") as file:
                         image_data = file.read()
 
-                Database.update_product(
-                    int(product_data[0]),
-                    int(updates["CategoryID"]),
-                    float(updates["Price"]),
+                product_id = int(product_data[0])
+                category_id = int(updates["CategoryID"])
+                price = float(updates["Price"])
+
+                def save():
+                    Database.update_product(product_id, category_id, price)
+                    if image_data:
+                        Database.update_product_image(product_id, image_data)
+
+                def saved(result):
+                    messagebox.showinfo("Success", "Product updated successfully.")
+                    edit_window.destroy()
+                    self.populate_product_table()
+
+                self.tasks.run(
+                    save,
+                    on_success=saved,
+                    on_error=lambda e: messagebox.showerror("Error", f"Failed to update product: {e}"),
+                    busy=(submit_button,),
+                    status=self.status_label,
+                    status_text="Saving...",
                 )
-
-                if image_data:
-                    Database.update_product_image(int(product_data[0]), image_data)
-
-                messagebox.showinfo("Success", "Product updated successfully.")
-                edit_window.destroy()
-                self.populate_product_table()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to update product: {e}")
 
-        Button(edit_window, text="Submit", command=submit_edit).grid(row=len(fields) + 1, column=0, columnspan=2,
-                                                                     pady=10)
+        submit_button = Button(edit_window, text="Submit", command=submit_edit)
+        submit_button.grid(row=len(fields) + 1, column=0, columnspan=2, pady=10)
@@ -1,8 +1,12 @@
+import os
 import tkinter as tk
-from tkinter import Toplevel, Label, Button, Entry, messagebox, ttk
+from tkinter import Toplevel, Label, Button, Entry, filedialog, messagebox, ttk
 import re
+from gui.background import BackgroundTasks
+from gui.paged_treeview import TreeviewPager
 from utils.database import Database
-from utils.encryption import hash_password
+from utils.auth_service import AuthService
+from utils.bulk_import import import_people
 
 
 class ManageStaff:
@@ -13,6 +17,7 @@ class ManageStaff:
         self.parent.withdraw()
         self.manage_staff_window.title("Manage Staff")
         self.manage_staff_window.geometry("700x500")
+        self.tasks = BackgroundTasks(self.manage_staff_window)
         self.create_widgets()
 
     def create_widgets(self):
@@ -26,10 +31,23 @@ class ManageStaff:
             self.staff_table.column(col, width=100)
         self.staff_table.pack(fill="both", expand=True, padx=10, pady=10)
 
+        self.status_label = Label(self.manage_staff_window, text="")
+        self.status_label.pack()
+
+        self.staff_pager = TreeviewPager(
+            self.staff_table,
+            lambda page_size, token, sort_by: Database.fetch_staff_page(page_size, token, sort_by),
+            self.tasks,
+            sortable=("EmployeeID", "FirstName", "Surname", "BranchID", "JobRoleID"),
+            status=self.status_label,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to fetch staff records: {e}"),
+        )
+
 
         Button(self.manage_staff_window, text="Add Staff", command=self.add_staff_ui).pack(side="left", padx=10, pady=10)
         Button(self.manage_staff_window, text="Edit Staff", command=self.edit_staff_ui).pack(side="left", padx=10, pady=10)
         Button(self.manage_staff_window, text="Delete Staff", command=self.delete_staff_ui).pack(side="left", padx=10, pady=10)
+        Button(self.manage_staff_window, text="Import Staff", command=self.import_ui).pack(side="left", padx=10, pady=10)
         Button(self.manage_staff_window, text="Back",
                command=lambda: self.navigation_manager.back(self.manage_staff_window)).pack(side="left", padx=10, pady=10)
 
@@ -37,13 +55,29 @@ class ManageStaff:
         self.populate_staff_table()
 
     def populate_staff_table(self):
-        try:
-            records = Database.fetch_all_staff()
-            self.staff_table.delete(*self.staff_table.get_children())
-            for record in records:
-                self.staff_table.insert("", "end", values=record)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to fetch staff records: {e}")
+        self.staff_pager.reload()
+
+    def import_ui(self):
+        path = filedialog.askopenfilename(filetypes=[("CSV or XML", "*.csv;*.xml")])
+        if not path:
+            return
+        errors_path = os.path.splitext(path)[0] + ".errors.csv"
+
+        def imported(summary):
+            message = f"Imported {summary['imported']} of {summary['rows']} rows."
+            if summary["rejected"]:
+                message += f"\n{summary['rejected']} rejected rows were written to {errors_path}."
+            messagebox.showinfo("Import", message)
+            self.populate_staff_table()
+
+        self.tasks.run(
+            import_people, "staff", path, errors_path,
+            on_success=imported,
+            on_error=lambda e: messagebox.showerror("Error", f"Import failed: {e}"),
+            status=self.status_label,
+            status_text="Importing...",
+            on_progress=lambda done, total: self.status_label.config(text=f"Importing... {done}/{total} rows"),
+        )
 
     def validate_and_format_name(self, name):
         if not re.match(r"^[a-zA-Z- ]+$", name):
@@ -96,26 +130,48 @@ class ManageStaff:
                     return
 
 
-                hashed_password = hash_password(new_staff["Password"])
-
-
-                Database.add_staff(
-                    formatted_first_name,
-                    formatted_surname,
-                    new_staff["ContactNumber"],
-                    int(new_staff["BranchID"]),
-                    int(new_staff["JobRoleID"]),
-                    hashed_password
+                branch_id = int(new_staff["BranchID"])
+                job_role_id = int(new_staff["JobRoleID"])
+
+                def staff_added(result):
+                    messagebox.showinfo("Success", "Staff added successfully.")
+                    add_window.destroy()
+                    self.populate_staff_table()
+
+                def add_staff(hashed_password):
+                    self.tasks.run(
+                        Database.add_staff,
+                        formatted_first_name,
+                        formatted_surname,
+                        new_staff["ContactNumber"],
+                        branch_id,
+                        job_role_id,
+                        hashed_password,
+                        on_success=staff_added,
+                        on_error=staff_failed,
+                        busy=(submit_button,),
+                    )
+
+                def staff_failed(error):
+                    if isinstance(error, ValueError):
+                        messagebox.showerror("Error", str(error))
+                    else:
+                        messagebox.showerror("Error", f"Failed to add staff: {error}")
+
+                # Key derivation is CPU-bound; the auth service runs it in its worker processes.
+                self.tasks.run(
+                    AuthService.shared().hash_password, new_staff["Password"],
+                    on_success=add_staff,
+                    on_error=staff_failed,
+                    busy=(submit_button,),
                 )
-                messagebox.showinfo("Success", "Staff added successfully.")
-                add_window.destroy()
-                self.populate_staff_table()
             except ValueError as ve:
                 messagebox.showerror("Error", str(ve))
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to add staff: {e}")
 
-        Button(add_window, text="Submit", command=submit_add).grid(row=len(fields), column=0, columnspan=2, pady=10)
+        submit_button = Button(add_window, text="Submit", command=submit_add)
+        submit_button.grid(row=len(fields), column=0, columnspan=2, pady=10)
 
     def edit_staff_ui(self):
         selected_item = self.staff_table.focus()
@@ -0,0 +1,77 @@
+class TreeviewPager:
+    """Fills a ttk.Treeview one keyset page at a time, fetching the next page as the view nears the bottom.
+
+    fetch_page(page_size, token, sort_by) returns (rows, next_token) and runs on tasks (a
+    BackgroundTasks). Headings listed in sortable sort the table by that column when clicked; a
+    second click reverses the order.
+    """
+
+    LOAD_AHEAD = 0.85
+
+    def __init__(self, tree, fetch_page, tasks, page_size=200, sortable=(), status=None, busy=(), on_error=None,
+                 scrollbar=None):
+        self.tree = tree
+        self.fetch_page = fetch_page
+        self.tasks = tasks
+        self.page_size = page_size
+        self.status = status
+        self.busy = busy
+        self.on_error = on_error
+        self.scrollbar = scrollbar
+
+        self.sort_by = None
+        self.next_token = None
+        self.loading = False
+        self.generation = 0
+
+        tree.configure(yscrollcommand=self._on_yscroll)
+        self.headings = {column: tree.heading(column, "text") for column in sortable}
+        for column in sortable:
+            tree.heading(column, command=lambda c=column: self.sort(c))
+
+    def reload(self):
+        self.generation += 1
+        self.tree.delete(*self.tree.get_children())
+        self.next_token = None
+        self.loading = False
+        self._load(None)
+
+    def sort(self, column):
+        self.sort_by = [f"-{column}"] if self.sort_by == [column] else [column]
+        for name, text in self.headings.items():
+            if name == column:
+                text += " ▼" if self.sort_by[0].startswith("-") else " ▲"
+            self.tree.heading(name, text=text)
+        self.reload()
+
+    def _load(self, token):
+        self.loading = True
+        generation = self.generation
+
+        def loaded(result):
+            if generation != self.generation or not self.tree.winfo_exists():
+                return
+            rows, next_token = result
+            for row in rows:
+                self.tree.insert("", "end", values=row)
+            self.next_token = next_token
+            self.loading = False
+
+        def failed(error):
+            if generation != self.generation:
+                return
+            self.loading = False
+            if self.on_error is not None:
+                self.on_error(error)
+            else:
+                print(f"Error loading rows: {error}")
+
+        self.tasks.run(self.fetch_page, self.page_size, token, self.sort_by, on_success=loaded, on_error=failed,
+                       busy=self.busy, status=self.status)
+
+    def _on_yscroll(self, first, last):
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        # Also fires when rows are inserted, so a short first page keeps pulling until the view is full.
+        if self.next_token and not self.loading and float(last) >= self.LOAD_AHEAD:
+            self._load(self.next_token)
@@ -1,7 +1,6 @@
-import io
 import tkinter as tk
-from tkinter import Toplevel, Label, Button, Entry, messagebox, StringVar, ttk, Frame, Canvas, Scrollbar
-from PIL import Image, ImageTk
+from tkinter import Toplevel, Label, Button, Entry, messagebox, StringVar, ttk
+from gui.product_list import ProductList
 from utils.database import Database
 
 
@@ -103,25 +102,15 @@ class PlaceOrders:
         results_label = Label(self.place_orders_window, text="", font=("Arial", 12))
         results_label.pack(pady=10)
 
-        product_frame = Frame(self.place_orders_window)
-        product_frame.pack(fill="both", expand=True)
-
-        canvas = Canvas(product_frame)
-        canvas.pack(side="left", fill="both", expand=True)
-
-        scrollbar = Scrollbar(product_frame, orient="vertical", command=canvas.yview)
-        scrollbar.pack(side="right", fill="y")
-
-        canvas.configure(yscrollcommand=scrollbar.set)
-        canvas.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-
-        inner_frame = Frame(canvas)
-        canvas.create_window((0, 0), window=inner_frame, anchor="nw")
+        product_list = ProductList(
+            self.place_orders_window,
+            describe=lambda p: (p[0], p[1], p[2], f"ProductID: {p[0]} | CategoryID: {p[3]}", p[4]),
+            action_text="Place Order",
+            on_action=lambda p: place_order(p),
+        )
+        product_list.pack(fill="both", expand=True)
 
         def populate_products_list():
-            for widget in inner_frame.winfo_children():
-                widget.destroy()
-
             search = search_var.get().strip()
             selected_category = category_var.get().strip()
             category_id = None
@@ -129,47 +118,21 @@ class PlaceOrders:
                 category_id = next((category[0] for category in categories if category[1] == selected_category), None)
             min_price = float(min_price_var.get()) if min_price_var.get().strip() else None
             max_price = float(max_price_var.get()) if max_price_var.get().strip() else None
+            filters = dict(
+                supplier_id=self.supplier_id,
+                search=search,
+                category_id=category_id,
+                min_price=min_price,
+                max_price=max_price,
+            )
 
             try:
-                products = Database.fetch_supplier_products(
-                    supplier_id=self.supplier_id,
-                    search=search,
-                    category_id=category_id,
-                    min_price=min_price,
-                    max_price=max_price,
+                total = Database.count_supplier_products(**filters)
+                results_label.config(text=f"{total} results found.")
+                product_list.load(
+                    total,
+                    lambda offset, limit: Database.fetch_supplier_products(**filters, limit=limit, offset=offset),
                 )
-
-                results_label.config(text=f"{len(products)} results found.")
-
-                for product in products:
-                    product_frame = Frame(inner_frame, borderwidth=1, relief="solid", pady=10, padx=10)
-                    product_frame.pack(fill="x", pady=5)
-
-
-                    if product[-1]:
-                        try:
-                            image_data = product[-1]
-                            image = Image.open(io.BytesIO(image_data))
-                            image.thumbnail((100, 100))
-                            photo = ImageTk.PhotoImage(image)
-                            image_label = Label(product_frame, image=photo)
-                            image_label.image = photo
-                            image_label.pack(side="left", padx=10)
-                        except Exception as e:
-                            print(f"Error displaying image: {e}")
-                            Label(product_frame, text="No Image", font=("Arial", 10)).pack(side="left", padx=10)
-
-                    info_frame = Frame(product_frame)
-                    info_frame.pack(side="left", fill="x", expand=True)
-
-                    Label(info_frame, text=product[1], font=("Arial", 14, "bold")).pack(anchor="w")
-                    Label(info_frame, text=f"Price: £{product[2]:.2f}", font=("Arial", 12)).pack(anchor="w")
-                    Label(info_frame, text=f"ProductID: {product[0]} | CategoryID: {product[3]}",
-                          font=("Arial", 10)).pack(anchor="w")
-
-                    Button(info_frame, text="Place Order", command=lambda p=product: place_order(p)).pack(anchor="e")
-
-
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to fetch products: {e}")
 
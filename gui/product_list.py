@@ -0,0 +1,111 @@
+import io
+from collections import OrderedDict
+from tkinter import Frame, Label, Button
+from PIL import Image, ImageTk
+from gui.virtual_list import VirtualList
+from media.thumbnails import make_thumbnail
+from utils.database import Database
+
+
+class ProductList(VirtualList):
+    """Virtual list of product cards (thumbnail, name, price, details and an action button).
+
+    describe(product) returns (product_id, name, price, details, image_version) for a row from the
+    product queries; on_action(product) runs when the row's button is pressed.
+    """
+
+    ROW_HEIGHT = 130
+    MAX_CACHED_PHOTOS = 300
+
+    def __init__(self, parent, describe, action_text, on_action, **kwargs):
+        super().__init__(parent, self.ROW_HEIGHT, self._create_row, self._update_row, **kwargs)
+        self.describe = describe
+        self.action_text = action_text
+        self.on_action = on_action
+        self.photos = OrderedDict()
+
+    def load(self, total, fetch_products):
+        def fetch_page(offset, limit):
+            products = fetch_products(offset, limit)
+            return products, self._fetch_thumbnails(products)
+
+        self.set_source(total, fetch_page)
+
+    def _fetch_thumbnails(self, products):
+        # May run on a worker thread: only touches the database and PIL, never Tk.
+        wanted = {}
+        for product in products:
+            product_id, _, _, _, image_version = self.describe(product)
+            if image_version is not None:
+                wanted[product_id] = image_version
+        if not wanted:
+            return {}
+
+        try:
+            thumbnails = Database.fetch_product_thumbnails(wanted)
+            missing = [product_id for product_id in wanted if product_id not in thumbnails]
+            if missing:
+                # Not backfilled yet: build these from the full image and save them, so later pages
+                # (and other tills) read the thumbnail instead of the image from now on.
+                images = Database.fetch_product_images(missing)
+                built = [(product_id, wanted[product_id], make_thumbnail(data)) for product_id, data in images.items()]
+                try:
+                    Database.save_product_thumbnails(row for row in built if row[2])
+                except Exception as e:
+                    print(f"Error saving product thumbnails: {e}")
+                thumbnails.update((product_id, thumbnail) for product_id, _, thumbnail in built)
+        except Exception as e:
+            print(f"Error fetching product images: {e}")
+            return {}
+
+        decoded = {}
+        for product_id, thumbnail in thumbnails.items():
+            if not thumbnail:
+                continue
+            try:
+                image = Image.open(io.BytesIO(thumbnail))
+                image.load()
+                decoded[(product_id, wanted[product_id])] = image
+            except Exception as e:
+                print(f"Error decoding image for ProductID {product_id}: {e}")
+        return decoded
+
+    def prepare_page(self, result):
+        products, images = result
+        for key, image in images.items():
+            if key not in self.photos:
+                self.photos[key] = ImageTk.PhotoImage(image)
+        while len(self.photos) > self.MAX_CACHED_PHOTOS:
+            self.photos.popitem(last=False)
+        return products
+
+    def _create_row(self, parent):
+        row = Frame(parent, borderwidth=1, relief="solid", pady=10, padx=10)
+        row.image_label = Label(row, font=("Arial", 10), width=14)
+        row.image_label.pack(side="left", padx=10)
+
+        info_frame = Frame(row)
+        info_frame.pack(side="left", fill="x", expand=True)
+        row.name_label = Label(info_frame, font=("Arial", 14, "bold"))
+        row.name_label.pack(anchor="w")
+        row.price_label = Label(info_frame, font=("Arial", 12))
+        row.price_label.pack(anchor="w")
+        row.details_label = Label(info_frame, font=("Arial", 10))
+        row.details_label.pack(anchor="w")
+        row.action_button = Button(info_frame, text=self.action_text)
+        row.action_button.pack(anchor="e")
+        return row
+
+    def _update_row(self, row, product):
+        product_id, name, price, details, image_version = self.describe(product)
+        photo = self.photos.get((product_id, image_version))
+        if photo is not None:
+            self.photos.move_to_end((product_id, image_version))
+            row.image_label.config(image=photo, text="", width=0)
+            row.image_label.image = photo
+        else:
+            row.image_label.config(image="", text="No Image", width=14)
+        row.name_label.config(text=name)
+        row.price_label.config(text=f"Price: £{price:.2f}")
+        row.details_label.config(text=details)
+        row.action_button.config(command=lambda p=product: self.on_action(p))
@@ -1,14 +1,13 @@
 import tkinter as tk
 from tkinter import Toplevel, Label, Button, StringVar, Entry, messagebox
-import os
-import sqlite3
 
 from gui.inventory_management import InventoryManagement
 from gui.manage_customers import ManageCustomers
 from gui.manage_products import ManageProducts
 from gui.manage_staff import ManageStaff
 from gui.place_orders import PlaceOrders
-from utils.encryption import verify_password
+from gui.background import BackgroundTasks
+from utils.database import Database
 
 
 class StaffPortal:
@@ -65,6 +64,7 @@ class AdminLogin:
 
         self.employee_id_var = StringVar()
         self.password_var = StringVar()
+        self.tasks = BackgroundTasks(self.login_window)
 
         self.create_widgets()
 
@@ -74,10 +74,12 @@ class AdminLogin:
         Label(self.login_window, text="Password").pack(pady=5)
         Entry(self.login_window, textvariable=self.password_var, show="*").pack(pady=5)
 
-        Button(self.login_window, text="Login", command=self.authenticate_user).pack(pady=10)
+        self.login_button = Button(self.login_window, text="Login", command=self.authenticate_user)
+        self.login_button.pack(pady=10)
         Button(self.login_window, text="Back",
                command=lambda: self.navigation_manager.back(self.login_window)).pack(pady=10)
-
+        self.status_label = Label(self.login_window, text="")
+        self.status_label.pack(pady=5)
 
     def authenticate_user(self):
         employee_id = self.employee_id_var.get().strip()
@@ -87,36 +89,23 @@ class AdminLogin:
             messagebox.showerror("Error", "Employee ID and password cannot be empty.")
             return
 
-        db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../database/autodatabase.db"))
-
-        try:
-            conn = sqlite3.connect(db_path)
-            conn.execute("PRAGMA foreign_keys = ON")
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                SELECT JobRoleID, Password
-                FROM Employees
-                WHERE EmployeeID = ?
-            """, (employee_id,))
-            result = cursor.fetchone()
-
-            if result:
-                job_role_id, stored_password = result
-                if verify_password(stored_password, password):
-                    self.navigation_manager.navigate(
-                        self.login_window,
-                        lambda: StaffPortal(self.parent, self.navigation_manager).open_portal_by_role(job_role_id)
-                    )
-                else:
-                    messagebox.showerror("Error", "Incorrect password.")
+        def logged_in(employee):
+            if employee:
+                self.navigation_manager.navigate(
+                    self.login_window,
+                    lambda: StaffPortal(self.parent, self.navigation_manager).open_portal_by_role(employee["JobRoleID"])
+                )
             else:
-                messagebox.showerror("Error", "Employee ID not found.")
-        except sqlite3.Error as e:
-            messagebox.showerror("Error", f"Database error: {e}")
-        finally:
-            if 'conn' in locals():
-                conn.close()
+                messagebox.showerror("Error", "Invalid Employee ID or password.")
+
+        self.tasks.run(
+            Database.authenticate_staff, employee_id, password,
+            on_success=logged_in,
+            on_error=lambda e: messagebox.showerror("Error", f"Database error: {e}"),
+            busy=(self.login_button,),
+            status=self.status_label,
+            status_text="Logging in...",
+        )
 
 
 class ManagerPortal:
@@ -1,4 +1,6 @@
 from tkinter import Toplevel, Label, ttk, Button, messagebox
+from gui.background import BackgroundTasks
+from gui.paged_treeview import TreeviewPager
 from utils.database import Database
 
 class ViewPastOrders:
@@ -10,6 +12,7 @@ class ViewPastOrders:
         self.parent.withdraw()
         self.past_orders_window.title("Past Orders")
         self.past_orders_window.geometry("600x400")
+        self.tasks = BackgroundTasks(self.past_orders_window)
         self.create_widgets()
 
     def create_widgets(self):
@@ -22,12 +25,19 @@ class ViewPastOrders:
             orders_table.column(col, width=100)
         orders_table.pack(fill="both", expand=True, padx=10, pady=10)
 
-        try:
-            orders = Database.fetch_past_orders(self.customer_id)
-            for order in orders:
-                orders_table.insert("", "end", values=order)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to fetch past orders: {e}")
+        status_label = Label(self.past_orders_window, text="")
+        status_label.pack()
+
+        pager = TreeviewPager(
+            orders_table,
+            lambda page_size, token, sort_by: Database.fetch_past_orders_page(
+                self.customer_id, page_size, token, sort_by or ("-OrderDate",)),
+            self.tasks,
+            sortable=("OrderID", "OrderDate"),
+            status=status_label,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to fetch past orders: {e}"),
+        )
+        pager.reload()
 
         Button(self.past_orders_window, text="Back",
                command=lambda: self.navigation_manager.back(self.past_orders_window)).pack(pady=10)
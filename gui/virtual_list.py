@@ -0,0 +1,152 @@
+from collections import OrderedDict
+from tkinter import Frame, Canvas, Scrollbar
+
+
+class VirtualList(Frame):
+    """Scrolling list that only builds widgets for the rows in view and reuses them as the user scrolls.
+
+    Rows are fetched a page at a time through fetch_page(offset, limit); create_row(parent) builds one
+    recyclable row widget and update_row(widget, row) fills it with a row's data. When tasks (a
+    BackgroundTasks) is given, pages are fetched off the Tk thread and prepare_page() turns the
+    fetched result into rows once it is back on the Tk thread.
+    """
+
+    def __init__(self, parent, row_height, create_row, update_row, page_size=50, overscan=2, max_cached_pages=20,
+                 tasks=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.row_height = row_height
+        self.create_row = create_row
+        self.update_row = update_row
+        self.page_size = page_size
+        self.overscan = overscan
+        self.max_cached_pages = max_cached_pages
+        self.tasks = tasks
+
+        self.canvas = Canvas(self, highlightthickness=0, yscrollincrement=row_height // 4)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar = Scrollbar(self, orient="vertical", command=self.canvas.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.configure(yscrollcommand=self._on_yscroll)
+        self.canvas.bind("<Configure>", self._on_resize)
+        self.bind_mousewheel(self.canvas)
+
+        self.total = 0
+        self.fetch_page = None
+        self.pages = OrderedDict()
+        self.loading_pages = set()
+        self.generation = 0
+        self.slots = []
+        self._refresh_scheduled = False
+
+    def bind_mousewheel(self, widget):
+        widget.bind("<MouseWheel>", lambda e: self._scroll(-1 if e.delta > 0 else 1))
+        widget.bind("<Button-4>", lambda e: self._scroll(-1))
+        widget.bind("<Button-5>", lambda e: self._scroll(1))
+        for child in widget.winfo_children():
+            self.bind_mousewheel(child)
+
+    def _scroll(self, direction):
+        self.canvas.yview_scroll(direction * 2, "units")
+
+    def set_source(self, total, fetch_page):
+        self.total = total
+        self.fetch_page = fetch_page
+        self.generation += 1
+        self.pages.clear()
+        self.loading_pages.clear()
+        for slot in self.slots:
+            slot[2] = None
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), total * self.row_height))
+        self.canvas.yview_moveto(0)
+        self.refresh()
+
+    def invalidate(self):
+        self.set_source(self.total, self.fetch_page)
+
+    def prepare_page(self, result):
+        return result
+
+    def _store_page(self, page, rows):
+        self.pages[page] = rows
+        if len(self.pages) > self.max_cached_pages:
+            self.pages.popitem(last=False)
+
+    def _load_page_async(self, page):
+        if page in self.loading_pages:
+            return
+        self.loading_pages.add(page)
+        generation = self.generation
+
+        def loaded(result):
+            if generation != self.generation:
+                return
+            self.loading_pages.discard(page)
+            self._store_page(page, self.prepare_page(result))
+            self.refresh()
+
+        def failed(error):
+            if generation == self.generation:
+                self.loading_pages.discard(page)
+            print(f"Error loading rows: {error}")
+
+        self.tasks.run(self.fetch_page, page * self.page_size, self.page_size, on_success=loaded, on_error=failed)
+
+    def row(self, index):
+        page, position = divmod(index, self.page_size)
+        if page in self.pages:
+            self.pages.move_to_end(page)
+        elif self.tasks is not None:
+            self._load_page_async(page)
+            return None
+        else:
+            self._store_page(page, self.prepare_page(self.fetch_page(page * self.page_size, self.page_size)))
+        rows = self.pages[page]
+        return rows[position] if position < len(rows) else None
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if not self._refresh_scheduled:
+            self._refresh_scheduled = True
+            self.after_idle(self.refresh)
+
+    def _on_resize(self, event):
+        self.canvas.configure(scrollregion=(0, 0, event.width, self.total * self.row_height))
+        for _, window, _ in self.slots:
+            self.canvas.itemconfigure(window, width=event.width)
+        self.refresh()
+
+    def refresh(self):
+        self._refresh_scheduled = False
+        if self.fetch_page is None or not self.canvas.winfo_exists():
+            return
+
+        top = self.canvas.canvasy(0)
+        bottom = top + max(self.canvas.winfo_height(), self.row_height)
+        first = max(0, int(top // self.row_height) - self.overscan)
+        last = min(self.total, int(bottom // self.row_height) + 1 + self.overscan)
+
+        while len(self.slots) < last - first:
+            widget = self.create_row(self.canvas)
+            self.bind_mousewheel(widget)
+            window = self.canvas.create_window(0, 0, window=widget, anchor="nw", width=self.canvas.winfo_width(),
+                                               height=self.row_height, state="hidden")
+            self.slots.append([widget, window, None])
+
+        free = [slot for slot in self.slots if slot[2] is None or not first <= slot[2] < last]
+        shown = {slot[2] for slot in self.slots if slot[2] is not None and first <= slot[2] < last}
+
+        for index in range(first, last):
+            if index in shown:
+                continue
+            row = self.row(index)
+            if row is None:
+                continue
+            slot = free.pop()
+            slot[2] = index
+            self.update_row(slot[0], row)
+            self.canvas.coords(slot[1], 0, index * self.row_height)
+            self.canvas.itemconfigure(slot[1], state="normal")
+
+        for slot in free:
+            slot[2] = None
+            self.canvas.itemconfigure(slot[1], state="hidden")
@@ -0,0 +1,45 @@
+"""Builds missing product thumbnails for the existing catalogue.
+
+    python -m media.backfill_thumbnails --workers 4
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from media.thumbnails import Image, make_thumbnail
+from utils.database import Database
+
+
+def _thumbnail_job(item):
+    product_id, image_version, image_data = item
+    return product_id, image_version, make_thumbnail(image_data)
+
+
+def backfill_thumbnails(workers=None, batch_size=64):
+    if Image is None:
+        raise RuntimeError("Pillow is required to build thumbnails.")
+
+    missing = Database.fetch_products_missing_thumbnails()
+    built = failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(missing), batch_size):
+            versions = dict(missing[start:start + batch_size])
+            images = Database.fetch_product_images(versions)
+            jobs = [(product_id, versions[product_id], image_data) for product_id, image_data in images.items()]
+            results = list(executor.map(_thumbnail_job, jobs, chunksize=4))
+            thumbnails = [result for result in results if result[2]]
+            Database.save_product_thumbnails(thumbnails)
+            built += len(thumbnails)
+            failed += len(results) - len(thumbnails)
+            print(f"Thumbnails: {start + len(versions)}/{len(missing)} processed")
+    return built, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build missing product thumbnails.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    built, failed = backfill_thumbnails(args.workers, args.batch_size)
+    print(f"Built {built} thumbnails, {failed} images could not be decoded.")
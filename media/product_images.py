@@ -2,7 +2,30 @@ import sqlite3
 from tkinter import filedialog, messagebox
 import os
 
+from utils.database import Database
+
 class ProductImages:
+    @staticmethod
+    def store_image(product_id, filepath):
+        """Saves the image file at filepath as the product's image; returns the number of bytes stored."""
+        with open(filepath, "rb") as file:
+            blob_data = file.read()
+        Database.update_product_image(product_id, blob_data)
+        return len(blob_data)
+
+    @staticmethod
+    def export_image(product_id, save_folder="media/product_images"):
+        """Writes the product's image to save_folder; returns the file path, or None if it has no image."""
+        image = Database.fetch_product_image(product_id)
+        if not image:
+            return None
+
+        os.makedirs(save_folder, exist_ok=True)
+        filepath = os.path.join(save_folder, f"product_{product_id}.jpg")
+        with open(filepath, "wb") as file:
+            file.write(image)
+        return filepath
+
     @staticmethod
     def save_image_to_database(product_id):
         filepath = filedialog.askopenfilename(filetypes=[("Image Files", "*.jpg;*.png;*.jpeg")])
@@ -10,41 +33,19 @@ class ProductImages:
             messagebox.showwarning("Warning", "No file selected.")
             return
 
-        with open(filepath, "rb") as file:
-            blob_data = file.read()
-
-        conn = sqlite3.connect("database/autodatabase.db")
-        conn.execute("PRAGMA foreign_keys = ON")
-        cursor = conn.cursor()
-
         try:
-            cursor.execute("UPDATE Products SET ProductImage = ? WHERE ProductID = ?", (blob_data, product_id))
-            conn.commit()
+            ProductImages.store_image(product_id, filepath)
             messagebox.showinfo("Success", "Image saved successfully.")
         except sqlite3.Error as e:
             messagebox.showerror("Error", f"Failed to save image: {e}")
-        finally:
-            conn.close()
 
     @staticmethod
     def retrieve_image_from_database(product_id, save_folder="media/product_images"):
-        conn = sqlite3.connect("database/autodatabase.db")
-        conn.execute("PRAGMA foreign_keys = ON")
-        cursor = conn.cursor()
-
         try:
-            cursor.execute("SELECT ProductImage FROM Products WHERE ProductID = ?", (product_id,))
-            result = cursor.fetchone()
-            if not result or not result[0]:
+            filepath = ProductImages.export_image(product_id, save_folder)
+            if filepath is None:
                 messagebox.showwarning("Warning", "No image found for this product.")
                 return
-
-            os.makedirs(save_folder, exist_ok=True)
-            filepath = os.path.join(save_folder, f"product_{product_id}.jpg")
-            with open(filepath, "wb") as file:
-                file.write(result[0])
             messagebox.showinfo("Success", f"Image saved to {filepath}.")
         except sqlite3.Error as e:
             messagebox.showerror("Error", f"Failed to retrieve image: {e}")
-        finally:
-            conn.close()
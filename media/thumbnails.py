@@ -0,0 +1,26 @@
+import io
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+THUMBNAIL_SIZE = (100, 100)
+
+
+def make_thumbnail(image_data, size=THUMBNAIL_SIZE):
+    """Returns a small encoded copy of image_data, or None if it cannot be decoded."""
+    if Image is None or not image_data:
+        return None
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        image.thumbnail(size)
+        output = io.BytesIO()
+        if image.mode in ("RGBA", "LA", "P"):
+            image.save(output, format="PNG", optimize=True)
+        else:
+            image.convert("RGB").save(output, format="JPEG", quality=85)
+        return output.getvalue()
+    except Exception as e:
+        print(f"Error creating thumbnail: {e}")
+        return None
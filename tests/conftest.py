@@ -0,0 +1,31 @@
+import os
+import shutil
+
+import pytest
+
+from utils.database import Database
+
+SHIPPED_DB = os.path.join(os.path.dirname(__file__), "..", "database", "autodatabase.db")
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """A private copy of the shipped database, which Database uses for the test; migrated on first connect."""
+    path = str(tmp_path / "autodatabase.db")
+    shutil.copyfile(SHIPPED_DB, path)
+    monkeypatch.setattr(Database, "DB_PATH", path)
+    yield path
+    Database.close_pool()
+
+
+@pytest.fixture
+def stock_row(db_path):
+    """(branch_id, product_id, quantity) of a BranchStock row with at least 5 in stock."""
+    conn = Database.connect()
+    try:
+        return conn.execute(
+            "SELECT BranchID, ProductID, StockQuantity FROM BranchStock WHERE StockQuantity >= 5 "
+            "ORDER BY BranchID, ProductID LIMIT 1"
+        ).fetchone()
+    finally:
+        conn.close()
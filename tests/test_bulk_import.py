@@ -0,0 +1,42 @@
+import csv
+import time
+
+from utils.bulk_import import KINDS, import_people
+from utils.database import Database
+
+
+def write_customers(path, count, invalid=0):
+    conn = Database.connect()
+    try:
+        branch_id = conn.execute("SELECT MIN(BranchID) FROM Branches").fetchone()[0]
+        level_id = conn.execute("SELECT MIN(MembershipLevelID) FROM MembershipLevels").fetchone()[0]
+    finally:
+        conn.close()
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(KINDS["customers"]["columns"])
+        for n in range(count):
+            writer.writerow(["Bulk", "Import", f"0770000{n:04d}", level_id, f"bulk{n}@example.com", "secret", branch_id])
+        for n in range(invalid):
+            writer.writerow(["Bulk", "Import", "not a number", level_id, f"bad{n}@example.com", "secret", branch_id])
+
+
+def test_import_reports_progress_as_chunks_are_hashed(db_path, tmp_path):
+    path = tmp_path / "customers.csv"
+    write_customers(path, 40, invalid=2)
+    reports = []
+
+    summary = import_people(
+        "customers", str(path), str(tmp_path / "errors.csv"), chunk_size=10,
+        progress=lambda done, total: reports.append((done, total, time.perf_counter())),
+    )
+
+    assert summary == {"rows": 42, "imported": 40, "rejected": 2}
+    assert [(done, total) for done, total, _ in reports] == [(2, 42), (12, 42), (22, 42), (32, 42), (42, 42)]
+    # Reported while the later chunks were still being hashed, not all together at the end.
+    assert reports[-1][2] - reports[1][2] > 0.05
+    conn = Database.connect()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM Customers WHERE Email LIKE 'bulk%@example.com'").fetchone()[0] == 40
+    finally:
+        conn.close()
@@ -0,0 +1,133 @@
+import shutil
+import sqlite3
+
+import pytest
+
+from custom_xml_utils.delta import acknowledge_changes, export_changes, import_changes, register_consumer
+from utils.database import Database
+from utils.schema import CHANGE_TRACKED_TABLES, change_sequence
+
+
+def copy_database(source, target):
+    """A copy of source as a snapshot would restore it; returns the change sequence it was taken at."""
+    conn = Database.connect()
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        sequence = change_sequence(conn.cursor())
+    finally:
+        conn.close()
+    shutil.copyfile(source, target)
+    return sequence
+
+
+def table_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {
+            table: conn.execute(f"SELECT * FROM {table} ORDER BY {', '.join(keys)}").fetchall()
+            for table, keys in CHANGE_TRACKED_TABLES.items()
+        }
+    finally:
+        conn.close()
+
+
+def use_database(monkeypatch, path):
+    Database.close_pool()
+    monkeypatch.setattr(Database, "DB_PATH", path)
+
+
+@pytest.fixture
+def replica(db_path, stock_row, tmp_path):
+    """(path, watermark) of a copy of the test database, taken before any changes are made to it."""
+    path = str(tmp_path / "replica.db")
+    return path, copy_database(db_path, path)
+
+
+def make_changes(stock_row):
+    """A new customer with a new order, and a product update: rows in parent and child tables."""
+    branch_id, product_id, _ = stock_row
+    Database.signup_customer("Delta", "Tester", "01234567890", 1, "delta@example.com", "secret", branch_id)
+    conn = Database.connect()
+    try:
+        customer_id = conn.execute("SELECT CustomerID FROM Customers WHERE Email = 'delta@example.com'").fetchone()[0]
+        category_id, price = conn.execute(
+            "SELECT CategoryID, Price FROM Products WHERE ProductID = ?", (product_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    result = Database.checkout(customer_id, [(branch_id, product_id, 2)])
+    assert result["OrderID"] is not None
+    Database.update_product(product_id, category_id, price + 1)
+
+
+def test_delta_with_new_customer_and_order_round_trips(db_path, replica, stock_row, tmp_path, monkeypatch):
+    replica_path, watermark = replica
+    make_changes(stock_row)
+    delta = str(tmp_path / "delta")
+    manifest = export_changes(delta, since=watermark, format="jsonl")
+    assert manifest["tables"]["Customers"]["changed"]["rows"] == 1
+    assert manifest["tables"]["CustomerOrders"]["changed"]["rows"] == 1
+    expected = table_rows(db_path)
+
+    use_database(monkeypatch, replica_path)
+    import_changes(delta)
+    assert table_rows(replica_path) == expected
+    conn = Database.connect()
+    try:
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+    finally:
+        conn.close()
+
+
+def test_applying_a_delta_twice_changes_nothing(db_path, replica, stock_row, tmp_path, monkeypatch):
+    replica_path, watermark = replica
+    make_changes(stock_row)
+    delta = str(tmp_path / "delta")
+    export_changes(delta, since=watermark)
+
+    use_database(monkeypatch, replica_path)
+    import_changes(delta)
+    conn = Database.connect()
+    try:
+        sequence = change_sequence(conn.cursor())
+    finally:
+        conn.close()
+    import_changes(delta)
+    conn = Database.connect()
+    try:
+        assert change_sequence(conn.cursor()) == sequence
+    finally:
+        conn.close()
+
+
+def test_deleted_rows_are_removed(db_path, replica, stock_row, tmp_path, monkeypatch):
+    replica_path, watermark = replica
+    branch_id, product_id, _ = stock_row
+    Database.release_stock([(branch_id, product_id, 1)])
+    conn = Database.connect()
+    try:
+        conn.execute("DELETE FROM BranchStock WHERE BranchID = ? AND ProductID = ?", (branch_id, product_id))
+        conn.commit()
+    finally:
+        conn.close()
+    delta = str(tmp_path / "delta")
+    manifest = export_changes(delta, since=watermark)
+    assert manifest["tables"]["BranchStock"]["deleted"]["rows"] == 1
+    assert manifest["tables"]["BranchStock"]["changed"]["rows"] == 0
+
+    use_database(monkeypatch, replica_path)
+    import_changes(delta)
+    assert table_rows(replica_path)["BranchStock"] == table_rows(db_path)["BranchStock"]
+
+
+def test_acknowledged_changes_are_compacted(db_path, replica, stock_row, tmp_path):
+    _, watermark = replica
+    register_consumer("nightly", watermark)
+    make_changes(stock_row)
+    manifest = export_changes(str(tmp_path / "delta"), consumer="nightly")
+    assert acknowledge_changes("nightly", manifest["until"]) > 0
+    with pytest.raises(ValueError):
+        export_changes(str(tmp_path / "stale"), since=watermark)
+    later = export_changes(str(tmp_path / "next"), consumer="nightly")
+    assert later["since"] == manifest["until"]
+    assert all(entry["changed"]["rows"] == 0 for entry in later["tables"].values())
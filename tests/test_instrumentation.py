@@ -0,0 +1,18 @@
+import threading
+
+from utils.instrumentation import Metrics
+
+
+def test_slow_queries_counted_from_many_threads():
+    metrics = Metrics(slow_query_ms=0)
+
+    def record():
+        for _ in range(10000):
+            metrics.record_slow()
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert metrics.snapshot()["slow_queries"] == 80000
@@ -0,0 +1,60 @@
+import sqlite3
+
+from utils.database import Database
+from utils.migrations import current_version, latest_version, migrate
+
+
+def test_shipped_database_is_migrated_to_latest_on_connect(db_path):
+    conn = Database.connect()
+    try:
+        assert current_version(conn.cursor()) == latest_version()
+        products = conn.execute("SELECT COUNT(*) FROM Products").fetchone()[0]
+        # Products already in the database are added to the search index when it is created.
+        assert conn.execute("SELECT COUNT(*) FROM ProductSearch").fetchone()[0] == products
+    finally:
+        conn.close()
+
+
+def test_migrate_is_stepwise_and_idempotent(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        assert migrate(conn, target=3) == [1, 2, 3]
+        assert current_version(conn.cursor()) == 3
+        assert migrate(conn) == list(range(4, latest_version() + 1))
+        assert migrate(conn) == []
+        versions = [row[0] for row in conn.execute("SELECT Version FROM SchemaVersion ORDER BY Version")]
+        assert versions == list(range(1, latest_version() + 1))
+    finally:
+        conn.close()
+
+
+def test_migrations_drop_customer_order_stock_trigger(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        migrate(conn)
+        triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+        assert "BeforeInsertCustomerOrder" not in triggers
+        assert "PreventDuplicateEmployee" in triggers
+    finally:
+        conn.close()
+
+
+def test_change_tracking_is_added_to_tables_tracked_after_migration_8(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        migrate(conn)
+        # A database migrated when only Products, BranchStock and Orders were tracked.
+        for event in ("Insert", "Update", "KeyUpdate", "Delete"):
+            conn.execute(f"DROP TRIGGER CustomersChangeLogAfter{event}")
+        conn.execute("DELETE FROM SchemaVersion WHERE Version = 10")
+        conn.commit()
+        assert migrate(conn) == [10]
+        conn.execute(
+            "INSERT INTO Customers (FirstName, Surname, ContactNumber, MembershipLevelID, Email, Password) "
+            "VALUES ('New', 'Customer', '01234567890', 1, 'new@example.com', 'x')"
+        )
+        assert conn.execute(
+            "SELECT Operation FROM ChangeLog WHERE TableName = 'Customers' ORDER BY Sequence DESC LIMIT 1"
+        ).fetchone() == ("I",)
+    finally:
+        conn.close()
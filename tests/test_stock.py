@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+
+from utils.database import Database
+
+
+def stock(branch_id, product_id):
+    return Database.fetch_stock_quantity(branch_id, product_id)
+
+
+def test_reserve_takes_stock_only_when_there_is_enough(stock_row):
+    branch_id, product_id, quantity = stock_row
+    assert Database.reserve_stock(branch_id, product_id, 2) == quantity - 2
+    assert Database.reserve_stock(branch_id, product_id, quantity) is None
+    assert stock(branch_id, product_id) == quantity - 2
+
+
+def test_reserve_batch_is_all_or_nothing(stock_row):
+    branch_id, product_id, quantity = stock_row
+    results = Database.reserve_stock_batch([(branch_id, product_id, 1), (branch_id, product_id, quantity * 10)])
+    assert results == [quantity - 1, None]
+    assert stock(branch_id, product_id) == quantity
+
+
+def test_reserve_rejects_non_positive_quantities(stock_row):
+    branch_id, product_id, _ = stock_row
+    with pytest.raises(ValueError):
+        Database.reserve_stock(branch_id, product_id, 0)
+
+
+def test_release_puts_reserved_stock_back(stock_row):
+    branch_id, product_id, quantity = stock_row
+    Database.reserve_stock(branch_id, product_id, 3)
+    assert Database.release_stock([(branch_id, product_id, 3)]) == 1
+    assert stock(branch_id, product_id) == quantity
+
+
+def test_concurrent_reservations_never_oversell(stock_row):
+    branch_id, product_id, quantity = stock_row
+    results = []
+
+    def worker():
+        results.append(Database.reserve_stock(branch_id, product_id, 1))
+
+    threads = [threading.Thread(target=worker) for _ in range(quantity + 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(result is not None for result in results) == quantity
+    assert stock(branch_id, product_id) == 0
+
+
+def customer_id():
+    conn = Database.connect()
+    try:
+        return conn.execute("SELECT MIN(CustomerID) FROM Customers").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def order_lines(order_id):
+    conn = Database.connect()
+    try:
+        return conn.execute(
+            "SELECT ProductID, OrderQuantity FROM CustomerOrders WHERE OrderID = ? ORDER BY ProductID", (order_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def test_checkout_takes_stock_and_records_the_order(stock_row):
+    branch_id, product_id, quantity = stock_row
+    result = Database.checkout(customer_id(), [(branch_id, product_id, 1), (branch_id, product_id, 1)])
+    assert result["OrderID"] is not None
+    assert [line["Status"] for line in result["Lines"]] == ["ok"]
+    assert order_lines(result["OrderID"]) == [(product_id, 2)]
+    assert stock(branch_id, product_id) == quantity - 2
+
+
+def test_short_checkout_is_cancelled_and_keeps_stock(stock_row):
+    branch_id, product_id, quantity = stock_row
+    conn = Database.connect()
+    try:
+        other = conn.execute(
+            "SELECT BranchID, ProductID, StockQuantity FROM BranchStock WHERE ProductID <> ? AND StockQuantity > 0 "
+            "LIMIT 1", (product_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    lines = [(branch_id, product_id, 1), (other[0], other[1], other[2] + 1)]
+
+    result = Database.checkout(customer_id(), lines)
+    assert result["OrderID"] is None
+    assert [line["Status"] for line in result["Lines"]] == ["cancelled", "insufficient_stock"]
+    assert stock(branch_id, product_id) == quantity
+
+    result = Database.checkout(customer_id(), lines, allow_partial=True)
+    assert result["OrderID"] is not None
+    assert order_lines(result["OrderID"]) == [(product_id, 1)]
+    assert stock(branch_id, product_id) == quantity - 1
+
+
+def test_checkout_of_reserved_basket_does_not_take_stock_twice(stock_row):
+    branch_id, product_id, quantity = stock_row
+    Database.reserve_stock(branch_id, product_id, 2)
+    order_id = Database.add_customer_order(customer_id(), {product_id: {"branch": branch_id, "quantity": 2}})
+    assert order_lines(order_id) == [(product_id, 2)]
+    assert stock(branch_id, product_id) == quantity - 2
@@ -0,0 +1,32 @@
+from utils.database import Database
+
+
+def product_with_image():
+    conn = Database.connect()
+    try:
+        return conn.execute(
+            "SELECT ProductID, ImageVersion FROM Products WHERE ImageVersion IS NOT NULL ORDER BY ProductID LIMIT 1"
+        ).fetchone()
+    finally:
+        conn.close()
+
+
+def test_saved_thumbnails_are_served_until_the_image_changes(db_path):
+    product_id, version = product_with_image()
+    Database.save_product_thumbnails([(product_id, version, b"thumb")])
+    assert Database.fetch_product_thumbnails([product_id]) == {product_id: b"thumb"}
+    assert (product_id, version) not in Database.fetch_products_missing_thumbnails()
+
+    Database.update_product_image(product_id, b"new image")
+    assert Database.fetch_product_thumbnails([product_id]) == {}
+
+
+def test_resaving_the_same_image_keeps_the_thumbnail(db_path):
+    product_id, version = product_with_image()
+    Database.save_product_thumbnails([(product_id, version, b"thumb")])
+    Database.update_product_image(product_id, Database.fetch_product_image(product_id))
+    assert Database.fetch_product_thumbnails([product_id]) == {product_id: b"thumb"}
+
+
+def test_saving_nothing_is_a_no_op(db_path):
+    assert Database.save_product_thumbnails([]) is None
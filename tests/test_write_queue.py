@@ -0,0 +1,111 @@
+import sqlite3
+import threading
+
+import pytest
+
+from utils.write_queue import WriteQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    path = str(tmp_path / "queue.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE Counter (ID INTEGER PRIMARY KEY, Value INTEGER NOT NULL)")
+    conn.execute("INSERT INTO Counter (ID, Value) VALUES (1, 0)")
+    conn.commit()
+    conn.close()
+    queue = WriteQueue(lambda: sqlite3.connect(path, check_same_thread=False))
+    queue.path = path
+    yield queue
+    queue.stop()
+
+
+def read_counter(queue):
+    conn = sqlite3.connect(queue.path)
+    try:
+        return conn.execute("SELECT Value FROM Counter WHERE ID = 1").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def increment(cursor, amount=1):
+    cursor.execute("UPDATE Counter SET Value = Value + ? WHERE ID = 1 RETURNING Value", (amount,))
+    return cursor.fetchone()[0]
+
+
+def test_execute_returns_the_job_result_and_commits(queue):
+    assert queue.execute(increment, 5) == 5
+    assert read_counter(queue) == 5
+
+
+def test_failed_job_is_rolled_back_without_affecting_its_batch(queue):
+    def fail(cursor):
+        increment(cursor, 100)
+        raise ValueError("boom")
+
+    # Hold the writer in a job until the others are queued, so they are committed together.
+    gate = threading.Event()
+    blocker = queue.submit(lambda cursor: gate.wait(5))
+    futures = [queue.submit(increment, 1), queue.submit(fail), queue.submit(increment, 2)]
+    gate.set()
+    blocker.result()
+    assert futures[0].result() == 1
+    with pytest.raises(ValueError):
+        futures[1].result()
+    assert futures[2].result() == 3
+    assert read_counter(queue) == 3
+
+
+def test_nested_submit_runs_inside_the_calling_job(queue):
+    def outer(cursor):
+        return queue.execute(increment, 1) + increment(cursor, 1)
+
+    assert queue.execute(outer) == 3
+    assert read_counter(queue) == 2
+
+
+def test_concurrent_submitters_lose_no_writes(queue):
+    def worker():
+        for _ in range(50):
+            queue.execute(increment)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert read_counter(queue) == 400
+    assert queue.jobs_run == 400
+
+
+def test_submit_after_stop_is_refused(queue):
+    queue.execute(increment)
+    queue.stop()
+    with pytest.raises(RuntimeError):
+        queue.submit(increment)
+
+
+def test_job_that_ends_the_transaction_fails_its_batch_but_not_the_writer(queue):
+    def commit_itself(cursor):
+        increment(cursor)
+        cursor.execute("COMMIT")
+
+    with pytest.raises(sqlite3.Error):
+        queue.execute(commit_itself)
+    assert queue.execute(increment) == read_counter(queue)
+
+
+def test_writer_reconnects_after_the_connection_fails(queue):
+    def close_connection(cursor):
+        cursor.connection.close()
+
+    with pytest.raises(sqlite3.Error):
+        queue.execute(close_connection)
+    assert queue.execute(increment, 7) == 7
+
+
+def test_dead_writer_thread_is_restarted(queue):
+    queue.execute(increment)
+    queue._jobs.put(None)
+    queue._thread.join()
+    assert queue.execute(increment) == 2
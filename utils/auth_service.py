@@ -0,0 +1,93 @@
+import atexit
+import itertools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import encryption
+
+
+class AuthService:
+    """Runs password key derivation in a pool of worker processes.
+
+    PBKDF2 and scrypt are CPU-bound; in worker processes they neither stall the calling (Tk or
+    database) thread nor hold the GIL, and logins arriving together are hashed in parallel. The
+    *_async methods return concurrent.futures.Future objects (asyncio callers can wrap them with
+    asyncio.wrap_future); the plain methods wait for the result.
+
+    The algorithm and parameters are read from utils.encryption when a job is submitted and sent
+    with it, so changing them at runtime applies even to workers that have already started.
+    """
+
+    MAX_WORKERS = None
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+                # Registered after multiprocessing's own exit handler, so it runs first and the
+                # workers are stopped before that handler waits for them.
+                atexit.register(cls.shutdown_shared)
+            return cls._shared
+
+    @classmethod
+    def shutdown_shared(cls):
+        with cls._shared_lock:
+            if cls._shared is not None:
+                cls._shared.shutdown()
+                cls._shared = None
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Forking a process that is running Tk and the database threads is unsafe; start clean workers.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def hash_password_async(self, password):
+        algorithm, parameters = encryption.current_parameters()
+        return self.executor().submit(encryption.hash_password, password, algorithm, parameters)
+
+    def hash_passwords(self, passwords, chunksize=8):
+        """Hashes many passwords across all workers; yields the hashes in input order as they complete."""
+        algorithm, parameters = encryption.current_parameters()
+        return self.executor().map(
+            encryption.hash_password, passwords, itertools.repeat(algorithm), itertools.repeat(parameters),
+            chunksize=chunksize,
+        )
+
+    def verify_password_async(self, stored_password, entered_password):
+        return self.executor().submit(encryption.verify_password, stored_password, entered_password)
+
+    def verify_and_rehash_async(self, stored_password, entered_password):
+        """Future of (matches, new_hash), new_hash being set when the stored hash uses old parameters."""
+        algorithm, parameters = encryption.current_parameters()
+        return self.executor().submit(
+            encryption.verify_and_rehash, stored_password, entered_password, algorithm, parameters
+        )
+
+    def hash_password(self, password):
+        return self.hash_password_async(password).result()
+
+    def verify_password(self, stored_password, entered_password):
+        return self.verify_password_async(stored_password, entered_password).result()
+
+    def verify_and_rehash(self, stored_password, entered_password):
+        return self.verify_and_rehash_async(stored_password, entered_password).result()
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
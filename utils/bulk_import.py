@@ -0,0 +1,225 @@
+"""Bulk import of customers or staff from a CSV or XML file.
+
+    python -m utils.bulk_import customers new_customers.csv [--errors rejected.csv] [--chunk-size 500]
+    python -m utils.bulk_import staff new_staff.xml
+
+CSV files need a header row naming the columns in KINDS; XML files use the layout
+XMLUtils.export_to_xml writes (<Customers><record><FirstName>...</FirstName>...</record>...).
+Passwords are given in plain text and hashed in the AuthService worker processes, all cores at once.
+
+Every row is validated before anything is written: required fields, email and contact number
+format, branch, job role and membership level ids (checked against sets loaded once), and
+duplicates against the table and the rest of the file. Valid rows are inserted with executemany,
+chunk_size rows per writer job; a chunk that still hits a constraint is retried row by row so
+only the offending rows are rejected. Rejected rows go to the error file with their line number
+and reason, without the password.
+"""
+import argparse
+import csv
+import os
+import re
+import sqlite3
+import xml.etree.ElementTree as ET
+
+from utils.auth_service import AuthService
+from utils.database import Database
+
+KINDS = {
+    "customers": {
+        "table": "Customers",
+        "columns": ("FirstName", "Surname", "ContactNumber", "MembershipLevelID", "Email", "Password", "BranchID"),
+        "unique": "Email",
+    },
+    "staff": {
+        "table": "Employees",
+        "columns": ("FirstName", "Surname", "ContactNumber", "BranchID", "JobRoleID", "Password"),
+        # PreventDuplicateEmployee rejects a second employee with the same contact number.
+        "unique": "ContactNumber",
+    },
+}
+ID_COLUMNS = ("BranchID", "JobRoleID", "MembershipLevelID")
+
+NAME_PATTERN = re.compile(r"^[a-zA-Z- ]+$")
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+CONTACT_PATTERN = re.compile(r"^\d{10,15}$")
+
+
+def read_records(path):
+    """Yields (line, record) for every row of a CSV or XML file; line is the CSV line or XML record number."""
+    if path.lower().endswith(".xml"):
+        # iterparse, clearing each record once read, so large files are not held in memory.
+        number = 0
+        for _, element in ET.iterparse(path):
+            if element.tag == "record":
+                number += 1
+                yield number, {child.tag: (child.text or "").strip() for child in element}
+                element.clear()
+        return
+
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        reader = csv.DictReader(file)
+        for record in reader:
+            yield reader.line_num, {key: (value or "").strip() for key, value in record.items() if key}
+
+
+def format_name(name):
+    if not NAME_PATTERN.match(name):
+        return None
+    # The separators are kept by the split, so "mary-jane smith" becomes "Mary-Jane Smith".
+    return "".join(part.capitalize() for part in re.split(r"(-| )", name.lower()))
+
+
+def load_references(kind):
+    """Ids the rows may refer to, and the values already taken in the kind's unique column."""
+    spec = KINDS[kind]
+    cache = Database.reference_cache()
+    conn = Database.connect()
+    try:
+        return {
+            "BranchID": set(cache.table("branches")[1]),
+            "JobRoleID": set(cache.table("job_roles")[1]),
+            "MembershipLevelID": {row[0] for row in conn.execute("SELECT MembershipLevelID FROM MembershipLevels")},
+            "taken": {row[0] for row in conn.execute(f"SELECT {spec['unique']} FROM {spec['table']}")},
+        }
+    finally:
+        conn.close()
+
+
+def validate(kind, record, references):
+    """Returns (values in KINDS column order, None) or (None, reason)."""
+    spec = KINDS[kind]
+    missing = [column for column in spec["columns"] if not record.get(column)]
+    if missing:
+        return None, f"Missing {', '.join(missing)}."
+
+    values = dict(record)
+    for column in ("FirstName", "Surname"):
+        values[column] = format_name(record[column])
+        if values[column] is None:
+            return None, f"Invalid {column}: only letters, spaces and hyphens are allowed."
+    if not CONTACT_PATTERN.match(record["ContactNumber"]):
+        return None, "ContactNumber must be 10-15 digits."
+    if "Email" in spec["columns"] and not EMAIL_PATTERN.match(record["Email"]):
+        return None, "Invalid Email."
+
+    for column in ID_COLUMNS:
+        if column not in spec["columns"]:
+            continue
+        try:
+            values[column] = int(record[column])
+        except ValueError:
+            return None, f"{column} must be a number."
+        if values[column] not in references[column]:
+            return None, f"{column} {values[column]} does not exist."
+
+    unique = values[spec["unique"]]
+    if unique in references["taken"]:
+        return None, f"{spec['unique']} {unique} is already in use."
+    references["taken"].add(unique)
+    return tuple(values[column] for column in spec["columns"]), None
+
+
+def insert_chunk(cursor, statement, rows):
+    """Writer job: inserts rows in one executemany; returns (index, error) for rows that had to be rejected."""
+    cursor.execute("SAVEPOINT bulk_import")
+    try:
+        cursor.executemany(statement, rows)
+        cursor.execute("RELEASE bulk_import")
+        return []
+    except sqlite3.IntegrityError:
+        cursor.execute("ROLLBACK TO bulk_import")
+
+    failures = []
+    for index, row in enumerate(rows):
+        try:
+            cursor.execute(statement, row)
+        except sqlite3.IntegrityError as e:
+            failures.append((index, str(e)))
+    cursor.execute("RELEASE bulk_import")
+    return failures
+
+
+def write_errors(path, kind, failures):
+    columns = [column for column in KINDS[kind]["columns"] if column != "Password"]
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Line", "Error"] + columns)
+        for line, record, error in sorted(failures, key=lambda failure: failure[0]):
+            writer.writerow([line, error] + [record.get(column, "") for column in columns])
+
+
+def import_people(kind, path, errors_path=None, chunk_size=500, progress=None):
+    """Imports the customers or staff in path; returns a summary dict of rows read, imported and rejected.
+
+    progress, when given, is called as progress(done, total) from this thread once the file has been
+    validated and then each time a chunk's passwords have been hashed and the chunk handed to the
+    writer; done counts the rows rejected so far plus those handed over.
+    """
+    spec = KINDS[kind]
+    references = load_references(kind)
+    valid = []
+    failures = []
+    for line, record in read_records(path):
+        values, error = validate(kind, record, references)
+        if error:
+            failures.append((line, record, error))
+        else:
+            valid.append((line, record, values))
+
+    total = len(valid) + len(failures)
+    password_index = spec["columns"].index("Password")
+    hashes = AuthService.shared().hash_passwords([values[password_index] for _, _, values in valid])
+    statement = (f"INSERT INTO {spec['table']} ({', '.join(spec['columns'])}) "
+                 f"VALUES ({', '.join('?' for _ in spec['columns'])})")
+
+    # Chunks are queued as soon as their passwords are hashed, so inserting overlaps with hashing
+    # and the writer can commit several queued chunks together.
+    pending = []
+    writer = Database.writer()
+    done = len(failures)
+    if progress is not None:
+        progress(done, total)
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        rows = []
+        for _, _, values in chunk:
+            row = list(values)
+            row[password_index] = next(hashes)
+            rows.append(row)
+        pending.append((chunk, writer.submit(insert_chunk, statement, rows)))
+        done += len(chunk)
+        if progress is not None:
+            progress(done, total)
+
+    for chunk, future in pending:
+        for index, error in future.result():
+            line, record, _ = chunk[index]
+            failures.append((line, record, error))
+
+    # Written even when empty, so an error file left by an earlier run is not mistaken for this one's.
+    if errors_path:
+        write_errors(errors_path, kind, failures)
+    return {"rows": total, "imported": total - len(failures), "rejected": len(failures)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import customers or staff from a CSV or XML file.")
+    parser.add_argument("kind", choices=sorted(KINDS))
+    parser.add_argument("path")
+    parser.add_argument("--errors", help="CSV file for rejected rows (default: <path>.errors.csv).")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    errors_path = args.errors or os.path.splitext(args.path)[0] + ".errors.csv"
+    summary = import_people(
+        args.kind, args.path, errors_path, args.chunk_size,
+        progress=lambda done, total: print(f"{args.kind}: {done}/{total} rows processed"),
+    )
+    print(f"Imported {summary['imported']} of {summary['rows']} {args.kind}; {summary['rejected']} rejected.")
+    if summary["rejected"]:
+        print(f"Rejected rows written to {errors_path}")
+    Database.close_pool()
+
+
+if __name__ == "__main__":
+    main()
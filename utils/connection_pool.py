@@ -0,0 +1,174 @@
+import queue
+import sqlite3
+import threading
+import time
+
+
+class PooledConnection:
+    """Thin proxy around a pooled sqlite3 connection; close() hands it back to the pool."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed connection.")
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._conn.__exit__(exc_type, exc_value, traceback)
+
+    @property
+    def raw(self):
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+
+DEFAULT_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -16000),
+    ("mmap_size", 268435456),
+    ("busy_timeout", 5000),
+    ("temp_store", "MEMORY"),
+    ("foreign_keys", "ON"),
+)
+
+
+class ConnectionPool:
+    """Bounded pool of sqlite3 connections to a single database file."""
+
+    def __init__(self, db_path, max_size=8, timeout=5.0, health_check_interval=30.0, pragmas=DEFAULT_PRAGMAS,
+                 on_connect=(), factory=sqlite3.Connection):
+        self.db_path = db_path
+        self.pragmas = pragmas
+        self.on_connect = on_connect
+        self.factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._closed = False
+
+        self._acquisitions = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._health_check_failures = 0
+
+    def open_connection(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=self.factory)
+        for name, value in self.pragmas:
+            conn.execute(f"PRAGMA {name} = {value}").fetchall()
+        for hook in self.on_connect:
+            hook(conn)
+        return conn
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def acquire(self):
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed.")
+
+        start = time.perf_counter()
+        conn = None
+        while conn is None:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._created < self.max_size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    try:
+                        conn = self.open_connection()
+                    except sqlite3.Error:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                    break
+                remaining = self.timeout - (time.perf_counter() - start)
+                try:
+                    conn, last_used = self._idle.get(timeout=max(remaining, 0))
+                except queue.Empty:
+                    raise sqlite3.OperationalError(
+                        f"Timed out after {self.timeout}s waiting for a database connection"
+                    )
+
+            if time.monotonic() - last_used > self.health_check_interval and not self._is_healthy(conn):
+                with self._lock:
+                    self._health_check_failures += 1
+                self._discard(conn)
+                conn = None
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._in_use += 1
+            self._acquisitions += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        with self._lock:
+            self._in_use -= 1
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        if self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+
+    def close_all(self):
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "db_path": self.db_path,
+                "max_size": self.max_size,
+                "size": self._created,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "acquisitions": self._acquisitions,
+                "avg_wait_ms": (self._total_wait / self._acquisitions * 1000) if self._acquisitions else 0.0,
+                "max_wait_ms": self._max_wait * 1000,
+                "health_check_failures": self._health_check_failures,
+            }
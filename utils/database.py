@@ -1,17 +1,99 @@
 import sqlite3
+import json
 import os
+import re
+import threading
 
-from utils.encryption import hash_password, verify_password
+from media.thumbnails import make_thumbnail
+from utils.connection_pool import ConnectionPool, DEFAULT_PRAGMAS
+from utils.auth_service import AuthService
+from utils.pagination import fetch_keyset_page
+from utils.reference_cache import ReferenceCache
+from utils.migrations import migrate
+from utils.write_queue import WriteQueue
 
 
 class Database:
     DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../database/autodatabase.db"))
+    POOL_SIZE = 8
+    STORAGE_PRAGMAS = DEFAULT_PRAGMAS
+    # Callables run on every new connection (tracing, instrumentation); read when the pool is created.
+    CONNECTION_HOOKS = []
+    CONNECTION_FACTORY = sqlite3.Connection
+
+    _pool = None
+    _writer = None
+    _reference_cache = None
+    _pool_lock = threading.Lock()
+
+    @staticmethod
+    def pool():
+        with Database._pool_lock:
+            if Database._pool is None or Database._pool.db_path != Database.DB_PATH:
+                Database._close_pool()
+                Database._pool = ConnectionPool(
+                    Database.DB_PATH, max_size=Database.POOL_SIZE, pragmas=Database.STORAGE_PRAGMAS,
+                    on_connect=tuple(Database.CONNECTION_HOOKS), factory=Database.CONNECTION_FACTORY,
+                )
+                Database._writer = WriteQueue(Database._pool.open_connection)
+                Database._reference_cache = ReferenceCache(Database._pool.open_connection)
+                conn = Database._pool.acquire()
+                try:
+                    migrate(conn)
+                finally:
+                    conn.close()
+            return Database._pool
+
+    @staticmethod
+    def _close_pool():
+        if Database._pool is not None:
+            Database._pool.close_all()
+            Database._writer.stop()
+            Database._reference_cache.close()
+        Database._pool = Database._writer = Database._reference_cache = None
+
+    @staticmethod
+    def close_pool():
+        """Closes every connection and stops the password hashing workers; the next call reopens them
+        with the current settings."""
+        with Database._pool_lock:
+            Database._close_pool()
+        # A process that exits joins its children first, idle AuthService workers included, and
+        # ProcessPoolExecutor workers exit without running atexit handlers, so stop them here.
+        AuthService.shutdown_shared()
+
+    @staticmethod
+    def writer():
+        Database.pool()
+        return Database._writer
 
     @staticmethod
     def connect():
-        conn = sqlite3.connect(Database.DB_PATH)
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        return Database.pool().acquire()
+
+    @staticmethod
+    def pool_stats():
+        return Database.pool().stats()
+
+    @staticmethod
+    def reference_cache():
+        Database.pool()
+        return Database._reference_cache
+
+    @staticmethod
+    def reference_cache_stats():
+        return Database.reference_cache().stats()
+
+    @staticmethod
+    def invalidate_reference_data():
+        Database.reference_cache().invalidate()
+
+    @staticmethod
+    def search_match_expression(search):
+        tokens = re.findall(r"\w+", search or "")
+        if not tokens:
+            return None
+        return " ".join(f'"{token}"*' for token in tokens)
 
     @staticmethod
     def fetch_all_staff():
@@ -27,17 +109,39 @@ class Database:
             conn.close()
 
     @staticmethod
-    def add_staff(first_name, surname, contact_number, branch_id, job_role_id, hashed_password):
+    def fetch_staff_page(page_size=100, token=None, sort_by=None):
         conn = Database.connect()
         cursor = conn.cursor()
         try:
-            cursor.execute("SELECT 1 FROM Branches WHERE BranchID = ?", (branch_id,))
-            if not cursor.fetchone():
-                raise ValueError(f"BranchID {branch_id} does not exist.")
+            return fetch_keyset_page(
+                cursor,
+                "SELECT EmployeeID, FirstName, Surname, ContactNumber, BranchID, JobRoleID",
+                "FROM Employees WHERE 1=1",
+                [],
+                sort_by,
+                {"EmployeeID": "EmployeeID", "FirstName": "FirstName", "Surname": "Surname",
+                 "BranchID": "BranchID", "JobRoleID": "JobRoleID"},
+                ["EmployeeID"],
+                page_size,
+                token,
+            )
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return [], None
+        finally:
+            conn.close()
 
-            cursor.execute("SELECT 1 FROM JobRoles WHERE JobRoleID = ?", (job_role_id,))
-            if not cursor.fetchone():
-                raise ValueError(f"JobRoleID {job_role_id} does not exist.")
+    @staticmethod
+    def add_staff(first_name, surname, contact_number, branch_id, job_role_id, hashed_password):
+        cache = Database.reference_cache()
+        if cache.label("branches", branch_id) is None:
+            raise ValueError(f"BranchID {branch_id} does not exist.")
+        if cache.label("job_roles", job_role_id) is None:
+            raise ValueError(f"JobRoleID {job_role_id} does not exist.")
+
+        conn = Database.connect()
+        cursor = conn.cursor()
+        try:
 
             cursor.execute("""
                 INSERT INTO Employees (FirstName, Surname, ContactNumber, BranchID, JobRoleID, Password)
@@ -107,6 +211,29 @@ class Database:
         finally:
             conn.close()
 
+    @staticmethod
+    def fetch_customers_page(page_size=100, token=None, sort_by=None):
+        conn = Database.connect()
+        cursor = conn.cursor()
+        try:
+            return fetch_keyset_page(
+                cursor,
+                "SELECT CustomerID, FirstName, Surname, ContactNumber, MembershipLevelID",
+                "FROM Customers WHERE 1=1",
+                [],
+                sort_by,
+                {"CustomerID": "CustomerID", "FirstName": "FirstName", "Surname": "Surname",
+                 "MembershipLevelID": "MembershipLevelID"},
+                ["CustomerID"],
+                page_size,
+                token,
+            )
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return [], None
+        finally:
+            conn.close()
+
     @staticmethod
     def update_customer(customer_id, contact_number, membership_level_id):
         conn = Database.connect()
@@ -151,46 +278,93 @@ class Database:
             conn.close()
 
     @staticmethod
-    def fetch_supplier_products(supplier_id, search=None, category_id=None, min_price=None, max_price=None):
+    def fetch_products_page(page_size=100, token=None, sort_by=None):
         conn = Database.connect()
         cursor = conn.cursor()
         try:
+            return fetch_keyset_page(
+                cursor,
+                "SELECT ProductID, ProductName, CategoryID, Price",
+                "FROM Products WHERE 1=1",
+                [],
+                sort_by,
+                {"ProductID": "ProductID", "ProductName": "ProductName", "CategoryID": "CategoryID", "Price": "Price"},
+                ["ProductID"],
+                page_size,
+                token,
+            )
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return [], None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _product_filters(query, params, search_joined, search, category_id, min_price, max_price):
+        if search and not search_joined:
+            query += " AND p.ProductName LIKE ?"
+            params.append(f"%{search}%")
+        if category_id:
+            query += " AND p.CategoryID = ?"
+            params.append(category_id)
+        if min_price is not None:
+            query += " AND p.Price >= ?"
+            params.append(min_price)
+        if max_price is not None:
+            query += " AND p.Price <= ?"
+            params.append(max_price)
+        return query, params
+
+    @staticmethod
+    def _supplier_products_query(supplier_id, search, category_id, min_price, max_price):
+        match = Database.search_match_expression(search)
+        if match:
+            query = """
+                FROM ProductSearch s
+                JOIN Products p ON p.ProductID = s.rowid
+                JOIN SupplierProducts sp ON p.ProductID = sp.ProductID
+                WHERE ProductSearch MATCH ? AND sp.SupplierID = ?
+            """
+            params = [match, supplier_id]
+        else:
             query = """
-                SELECT 
-                    p.ProductID, 
-                    p.ProductName, 
-                    p.Price, 
-                    p.CategoryID, 
-                    p.ProductImage
                 FROM Products p
                 JOIN SupplierProducts sp ON p.ProductID = sp.ProductID
                 WHERE sp.SupplierID = ?
             """
             params = [supplier_id]
+        query, params = Database._product_filters(query, params, match, search, category_id, min_price, max_price)
+        order_by = " ORDER BY s.rank, p.ProductID" if match else " ORDER BY p.ProductID"
+        return query, params, order_by
 
-            if search:
-                query += " AND p.ProductName LIKE ?"
-                params.append(f"%{search}%")
-
-            if category_id:
-                query += " AND p.CategoryID = ?"
-                params.append(category_id)
-
-            if min_price is not None:
-                query += " AND p.Price >= ?"
-                params.append(min_price)
-
-            if max_price is not None:
-                query += " AND p.Price <= ?"
-                params.append(max_price)
+    @staticmethod
+    def fetch_supplier_products(supplier_id, search=None, category_id=None, min_price=None, max_price=None,
+                                limit=None, offset=0):
+        conn = Database.connect()
+        cursor = conn.cursor()
+        try:
+            query, params, order_by = Database._supplier_products_query(
+                supplier_id, search, category_id, min_price, max_price
+            )
+            query = """
+                SELECT 
+                    p.ProductID, 
+                    p.ProductName, 
+                    p.Price, 
+                    p.CategoryID, 
+                    p.ImageVersion
+            """ + query + order_by
+            if limit is not None:
+                query += " LIMIT ? OFFSET ?"
+                params += [limit, offset]
 
             cursor.execute(query, params)
             results = cursor.fetchall()
 
             processed_results = []
             for result in results:
-                product_id, product_name, price, category_id, product_image = result
-                processed_results.append((product_id, product_name, price, category_id, product_image))
+                product_id, product_name, price, category_id, image_version = result
+                processed_results.append((product_id, product_name, price, category_id, image_version))
             return processed_results
         except sqlite3.Error as e:
             raise ValueError(f"Database error: {e}")
@@ -198,22 +372,28 @@ class Database:
             conn.close()
 
     @staticmethod
-    def fetch_all_suppliers():
+    def count_supplier_products(supplier_id, search=None, category_id=None, min_price=None, max_price=None):
         conn = Database.connect()
         cursor = conn.cursor()
         try:
-            cursor.execute("SELECT SupplierID, SupplierName FROM Suppliers")
-            return [(row[0], row[1]) for row in cursor.fetchall()]
+            query, params, _ = Database._supplier_products_query(supplier_id, search, category_id, min_price, max_price)
+            cursor.execute("SELECT COUNT(*) " + query, params)
+            return cursor.fetchone()[0]
         except sqlite3.Error as e:
             raise ValueError(f"Database error: {e}")
         finally:
             conn.close()
 
     @staticmethod
-    def place_order(branch_id, supplier_id, product_id, quantity):
-        conn = Database.connect()
-        cursor = conn.cursor()
+    def fetch_all_suppliers():
         try:
+            return Database.reference_cache().rows("suppliers")
+        except sqlite3.Error as e:
+            raise ValueError(f"Database error: {e}")
+
+    @staticmethod
+    def place_order(branch_id, supplier_id, product_id, quantity):
+        def write(cursor):
             cursor.execute(
                 """
                 INSERT INTO BranchOrders (BranchID, SupplierID, ProductID, OrderQuantity, OrderDate)
@@ -244,15 +424,17 @@ class Database:
                 """,
                 (branch_id, product_id, quantity, quantity),
             )
+
+        try:
+            Database.writer().execute(write)
             print("DEBUG: BranchStock update successful.")
-            conn.commit()
         except sqlite3.Error as e:
             print(f"ERROR: {e}")
             raise ValueError(f"Database error: {e}")
-        finally:
-            conn.close()
+
     @staticmethod
     def add_product(product_name, category_id, price, product_image=None):
+        thumbnail = make_thumbnail(product_image)
         conn = Database.connect()
         cursor = conn.cursor()
         try:
@@ -260,6 +442,8 @@ class Database:
                 INSERT INTO Products (ProductName, CategoryID, Price, ProductImage)
                 VALUES (?, ?, ?, ?)
             """, (product_name, category_id, price, product_image))
+            if thumbnail:
+                Database.save_product_thumbnail(cursor, cursor.lastrowid, thumbnail)
             conn.commit()
         except sqlite3.Error as e:
             print(f"Database error: {e}")
@@ -321,14 +505,45 @@ class Database:
         finally:
             conn.close()
 
-    from utils.encryption import hash_password
+    @staticmethod
+    def fetch_inventory_page(branch_id=None, product_id=None, page_size=100, token=None, sort_by=None):
+        conn = Database.connect()
+        cursor = conn.cursor()
+        try:
+            from_where = "FROM BranchStock WHERE 1=1"
+            params = []
+
+            if branch_id is not None:
+                from_where += " AND BranchID = ?"
+                params.append(branch_id)
+
+            if product_id is not None:
+                from_where += " AND ProductID = ?"
+                params.append(product_id)
+
+            return fetch_keyset_page(
+                cursor,
+                "SELECT BranchID, ProductID, StockQuantity",
+                from_where,
+                params,
+                sort_by,
+                {"BranchID": "BranchID", "ProductID": "ProductID", "StockQuantity": "StockQuantity"},
+                ["BranchID", "ProductID"],
+                page_size,
+                token,
+            )
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return [], None
+        finally:
+            conn.close()
 
     @staticmethod
     def signup_customer(first_name, surname, contact_number, membership_level_id, email, password, branch_id):
         conn = Database.connect()
         cursor = conn.cursor()
         try:
-            hashed_password = hash_password(password)
+            hashed_password = AuthService.shared().hash_password(password)
             cursor.execute("""
                 INSERT INTO Customers (FirstName, Surname, ContactNumber, MembershipLevelID, Email, Password, BranchID)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -340,8 +555,6 @@ class Database:
         finally:
             conn.close()
 
-    from utils.encryption import verify_password
-
     @staticmethod
     def authenticate_customer(email, entered_password):
         conn = Database.connect()
@@ -355,7 +568,9 @@ class Database:
             result = cursor.fetchone()
             if result:
                 customer_id, first_name, surname, membership_level_id, stored_password, branch_id = result
-                if verify_password(stored_password, entered_password):
+                matches, new_hash = AuthService.shared().verify_and_rehash(stored_password, entered_password)
+                if matches:
+                    Database._upgrade_password_hash("Customers", "CustomerID", customer_id, stored_password, new_hash)
                     return {
                         "CustomerID": customer_id,
                         "FirstName": first_name,
@@ -372,6 +587,54 @@ class Database:
         finally:
             conn.close()
 
+    @staticmethod
+    def authenticate_staff(employee_id, entered_password):
+        conn = Database.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT EmployeeID, FirstName, Surname, BranchID, JobRoleID, Password
+                FROM Employees
+                WHERE EmployeeID = ?
+            """, (employee_id,))
+            result = cursor.fetchone()
+            if result:
+                employee_id, first_name, surname, branch_id, job_role_id, stored_password = result
+                matches, new_hash = AuthService.shared().verify_and_rehash(stored_password, entered_password)
+                if matches:
+                    Database._upgrade_password_hash("Employees", "EmployeeID", employee_id, stored_password, new_hash)
+                    return {
+                        "EmployeeID": employee_id,
+                        "FirstName": first_name,
+                        "Surname": surname,
+                        "BranchID": branch_id,
+                        "JobRoleID": job_role_id,
+                    }
+            return None
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            raise e
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _upgrade_password_hash(table, key_column, key, old_hash, new_hash):
+        """Stores new_hash after a successful login, unless the password was changed in the meantime."""
+        if new_hash is None:
+            return
+
+        def write(cursor):
+            cursor.execute(
+                f"UPDATE {table} SET Password = ? WHERE {key_column} = ? AND Password = ?",
+                (new_hash, key, old_hash),
+            )
+
+        try:
+            Database.writer().execute(write)
+        except sqlite3.Error as e:
+            # The login itself succeeded; the old hash still verifies, so the upgrade is retried next time.
+            print(f"Database error while upgrading password hash: {e}")
+
     @staticmethod
     def fetch_all_supplier_orders():
         conn = Database.connect()
@@ -388,6 +651,29 @@ class Database:
         finally:
             conn.close()
 
+    @staticmethod
+    def fetch_supplier_orders_page(page_size=100, token=None, sort_by=None):
+        conn = Database.connect()
+        cursor = conn.cursor()
+        try:
+            return fetch_keyset_page(
+                cursor,
+                "SELECT OrderID, BranchID, SupplierID, ProductID, OrderQuantity, OrderDate",
+                "FROM BranchOrders WHERE 1=1",
+                [],
+                sort_by,
+                {"OrderID": "OrderID", "BranchID": "BranchID", "SupplierID": "SupplierID",
+                 "ProductID": "ProductID", "OrderDate": "OrderDate"},
+                ["OrderID"],
+                page_size,
+                token,
+            )
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return [], None
+        finally:
+            conn.close()
+
     @staticmethod
     def add_supplier_order(branch_id, supplier_id, product_id, order_quantity, order_date):
         conn = Database.connect()
@@ -424,11 +710,8 @@ class Database:
             if order:
                 branch_id, product_id, order_quantity = order
 
-                cursor.execute("""
-                    UPDATE BranchStock
-                    SET StockQuantity = StockQuantity - ?
-                    WHERE BranchID = ? AND ProductID = ?
-                """, (order_quantity, branch_id, product_id))
+                if Database.decrement_stock(cursor, branch_id, product_id, order_quantity) is None:
+                    raise ValueError("Cannot delete order: its stock has already been sold.")
 
             cursor.execute("DELETE FROM BranchOrders WHERE OrderID = ?", (order_id,))
             conn.commit()
@@ -478,18 +761,51 @@ class Database:
             conn.close()
 
     @staticmethod
-    def fetch_all_categories():
+    def fetch_past_orders_page(customer_id, page_size=100, token=None, sort_by=("-OrderDate",)):
         conn = Database.connect()
         cursor = conn.cursor()
         try:
-            cursor.execute("SELECT CategoryID, CategoryName FROM Categories")
-            return cursor.fetchall()
+            return fetch_keyset_page(
+                cursor,
+                """
+                SELECT o.OrderID, p.ProductName, co.OrderQuantity, 
+                       (co.OrderQuantity * p.Price) AS TotalPrice, o.OrderDate
+                """,
+                """
+                FROM Orders o
+                JOIN CustomerOrders co ON o.OrderID = co.OrderID
+                JOIN Products p ON co.ProductID = p.ProductID
+                WHERE o.CustomerID = ?
+                """,
+                [customer_id],
+                sort_by,
+                {"OrderDate": "o.OrderDate", "OrderID": "o.OrderID", "ProductID": "co.ProductID"},
+                ["OrderID", "ProductID"],
+                page_size,
+                token,
+            )
         except sqlite3.Error as e:
             print(f"Database error: {e}")
             raise e
         finally:
             conn.close()
 
+    @staticmethod
+    def fetch_all_categories():
+        try:
+            return Database.reference_cache().rows("categories")
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            raise e
+
+    @staticmethod
+    def fetch_category_id(category_name):
+        return Database.reference_cache().key("categories", category_name)
+
+    @staticmethod
+    def fetch_all_job_roles():
+        return Database.reference_cache().rows("job_roles")
+
     @staticmethod
     def fetch_basket(customer_id):
         conn = Database.connect()
@@ -509,30 +825,42 @@ class Database:
             conn.close()
 
     @staticmethod
-    def fetch_available_products(branch_id, search=None, category_id=None, min_price=None, max_price=None):
-        conn = Database.connect()
-        cursor = conn.cursor()
-        try:
+    def _available_products_query(branch_id, search, category_id, min_price, max_price):
+        match = Database.search_match_expression(search)
+        if match:
+            query = """
+                FROM ProductSearch s
+                JOIN Products p ON p.ProductID = s.rowid
+                JOIN BranchStock bs ON p.ProductID = bs.ProductID
+                WHERE ProductSearch MATCH ? AND bs.BranchID = ? AND bs.StockQuantity > 0
+            """
+            params = [match, branch_id]
+        else:
             query = """
-                SELECT p.ProductID, p.ProductName, bs.StockQuantity, p.Price, p.CategoryID, p.ProductImage
                 FROM Products p
                 JOIN BranchStock bs ON p.ProductID = bs.ProductID
                 WHERE bs.BranchID = ? AND bs.StockQuantity > 0
             """
             params = [branch_id]
+        query, params = Database._product_filters(query, params, match, search, category_id, min_price, max_price)
+        order_by = " ORDER BY s.rank, p.ProductID" if match else " ORDER BY p.ProductID"
+        return query, params, order_by
 
-            if search:
-                query += " AND p.ProductName LIKE ?"
-                params.append(f"%{search}%")
-            if category_id:
-                query += " AND p.CategoryID = ?"
-                params.append(category_id)
-            if min_price is not None:
-                query += " AND p.Price >= ?"
-                params.append(min_price)
-            if max_price is not None:
-                query += " AND p.Price <= ?"
-                params.append(max_price)
+    @staticmethod
+    def fetch_available_products(branch_id, search=None, category_id=None, min_price=None, max_price=None,
+                                 limit=None, offset=0):
+        conn = Database.connect()
+        cursor = conn.cursor()
+        try:
+            query, params, order_by = Database._available_products_query(
+                branch_id, search, category_id, min_price, max_price
+            )
+            query = """
+                SELECT p.ProductID, p.ProductName, bs.StockQuantity, p.Price, p.CategoryID, p.ImageVersion
+            """ + query + order_by
+            if limit is not None:
+                query += " LIMIT ? OFFSET ?"
+                params += [limit, offset]
 
             cursor.execute(query, params)
             return cursor.fetchall()
@@ -541,6 +869,19 @@ class Database:
         finally:
             conn.close()
 
+    @staticmethod
+    def count_available_products(branch_id, search=None, category_id=None, min_price=None, max_price=None):
+        conn = Database.connect()
+        cursor = conn.cursor()
+        try:
+            query, params, _ = Database._available_products_query(branch_id, search, category_id, min_price, max_price)
+            cursor.execute("SELECT COUNT(*) " + query, params)
+            return cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            raise ValueError(f"Database error: {e}")
+        finally:
+            conn.close()
+
     @staticmethod
     def add_to_basket(customer_id, product_id, quantity, branch_id, delivery_option):
         conn = Database.connect()
@@ -600,24 +941,121 @@ class Database:
 
     @staticmethod
     def add_customer_order(customer_id, basket):
-        conn = Database.connect()
-        cursor = conn.cursor()
-        try:
+        """Turns a basket whose stock was reserved when it was filled into an order; returns the OrderID."""
+        lines = [(item['branch'], product_id, item['quantity']) for product_id, item in basket.items()]
+        result = Database.checkout(customer_id, lines, stock_reserved=True)
+        return result["OrderID"]
+
+    @staticmethod
+    def _merge_checkout_lines(lines):
+        merged = {}
+        branches = {}
+        for branch_id, product_id, quantity in lines:
+            if quantity <= 0:
+                raise ValueError("Quantity must be a positive number.")
+            if branches.setdefault(product_id, branch_id) != branch_id:
+                raise ValueError(f"ProductID {product_id} appears for more than one branch in the same order.")
+            merged[(branch_id, product_id)] = merged.get((branch_id, product_id), 0) + quantity
+        return [(branch_id, product_id, quantity) for (branch_id, product_id), quantity in merged.items()]
+
+    @staticmethod
+    def checkout(customer_id, lines, stock_reserved=False, allow_partial=False):
+        """Places an order for (branch_id, product_id, quantity) lines in one write transaction.
+
+        Unless stock_reserved (the basket flow reserves as items are added), stock for every line is
+        checked and taken with a single UPDATE ... FROM json_each statement. Lines for the same product
+        are merged. Returns {"OrderID": id or None, "Lines": [...]}, each line a dict with BranchID,
+        ProductID, Quantity, Status and StockRemaining. Status is "ok", "insufficient_stock" or
+        "not_stocked"; a short line cancels the whole order (the lines that fitted report "cancelled")
+        unless allow_partial, which orders the lines that fit.
+        """
+        lines = Database._merge_checkout_lines(lines)
+        if not lines:
+            raise ValueError("Basket is empty.")
+
+        def write(cursor):
+            cursor.execute("SAVEPOINT checkout")
+            remaining = {}
+            if not stock_reserved:
+                cursor.execute("""
+                    UPDATE BranchStock
+                    SET StockQuantity = StockQuantity - l.Quantity
+                    FROM (
+                        SELECT json_extract(value, '$[0]') AS BranchID,
+                               json_extract(value, '$[1]') AS ProductID,
+                               json_extract(value, '$[2]') AS Quantity
+                        FROM json_each(?)
+                    ) AS l
+                    WHERE BranchStock.BranchID = l.BranchID
+                      AND BranchStock.ProductID = l.ProductID
+                      AND BranchStock.StockQuantity >= l.Quantity
+                    RETURNING BranchStock.BranchID, BranchStock.ProductID, BranchStock.StockQuantity
+                """, (json.dumps(lines),))
+                remaining = {(branch_id, product_id): stock for branch_id, product_id, stock in cursor.fetchall()}
+
+            outcomes = []
+            for branch_id, product_id, quantity in lines:
+                outcome = {"BranchID": branch_id, "ProductID": product_id, "Quantity": quantity,
+                           "Status": "ok", "StockRemaining": remaining.get((branch_id, product_id))}
+                if not stock_reserved and (branch_id, product_id) not in remaining:
+                    cursor.execute("SELECT StockQuantity FROM BranchStock WHERE BranchID = ? AND ProductID = ?",
+                                   (branch_id, product_id))
+                    row = cursor.fetchone()
+                    outcome["Status"] = "insufficient_stock" if row else "not_stocked"
+                    outcome["StockRemaining"] = row[0] if row else None
+                outcomes.append(outcome)
+
+            ordered = [o for o in outcomes if o["Status"] == "ok"]
+            if not ordered or (len(ordered) < len(outcomes) and not allow_partial):
+                # Undo the stock taken for the lines that did fit.
+                cursor.execute("ROLLBACK TO checkout")
+                cursor.execute("RELEASE checkout")
+                for outcome in ordered:
+                    outcome["Status"] = "cancelled"
+                    outcome["StockRemaining"] = None
+                return {"OrderID": None, "Lines": outcomes}
+
             cursor.execute("""
                 INSERT INTO Orders (CustomerID, OrderDate)
                 VALUES (?, DATE('now'))
             """, (customer_id,))
             order_id = cursor.lastrowid
+            cursor.executemany("""
+                INSERT INTO CustomerOrders (OrderID, ProductID, OrderQuantity)
+                VALUES (?, ?, ?)
+            """, [(order_id, o["ProductID"], o["Quantity"]) for o in ordered])
+            cursor.execute("RELEASE checkout")
+            return {"OrderID": order_id, "Lines": outcomes}
 
-            for product_id, item in basket.items():
-                quantity = item['quantity']
-                cursor.execute("""
-                    INSERT INTO CustomerOrders (OrderID, ProductID, OrderQuantity)
-                    VALUES (?, ?, ?)
-                """, (order_id, product_id, quantity))
+        try:
+            return Database.writer().execute(write)
+        except sqlite3.Error as e:
+            print(f"Database error during checkout: {e}")
+            raise e
+
+    @staticmethod
+    def fetch_all_branches():
+        try:
+            branches = Database.reference_cache().rows("branches")
+            return [f"{branch[0]} - {branch[1]}" for branch in branches]
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            raise e
 
+    @staticmethod
+    def update_product_image(product_id, product_image):
+        thumbnail = make_thumbnail(product_image)
+        conn = Database.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE Products
+                SET ProductImage = ?
+                WHERE ProductID = ?
+            """, (product_image, product_id))
+            if thumbnail:
+                Database.save_product_thumbnail(cursor, product_id, thumbnail)
             conn.commit()
-            return order_id
         except sqlite3.Error as e:
             print(f"Database error: {e}")
             raise e
@@ -625,15 +1063,32 @@ class Database:
             conn.close()
 
     @staticmethod
-    def fetch_all_branches():
+    def save_product_thumbnail(cursor, product_id, thumbnail):
+        cursor.execute("""
+            INSERT INTO ProductThumbnails (ProductID, ImageVersion, Thumbnail)
+            SELECT ProductID, ImageVersion, ? FROM Products
+            WHERE ProductID = ? AND ImageVersion IS NOT NULL
+            ON CONFLICT(ProductID) DO UPDATE SET ImageVersion = excluded.ImageVersion, Thumbnail = excluded.Thumbnail
+        """, (thumbnail, product_id))
+
+    @staticmethod
+    def fetch_product_thumbnails(product_ids, chunk_size=500):
         conn = Database.connect()
         cursor = conn.cursor()
         try:
-            cursor.execute("""
-                SELECT BranchID, Location FROM Branches
-            """)
-            branches = cursor.fetchall()
-            return [f"{branch[0]} - {branch[1]}" for branch in branches]
+            product_ids = list(product_ids)
+            thumbnails = {}
+            for start in range(0, len(product_ids), chunk_size):
+                chunk = product_ids[start:start + chunk_size]
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor.execute(f"""
+                    SELECT t.ProductID, t.Thumbnail
+                    FROM ProductThumbnails t
+                    JOIN Products p ON p.ProductID = t.ProductID AND p.ImageVersion = t.ImageVersion
+                    WHERE t.ProductID IN ({placeholders})
+                """, chunk)
+                thumbnails.update(cursor.fetchall())
+            return thumbnails
         except sqlite3.Error as e:
             print(f"Database error: {e}")
             raise e
@@ -641,16 +1096,17 @@ class Database:
             conn.close()
 
     @staticmethod
-    def update_product_image(product_id, product_image):
+    def fetch_products_missing_thumbnails():
         conn = Database.connect()
         cursor = conn.cursor()
         try:
             cursor.execute("""
-                UPDATE Products
-                SET ProductImage = ?
-                WHERE ProductID = ?
-            """, (product_image, product_id))
-            conn.commit()
+                SELECT p.ProductID, p.ImageVersion
+                FROM Products p
+                LEFT JOIN ProductThumbnails t ON t.ProductID = p.ProductID AND t.ImageVersion = p.ImageVersion
+                WHERE p.ImageVersion IS NOT NULL AND t.ProductID IS NULL
+            """)
+            return cursor.fetchall()
         except sqlite3.Error as e:
             print(f"Database error: {e}")
             raise e
@@ -658,23 +1114,145 @@ class Database:
             conn.close()
 
     @staticmethod
-    def adjust_stock_quantity(branch_id, product_id, quantity_change):
+    def save_product_thumbnails(thumbnails):
+        # thumbnails holds (ProductID, ImageVersion, Thumbnail); fetch_product_thumbnails ignores
+        # any row whose version no longer matches the product, so a racing image update is harmless.
+        thumbnails = list(thumbnails)
+        if not thumbnails:
+            return
+
+        def write(cursor):
+            cursor.executemany("""
+                INSERT INTO ProductThumbnails (ProductID, ImageVersion, Thumbnail)
+                VALUES (?, ?, ?)
+                ON CONFLICT(ProductID) DO UPDATE SET ImageVersion = excluded.ImageVersion, Thumbnail = excluded.Thumbnail
+            """, thumbnails)
+
+        try:
+            Database.writer().execute(write)
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            raise e
+
+    @staticmethod
+    def fetch_product_images(product_ids, chunk_size=500):
         conn = Database.connect()
         cursor = conn.cursor()
         try:
+            product_ids = list(product_ids)
+            images = {}
+            for start in range(0, len(product_ids), chunk_size):
+                chunk = product_ids[start:start + chunk_size]
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor.execute(f"""
+                    SELECT ProductID, ProductImage
+                    FROM Products
+                    WHERE ProductID IN ({placeholders}) AND ProductImage IS NOT NULL
+                """, chunk)
+                images.update(cursor.fetchall())
+            return images
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            raise e
+        finally:
+            conn.close()
+
+    @staticmethod
+    def fetch_product_image(product_id):
+        return Database.fetch_product_images([product_id]).get(product_id)
+
+    @staticmethod
+    def adjust_stock_quantity(branch_id, product_id, quantity_change):
+        def write(cursor):
+            if quantity_change < 0:
+                if Database.decrement_stock(cursor, branch_id, product_id, -quantity_change) is None:
+                    raise ValueError("Insufficient stock.")
+                return
             cursor.execute("""
                 UPDATE BranchStock
                 SET StockQuantity = StockQuantity + ?
                 WHERE BranchID = ? AND ProductID = ?
             """, (quantity_change, branch_id, product_id))
+
+        try:
+            Database.writer().execute(write)
             print(
                 f"DEBUG: Adjusted stock for BranchID={branch_id}, ProductID={product_id}, QuantityChange={quantity_change}")
-            conn.commit()
         except sqlite3.Error as e:
             print(f"Database error during stock adjustment: {e}")
             raise e
-        finally:
-            conn.close()
+
+    @staticmethod
+    def release_stock(items):
+        """Puts every (branch_id, product_id, quantity) line of items back into stock in one transaction.
+
+        Either every line is restored or, if the write fails, none is. Returns the number of stock rows updated.
+        """
+        rows = [(quantity, branch_id, product_id) for branch_id, product_id, quantity in items]
+        if not rows:
+            return 0
+
+        def write(cursor):
+            cursor.executemany("""
+                UPDATE BranchStock
+                SET StockQuantity = StockQuantity + ?
+                WHERE BranchID = ? AND ProductID = ?
+            """, rows)
+            return cursor.rowcount
+
+        try:
+            return Database.writer().execute(write)
+        except sqlite3.Error as e:
+            print(f"Database error during stock release: {e}")
+            raise e
+
+    @staticmethod
+    def decrement_stock(cursor, branch_id, product_id, quantity):
+        """Takes quantity off a branch's stock in one statement, only if that much is there.
+
+        Returns the stock left afterwards, or None (and changes nothing) when there is not enough.
+        """
+        cursor.execute("""
+            UPDATE BranchStock
+            SET StockQuantity = StockQuantity - ?
+            WHERE BranchID = ? AND ProductID = ? AND StockQuantity >= ?
+            RETURNING StockQuantity
+        """, (quantity, branch_id, product_id, quantity))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def reserve_stock(branch_id, product_id, quantity):
+        """Reserves quantity of a product at a branch; returns the stock left, or None if there was not enough."""
+        return Database.reserve_stock_batch([(branch_id, product_id, quantity)])[0]
+
+    @staticmethod
+    def reserve_stock_batch(items, all_or_nothing=True):
+        """Reserves every (branch_id, product_id, quantity) line of items in a single write transaction.
+
+        Returns the stock left for each line, or None for lines that could not be reserved. With
+        all_or_nothing, one short line means nothing is reserved; the None entries still show which
+        lines were short.
+        """
+        items = list(items)
+        for _, _, quantity in items:
+            if quantity <= 0:
+                raise ValueError("Quantity must be a positive number.")
+
+        def write(cursor):
+            cursor.execute("SAVEPOINT reserve_stock")
+            results = [Database.decrement_stock(cursor, branch_id, product_id, quantity)
+                       for branch_id, product_id, quantity in items]
+            if all_or_nothing and None in results:
+                cursor.execute("ROLLBACK TO reserve_stock")
+            cursor.execute("RELEASE reserve_stock")
+            return results
+
+        try:
+            return Database.writer().execute(write)
+        except sqlite3.Error as e:
+            print(f"Database error during stock reservation: {e}")
+            raise e
 
     @staticmethod
     def fetch_branch_stock_id(branch_id, product_id):
@@ -716,15 +1294,9 @@ class Database:
 
     @staticmethod
     def fetch_branch_id(branch_location):
-        conn = Database.connect()
-        cursor = conn.cursor()
         try:
-            cursor.execute("SELECT BranchID FROM Branches WHERE Location = ?", (branch_location,))
-            result = cursor.fetchone()
-            return result[0] if result else None
+            return Database.reference_cache().key("branches", branch_location)
         except sqlite3.Error as e:
             print(f"Database error while fetching BranchID: {e}")
             raise e
-        finally:
-            conn.close()
 
@@ -1,25 +1,97 @@
 import hashlib
+import hmac
 import os
 import binascii
 
-def hash_password(password):
-    salt = os.urandom(16)
-    hashed_password = hashlib.pbkdf2_hmac(
-        'sha256',
-        password.encode(),
-        salt,
-        100000
-    )
-    return f"{binascii.hexlify(salt).decode()}:{binascii.hexlify(hashed_password).decode()}"
+PBKDF2_SHA256 = "pbkdf2_sha256"
+SCRYPT = "scrypt"
+
+# Parameters for new hashes. Stored hashes carry their own ("pbkdf2_sha256$iterations$salt$hash" or
+# "scrypt$n:r:p$salt$hash"), so changing these only affects passwords hashed, or rehashed at login, afterwards.
+HASH_ALGORITHM = PBKDF2_SHA256
+PBKDF2_ITERATIONS = 100000
+SCRYPT_PARAMETERS = (2 ** 14, 8, 1)
+SALT_BYTES = 16
+
+# Hashes written before the format carried its parameters: "salt:hash", PBKDF2-SHA256, 100,000 iterations.
+LEGACY_ITERATIONS = 100000
+
+
+def current_parameters(algorithm=None, parameters=None):
+    """(algorithm, parameters) that new hashes use; parameters is the iteration count or (n, r, p)."""
+    algorithm = algorithm or HASH_ALGORITHM
+    if parameters is not None:
+        return algorithm, parameters
+    if algorithm == PBKDF2_SHA256:
+        return algorithm, PBKDF2_ITERATIONS
+    if algorithm == SCRYPT:
+        return algorithm, tuple(SCRYPT_PARAMETERS)
+    raise ValueError(f"Unsupported password hash algorithm: {algorithm}")
+
+
+def _derive(algorithm, parameters, password, salt):
+    if algorithm == PBKDF2_SHA256:
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, parameters)
+    n, r, p = parameters
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p, dklen=32)
+
+
+def _format(algorithm, parameters, salt, derived):
+    encoded = f"{binascii.hexlify(salt).decode()}${binascii.hexlify(derived).decode()}"
+    if algorithm == PBKDF2_SHA256:
+        return f"{algorithm}${parameters}${encoded}"
+    return f"{algorithm}${':'.join(str(value) for value in parameters)}${encoded}"
+
+
+def parse_hash(stored_password):
+    """Returns (algorithm, parameters, salt, derived key) for any stored hash, legacy "salt:hash" included."""
+    if "$" not in stored_password:
+        salt, hashed_password = stored_password.split(':')
+        return PBKDF2_SHA256, LEGACY_ITERATIONS, binascii.unhexlify(salt), binascii.unhexlify(hashed_password)
+
+    algorithm, parameters, salt, hashed_password = stored_password.split('$')
+    if algorithm == PBKDF2_SHA256:
+        parameters = int(parameters)
+    elif algorithm == SCRYPT:
+        parameters = tuple(int(value) for value in parameters.split(':'))
+    else:
+        raise ValueError(f"Unsupported password hash algorithm: {algorithm}")
+    return algorithm, parameters, binascii.unhexlify(salt), binascii.unhexlify(hashed_password)
+
+
+def hash_password(password, algorithm=None, parameters=None, salt=None):
+    """Hashes password with the configured algorithm, or with algorithm and parameters when given."""
+    algorithm, parameters = current_parameters(algorithm, parameters)
+    salt = salt if salt is not None else os.urandom(SALT_BYTES)
+    return _format(algorithm, parameters, salt, _derive(algorithm, parameters, password, salt))
+
 
 def verify_password(stored_password, entered_password):
+    try:
+        algorithm, parameters, salt, hashed_password = parse_hash(stored_password)
+    except (ValueError, binascii.Error):
+        return False
+    hashed_entered_password = _derive(algorithm, parameters, entered_password, salt)
+    return hmac.compare_digest(hashed_entered_password, hashed_password)
+
+
+def needs_rehash(stored_password, algorithm=None, parameters=None):
+    """True when stored_password is not in the current format with the current parameters."""
+    algorithm, parameters = current_parameters(algorithm, parameters)
+    if "$" not in stored_password:
+        return True
+    try:
+        stored_algorithm, stored_parameters, _, _ = parse_hash(stored_password)
+    except (ValueError, binascii.Error):
+        return True
+    return (stored_algorithm, stored_parameters) != (algorithm, parameters)
+
 
-    salt, hashed_password = stored_password.split(':')
-    salt = binascii.unhexlify(salt)
-    hashed_entered_password = hashlib.pbkdf2_hmac(
-        'sha256',
-        entered_password.encode(),
-        salt,
-        100000
-    )
-    return binascii.hexlify(hashed_entered_password).decode() == hashed_password
+def verify_and_rehash(stored_password, entered_password, algorithm=None, parameters=None):
+    """Returns (matches, new_hash); new_hash is set only when the password matched a hash with old parameters."""
+    if not verify_password(stored_password, entered_password):
+        return False, None
+    algorithm, parameters = current_parameters(algorithm, parameters)
+    if not needs_rehash(stored_password, algorithm, parameters):
+        return True, None
+    return True, hash_password(entered_password, algorithm, parameters)
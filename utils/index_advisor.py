@@ -0,0 +1,232 @@
+"""Runs EXPLAIN QUERY PLAN over the SQL issued by every registered Database call and reports full scans.
+
+    python -m utils.index_advisor [--db database/autodatabase.db] [--verbose]
+
+The calls run against a temporary copy of the database (writes included), with a trace callback
+recording each statement they execute; the recorded statements are then explained one by one.
+Listings that deliberately read a whole table are registered with expect_scan=True and are only
+shown with --verbose. The exit status is 1 when an unexpected scan or a failing call is found.
+"""
+import argparse
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+
+from utils.database import Database
+
+
+STATEMENT_PREFIXES = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+# FTS5 reads its own shadow tables with internal statements that also reach the trace callback.
+FTS_SHADOW_TABLE = re.compile(r"ProductSearch_(config|data|idx|content|docsize)\b")
+
+
+def sample_arguments(conn):
+    """Picks ids that exist in the database so every registered call has rows to work with."""
+    def first(query, default=None):
+        row = conn.execute(query).fetchone()
+        return row[0] if row else default
+
+    branch_id = first("SELECT BranchID FROM BranchStock ORDER BY BranchID LIMIT 1", 1)
+    customer_id = first("SELECT CustomerID FROM Orders ORDER BY OrderID LIMIT 1",
+                        first("SELECT CustomerID FROM Customers LIMIT 1", 1))
+    product_name = first("SELECT ProductName FROM Products ORDER BY ProductID LIMIT 1", "oil")
+    return {
+        "branch_id": branch_id,
+        "product_id": first(f"SELECT ProductID FROM BranchStock WHERE BranchID = {int(branch_id)} LIMIT 1", 1),
+        "supplier_id": first("SELECT SupplierID FROM SupplierProducts LIMIT 1", 1),
+        "category_id": first("SELECT CategoryID FROM Products LIMIT 1", 1),
+        "customer_id": customer_id,
+        "email": first(f"SELECT Email FROM Customers WHERE CustomerID = {int(customer_id)}", ""),
+        "order_id": first("SELECT OrderID FROM Orders ORDER BY OrderID LIMIT 1", 1),
+        "supplier_order_id": first("SELECT OrderID FROM BranchOrders ORDER BY OrderID LIMIT 1", 1),
+        "employee_id": first("SELECT EmployeeID FROM Employees ORDER BY EmployeeID LIMIT 1", 1),
+        "location": first("SELECT Location FROM Branches LIMIT 1", ""),
+        "search": product_name.split()[0],
+    }
+
+
+def run_sql(query, *params):
+    conn = Database.connect()
+    try:
+        return conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+
+def registered_calls(a):
+    """(name, call, expect_scan) for every Database query; writes come last because they delete rows."""
+    return [
+        ("fetch_all_staff", lambda: Database.fetch_all_staff(), True),
+        ("fetch_staff_page", lambda: Database.fetch_staff_page(20), True),
+        ("fetch_staff_page by Surname", lambda: Database.fetch_staff_page(20, sort_by=["Surname"]), True),
+        ("fetch_all_customers", lambda: Database.fetch_all_customers(), True),
+        ("fetch_customers_page", lambda: Database.fetch_customers_page(20), True),
+        ("fetch_customers_page by Surname", lambda: Database.fetch_customers_page(20, sort_by=["Surname"]), True),
+        ("fetch_all_products", lambda: Database.fetch_all_products(), True),
+        ("fetch_products_page", lambda: Database.fetch_products_page(20), True),
+        ("fetch_products_page by Price", lambda: Database.fetch_products_page(20, sort_by=["-Price"]), True),
+        ("fetch_supplier_products", lambda: Database.fetch_supplier_products(a["supplier_id"], limit=20), False),
+        ("fetch_supplier_products search",
+         lambda: Database.fetch_supplier_products(a["supplier_id"], search=a["search"], limit=20), False),
+        ("fetch_supplier_products category/price",
+         lambda: Database.fetch_supplier_products(a["supplier_id"], category_id=a["category_id"], min_price=1,
+                                                  max_price=500, limit=20), False),
+        ("count_supplier_products", lambda: Database.count_supplier_products(a["supplier_id"]), False),
+        ("fetch_all_suppliers", lambda: Database.fetch_all_suppliers(), True),
+        ("fetch_inventory", lambda: Database.fetch_inventory(), True),
+        ("fetch_inventory by branch", lambda: Database.fetch_inventory(a["branch_id"]), False),
+        ("fetch_inventory by product", lambda: Database.fetch_inventory(product_id=a["product_id"]), False),
+        ("fetch_inventory_page by product",
+         lambda: Database.fetch_inventory_page(product_id=a["product_id"], page_size=20), False),
+        ("authenticate_customer", lambda: Database.authenticate_customer(a["email"], "not-the-password"), False),
+        ("authenticate_staff", lambda: Database.authenticate_staff(a["employee_id"], "not-the-password"), False),
+        ("fetch_all_supplier_orders", lambda: Database.fetch_all_supplier_orders(), True),
+        ("fetch_supplier_orders_page by OrderDate",
+         lambda: Database.fetch_supplier_orders_page(20, sort_by=["-OrderDate"]), True),
+        ("fetch_order_details", lambda: Database.fetch_order_details(a["order_id"]), False),
+        ("fetch_past_orders", lambda: Database.fetch_past_orders(a["customer_id"]), False),
+        ("fetch_past_orders_page", lambda: Database.fetch_past_orders_page(a["customer_id"], 20), False),
+        ("fetch_all_categories", lambda: Database.fetch_all_categories(), True),
+        ("fetch_basket", lambda: Database.fetch_basket(a["customer_id"]), False),
+        ("fetch_available_products", lambda: Database.fetch_available_products(a["branch_id"], limit=20), False),
+        ("fetch_available_products search",
+         lambda: Database.fetch_available_products(a["branch_id"], search=a["search"], limit=20), False),
+        ("fetch_available_products category/price",
+         lambda: Database.fetch_available_products(a["branch_id"], category_id=a["category_id"], min_price=1,
+                                                   limit=20), False),
+        ("count_available_products", lambda: Database.count_available_products(a["branch_id"]), False),
+        ("fetch_all_branches", lambda: Database.fetch_all_branches(), True),
+        ("fetch_product_thumbnails", lambda: Database.fetch_product_thumbnails([a["product_id"]]), False),
+        ("fetch_products_missing_thumbnails", lambda: Database.fetch_products_missing_thumbnails(), True),
+        ("fetch_product_images", lambda: Database.fetch_product_images([a["product_id"]]), False),
+        ("fetch_stock_quantity", lambda: Database.fetch_stock_quantity(a["branch_id"], a["product_id"]), False),
+        ("fetch_branch_stock_id", lambda: Database.fetch_branch_stock_id(a["branch_id"], a["product_id"]), False),
+        ("fetch_branch_id", lambda: Database.fetch_branch_id(a["location"]), False),
+        ("CustomerPurchaseHistory view",
+         lambda: run_sql("SELECT * FROM CustomerPurchaseHistory WHERE CustomerID = ?", a["customer_id"]), False),
+        ("DiscountedPrices view",
+         lambda: run_sql("SELECT * FROM DiscountedPrices WHERE CustomerID = ?", a["customer_id"]), False),
+        ("checkout", lambda: Database.checkout(a["customer_id"], [(a["branch_id"], a["product_id"], 1)]), False),
+        ("release_stock", lambda: Database.release_stock([(a["branch_id"], a["product_id"], 1)]), False),
+        ("update_product", lambda: Database.update_product(a["product_id"], a["category_id"], 9.99), False),
+        ("update_customer", lambda: Database.update_customer(a["customer_id"], "07000000000", 1), False),
+        ("update_staff", lambda: Database.update_staff(a["employee_id"], "07000000001", a["branch_id"], 1), False),
+        ("adjust_stock_quantity", lambda: Database.adjust_stock_quantity(a["branch_id"], a["product_id"], 0), False),
+        ("delete_supplier_order", lambda: Database.delete_supplier_order(a["supplier_order_id"]), False),
+        ("delete_order", lambda: Database.delete_order(a["order_id"]), False),
+        ("delete_staff", lambda: Database.delete_staff(a["employee_id"]), False),
+        ("delete_customer", lambda: Database.delete_customer(a["customer_id"]), False),
+        ("delete_product", lambda: Database.delete_product(a["product_id"]), False),
+    ]
+
+
+class StatementRecorder:
+    """Connection hook that records the statements run while a registered call is active."""
+
+    def __init__(self):
+        self.current = None
+        self.statements = []
+        self.lock = threading.Lock()
+
+    def __call__(self, conn):
+        conn.set_trace_callback(self._trace)
+
+    def _trace(self, statement):
+        text = statement.strip()
+        if self.current is None or not text.upper().startswith(STATEMENT_PREFIXES):
+            return
+        if FTS_SHADOW_TABLE.search(text):
+            return
+        with self.lock:
+            self.statements.append((self.current, text))
+
+
+def explain(conn, statement):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + statement).fetchall()]
+
+
+def scans(plan):
+    """Plan steps that read a whole table or index rather than seeking into it."""
+    return [
+        step for step in plan
+        if step.startswith("SCAN ") and "VIRTUAL TABLE" not in step and "CONSTANT ROW" not in step
+    ]
+
+
+def advise(db_path, verbose=False, out=sys.stdout):
+    workdir = tempfile.mkdtemp(prefix="index-advisor-")
+    copy_path = os.path.join(workdir, "advisor.db")
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(copy_path)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+    recorder = StatementRecorder()
+    original_path = Database.DB_PATH
+    Database.DB_PATH = copy_path
+    Database.CONNECTION_HOOKS.append(recorder)
+    problems = 0
+    try:
+        conn = Database.connect()
+        try:
+            args = sample_arguments(conn)
+        finally:
+            conn.close()
+
+        calls = registered_calls(args)
+        failures = {}
+        for name, call, _ in calls:
+            recorder.current = name
+            try:
+                call()
+            except Exception as e:
+                failures[name] = e
+            finally:
+                recorder.current = None
+
+        explain_conn = sqlite3.connect(copy_path)
+        try:
+            for name, call, expect_scan in calls:
+                if name in failures:
+                    problems += 1
+                    print(f"ERROR  {name}: {failures[name]}", file=out)
+                statements = dict.fromkeys(text for owner, text in recorder.statements if owner == name)
+                for statement in statements:
+                    try:
+                        plan = explain(explain_conn, statement)
+                    except sqlite3.Error as e:
+                        problems += 1
+                        print(f"ERROR  {name}: cannot explain: {e}", file=out)
+                        continue
+                    found = scans(plan)
+                    if found and not expect_scan:
+                        problems += 1
+                        print(f"SCAN   {name}: {'; '.join(found)}", file=out)
+                    elif verbose:
+                        label = "LIST " if found else "OK   "
+                        print(f"{label}  {name}: {'; '.join(plan)}", file=out)
+        finally:
+            explain_conn.close()
+    finally:
+        Database.CONNECTION_HOOKS.remove(recorder)
+        Database.DB_PATH = original_path
+        Database.close_pool()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{len(calls)} calls checked, {problems} problem(s) found.", file=out)
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report full table scans in the Database queries.")
+    parser.add_argument("--db", default=Database.DB_PATH)
+    parser.add_argument("--verbose", action="store_true", help="Also print the plans that look fine.")
+    options = parser.parse_args()
+    sys.exit(1 if advise(options.db, options.verbose) else 0)
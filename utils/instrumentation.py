@@ -0,0 +1,388 @@
+"""Per-method and per-statement metrics for Database: calls, rows, bytes and latency percentiles.
+
+    from utils import instrumentation
+    instrumentation.enable(slow_query_ms=100)
+    ...
+    instrumentation.export_json("metrics.json")
+
+enable() wraps every public Database method and reopens the pool with connections whose cursors time
+each statement (execute plus fetches) and count the rows and bytes it returned, BLOBs included.
+Statements slower than slow_query_ms are logged on the "utils.instrumentation" logger together with
+their EXPLAIN QUERY PLAN. Two exported snapshots can be compared with
+
+    python -m utils.instrumentation diff before.json after.json
+"""
+import argparse
+import functools
+import json
+import logging
+import random
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from utils.database import Database
+
+logger = logging.getLogger(__name__)
+
+# Plumbing rather than queries; timing them would only add noise.
+UNINSTRUMENTED_METHODS = {
+    "pool", "writer", "connect", "close_pool", "pool_stats", "reference_cache", "reference_cache_stats",
+    "invalidate_reference_data", "search_match_expression",
+}
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+
+def value_size(value):
+    """Approximate payload size of a result: BLOB and text lengths, 8 bytes per number."""
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8", "replace"))
+    if isinstance(value, (int, float)):
+        return 8
+    if isinstance(value, dict):
+        return sum(value_size(item) for item in value.values())
+    if isinstance(value, (list, tuple, set)):
+        return sum(value_size(item) for item in value)
+    return 0
+
+
+def result_rows(result):
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    # Keyset pages come back as (rows, next_token).
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], list):
+        return len(result[0])
+    if isinstance(result, dict):
+        if isinstance(result.get("Lines"), list):
+            return len(result["Lines"])
+        # Lookups keyed by id ({ProductID: image}) hold one row per key; other dicts are a single record.
+        if result and all(isinstance(key, int) for key in result):
+            return len(result)
+    return 1
+
+
+def normalize_sql(sql):
+    sql = " ".join(sql.split())
+    # IN lists built from a variable number of ids are the same statement.
+    return re.sub(r"\?(?:\s*,\s*\?)+", "?, ...", sql)
+
+
+class LatencyStats:
+    """Running totals plus a fixed-size reservoir of latencies for the percentiles."""
+
+    SAMPLE_SIZE = 4096
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.bytes = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+        self._random = random.Random(0)
+
+    def record(self, seconds, rows=0, size=0, error=False):
+        self.calls += 1
+        self.errors += bool(error)
+        self.rows += rows
+        self.bytes += size
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if len(self.samples) < self.SAMPLE_SIZE:
+            self.samples.append(seconds)
+        else:
+            slot = self._random.randrange(self.calls)
+            if slot < self.SAMPLE_SIZE:
+                self.samples[slot] = seconds
+
+    def as_dict(self):
+        ordered = sorted(self.samples)
+
+        def percentile(p):
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total / self.calls * 1000 if self.calls else 0.0,
+            "max_ms": self.max * 1000,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+        }
+
+
+class Metrics:
+    def __init__(self, slow_query_ms=None):
+        self.slow_query_ms = slow_query_ms
+        self.methods = {}
+        self.statements = {}
+        self.slow_queries = 0
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self._lock = threading.Lock()
+
+    def _record(self, table, key, seconds, rows, size, error):
+        with self._lock:
+            stats = table.get(key)
+            if stats is None:
+                stats = table[key] = LatencyStats()
+            stats.record(seconds, rows, size, error)
+
+    def record_method(self, name, seconds, rows=0, size=0, error=False):
+        self._record(self.methods, name, seconds, rows, size, error)
+
+    def record_statement(self, sql, seconds, rows=0, size=0, error=False):
+        self._record(self.statements, normalize_sql(sql), seconds, rows, size, error)
+
+    def is_slow(self, seconds):
+        return self.slow_query_ms is not None and seconds * 1000 >= self.slow_query_ms
+
+    def record_slow(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "started": self.started,
+                "taken": datetime.now().isoformat(timespec="seconds"),
+                "slow_query_ms": self.slow_query_ms,
+                "slow_queries": self.slow_queries,
+                "methods": {name: stats.as_dict() for name, stats in sorted(self.methods.items())},
+                "statements": {sql: stats.as_dict() for sql, stats in sorted(self.statements.items())},
+            }
+
+
+_metrics = None
+_originals = {}
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement to the active Metrics once its results have been read."""
+
+    _sql = None
+
+    def _begin(self, sql, parameters):
+        self._finish()
+        self._sql = sql
+        self._parameters = parameters
+        self._elapsed = 0.0
+        self._rows = 0
+        self._bytes = 0
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception:
+            self._elapsed += time.perf_counter() - start
+            self._finish(error=True)
+            raise
+        self._elapsed += time.perf_counter() - start
+        return result
+
+    def _add(self, rows):
+        self._rows += len(rows)
+        self._bytes += value_size(rows)
+
+    def _finish(self, error=False):
+        if self._sql is None:
+            return
+        sql, self._sql = self._sql, None
+        metrics = _metrics
+        if metrics is None:
+            return
+        if self.description is None and self.rowcount > 0:
+            self._rows = self.rowcount
+        metrics.record_statement(sql, self._elapsed, self._rows, self._bytes, error)
+        # Connection set-up pragmas are not queries worth a slow-query entry.
+        if not error and metrics.is_slow(self._elapsed) and not sql.lstrip().upper().startswith("PRAGMA"):
+            metrics.record_slow()
+            logger.warning("Slow query (%.1f ms, %d rows): %s\n%s", self._elapsed * 1000, self._rows,
+                           " ".join(sql.split()), self._query_plan(sql, self._parameters))
+
+    def _query_plan(self, sql, parameters):
+        if not sql.lstrip().upper().startswith(EXPLAINABLE):
+            return "  (no plan)"
+        try:
+            # A plain cursor, so explaining is not itself measured.
+            plan = sqlite3.Cursor(self.connection).execute("EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+        except sqlite3.Error as e:
+            return f"  (no plan: {e})"
+        return "\n".join(f"  {row[3]}" for row in plan)
+
+    def execute(self, sql, parameters=()):
+        self._begin(sql, parameters)
+        self._timed(super().execute, sql, parameters)
+        if self.description is None:
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        first = seq_of_parameters[0] if isinstance(seq_of_parameters, (list, tuple)) and seq_of_parameters else ()
+        self._begin(sql, first)
+        self._timed(super().executemany, sql, seq_of_parameters)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        else:
+            self._add((row,))
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        if rows:
+            self._add(rows)
+        else:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._add(rows)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        self._add((row,))
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=None):
+        return super().cursor(factory or InstrumentedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _wrap(name, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            if _metrics is not None:
+                _metrics.record_method(name, time.perf_counter() - start, error=True)
+            raise
+        if _metrics is not None:
+            _metrics.record_method(name, time.perf_counter() - start, result_rows(result), value_size(result))
+        return result
+    return wrapper
+
+
+def enable(slow_query_ms=None):
+    """Starts collecting metrics; reopens the Database pool so new connections are instrumented."""
+    global _metrics
+    _metrics = Metrics(slow_query_ms)
+    if not _originals:
+        for name, attr in list(vars(Database).items()):
+            if isinstance(attr, staticmethod) and not name.startswith("_") and name not in UNINSTRUMENTED_METHODS:
+                _originals[name] = attr
+                setattr(Database, name, staticmethod(_wrap(name, attr.__func__)))
+        Database.CONNECTION_FACTORY = InstrumentedConnection
+        Database.close_pool()
+    return _metrics
+
+
+def disable():
+    global _metrics
+    for name, attr in _originals.items():
+        setattr(Database, name, attr)
+    _originals.clear()
+    Database.CONNECTION_FACTORY = sqlite3.Connection
+    Database.close_pool()
+    _metrics = None
+
+
+def metrics():
+    return _metrics
+
+
+def reset():
+    if _metrics is not None:
+        enable(_metrics.slow_query_ms)
+
+
+def snapshot():
+    return _metrics.snapshot() if _metrics is not None else None
+
+
+def export_json(path):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(snapshot(), file, indent=2)
+
+
+def compare(before, after, section="methods", field="p95_ms"):
+    """Rows of (key, before, after, change) for keys in either snapshot, largest slowdown first."""
+    rows = []
+    for key in sorted(set(before[section]) | set(after[section])):
+        old = before[section].get(key, {}).get(field)
+        new = after[section].get(key, {}).get(field)
+        change = (new - old) if old is not None and new is not None else None
+        rows.append((key, old, new, change))
+    return sorted(rows, key=lambda row: -(row[3] or 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two exported Database metrics snapshots.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    diff = sub.add_parser("diff")
+    diff.add_argument("before")
+    diff.add_argument("after")
+    diff.add_argument("--section", choices=("methods", "statements"), default="methods")
+    diff.add_argument("--field", default="p95_ms")
+    args = parser.parse_args()
+
+    with open(args.before, encoding="utf-8") as file:
+        before = json.load(file)
+    with open(args.after, encoding="utf-8") as file:
+        after = json.load(file)
+
+    def show(value):
+        return f"{value:10.2f}" if value is not None else f"{'-':>10}"
+
+    print(f"{'':60} {'before':>10} {'after':>10} {'change':>10}   ({args.field})")
+    for key, old, new, change in compare(before, after, args.section, args.field):
+        print(f"{key[:60]:60} {show(old)} {show(new)} {show(change)}")
+
+
+if __name__ == "__main__":
+    main()
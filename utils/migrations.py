@@ -0,0 +1,89 @@
+"""Versioned schema migrations for the autodatabase.
+
+Each migration runs once, in order, inside its own write transaction, and is recorded in the
+SchemaVersion table. Migrations must be safe to apply to a database that already has some of their
+objects (every DDL statement uses IF NOT EXISTS), because databases created before the version table
+existed had the early steps applied unversioned.
+"""
+from utils.schema import (
+    ensure_product_search,
+    ensure_image_version,
+    ensure_product_thumbnails,
+    ensure_sort_indexes,
+    ensure_covering_indexes,
+    drop_customer_order_stock_trigger,
+    ensure_reference_data_version,
+    ensure_change_tracking,
+    guard_product_image_triggers,
+    ensure_full_change_tracking,
+)
+
+
+MIGRATIONS = [
+    (1, "Product search index", ensure_product_search),
+    (2, "Product image versions", ensure_image_version),
+    (3, "Product thumbnails", ensure_product_thumbnails),
+    (4, "Sort indexes for paginated listings", ensure_sort_indexes),
+    (5, "Covering indexes for joins and filters", ensure_covering_indexes),
+    (6, "Drop per-row CustomerOrders stock trigger", drop_customer_order_stock_trigger),
+    (7, "Reference data version counter", ensure_reference_data_version),
+    (8, "Change log for delta exports", ensure_change_tracking),
+    (9, "Skip product image triggers when the image is unchanged", guard_product_image_triggers),
+    (10, "Change log for every table", ensure_full_change_tracking),
+]
+
+
+SCHEMA_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS SchemaVersion (
+        Version INTEGER PRIMARY KEY,
+        Name TEXT NOT NULL,
+        AppliedAt TEXT NOT NULL DEFAULT (DATETIME('now'))
+    )
+"""
+
+
+def current_version(cursor):
+    cursor.execute(SCHEMA_VERSION_DDL)
+    cursor.execute("SELECT COALESCE(MAX(Version), 0) FROM SchemaVersion")
+    return cursor.fetchone()[0]
+
+
+def latest_version():
+    return MIGRATIONS[-1][0]
+
+
+def migrate(conn, target=None):
+    """Applies pending migrations up to target (default: all) and returns the versions applied."""
+    target = latest_version() if target is None else target
+    cursor = conn.cursor()
+    applied = []
+    if current_version(cursor) >= target:
+        return applied
+    for version, name, apply in MIGRATIONS:
+        if version > target:
+            break
+        # Take the write lock before re-checking, so two processes starting together apply each step once.
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if version <= current_version(cursor):
+                conn.rollback()
+                continue
+            apply(cursor)
+            cursor.execute("INSERT INTO SchemaVersion (Version, Name) VALUES (?, ?)", (version, name))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+
+if __name__ == "__main__":
+    from utils.database import Database
+
+    # Database.pool() migrates the database as it opens it.
+    conn = Database.connect()
+    try:
+        print(f"{Database.DB_PATH}: schema version {current_version(conn.cursor())} (latest {latest_version()})")
+    finally:
+        conn.close()
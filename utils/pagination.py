@@ -0,0 +1,77 @@
+import base64
+import json
+
+
+def encode_token(sort_spec, values):
+    payload = json.dumps({"s": sort_spec, "k": list(values)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_token(token, sort_spec):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid page token.")
+    if payload.get("s") != sort_spec:
+        raise ValueError("Page token was issued for a different sort order.")
+    return payload["k"]
+
+
+def resolve_sort(sort_by, sortable, key_columns):
+    """Turns ["-Price", "ProductName"] into [(expression, descending), ...] ending with the unique key.
+
+    sortable maps the public column names to SQL expressions; key_columns are the names that make
+    a row unique and are appended as tie-breakers so every page boundary is well defined.
+    """
+    sort_by = list(sort_by or [])
+    names = [name.lstrip("-") for name in sort_by]
+    for name in names:
+        if name not in sortable:
+            raise ValueError(f"Cannot sort by {name}.")
+    descending_default = sort_by[0].startswith("-") if sort_by else False
+    for key in key_columns:
+        if key not in names:
+            sort_by.append(f"-{key}" if descending_default else key)
+    return sort_by, [(sortable[name.lstrip("-")], name.startswith("-")) for name in sort_by]
+
+
+def keyset_predicate(order, values):
+    """Builds the WHERE clause that selects rows strictly after values in the given order."""
+    clauses = []
+    params = []
+    for i, (expression, descending) in enumerate(order):
+        parts = [f"{expr} = ?" for expr, _ in order[:i]]
+        parts.append(f"{expression} {'<' if descending else '>'} ?")
+        clauses.append("(" + " AND ".join(parts) + ")")
+        params.extend(values[:i + 1])
+    return "(" + " OR ".join(clauses) + ")", params
+
+
+def fetch_keyset_page(cursor, select, from_where, params, sort_by, sortable, key_columns, page_size, token=None):
+    """Runs one page of select + from_where ordered by sort_by and returns (rows, next_token).
+
+    from_where must contain a WHERE clause (use "WHERE 1=1" when there is nothing to filter on).
+    next_token is None once the last page has been returned.
+    """
+    sort_spec, order = resolve_sort(sort_by, sortable, key_columns)
+    params = list(params)
+    if token:
+        values = decode_token(token, sort_spec)
+        predicate, predicate_params = keyset_predicate(order, values)
+        from_where += " AND " + predicate
+        params += predicate_params
+
+    key_select = ", ".join(expression for expression, _ in order)
+    order_by = ", ".join(f"{expression} {'DESC' if descending else 'ASC'}" for expression, descending in order)
+    cursor.execute(
+        f"{select}, {key_select} {from_where} ORDER BY {order_by} LIMIT ?",
+        params + [page_size + 1],
+    )
+    rows = cursor.fetchall()
+
+    width = len(order)
+    next_token = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_token = encode_token(sort_spec, rows[-1][-width:])
+    return [row[:-width] for row in rows], next_token
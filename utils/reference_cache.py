@@ -0,0 +1,96 @@
+import threading
+
+
+class ReferenceCache:
+    """Read-through cache for the small lookup tables (categories, branches, suppliers, job roles).
+
+    Every lookup first checks PRAGMA data_version on the cache's own connection, which only changes
+    when some other connection has committed. Only then is ReferenceDataVersion read; triggers bump
+    it on any insert, update or delete in the cached tables, so unrelated commits (orders, stock)
+    do not throw the cache away.
+    """
+
+    QUERIES = {
+        "categories": "SELECT CategoryID, CategoryName FROM Categories ORDER BY rowid",
+        "branches": "SELECT BranchID, Location FROM Branches ORDER BY rowid",
+        "suppliers": "SELECT SupplierID, SupplierName FROM Suppliers ORDER BY rowid",
+        "job_roles": "SELECT JobRoleID, RoleName FROM JobRoles ORDER BY rowid",
+    }
+
+    def __init__(self, open_connection):
+        self.open_connection = open_connection
+        self._conn = None
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._version = None
+        self._tables = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check(self):
+        if self._conn is None:
+            self._conn = self.open_connection()
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+        version = self._conn.execute("SELECT Version FROM ReferenceDataVersion").fetchone()[0]
+        if version != self._version:
+            if self._tables:
+                self.invalidations += 1
+            self._tables.clear()
+            self._version = version
+
+    def table(self, name):
+        """Returns (rows, by_id, by_label) for one of QUERIES; by_label keeps the first row for a label."""
+        with self._lock:
+            self._check()
+            entry = self._tables.get(name)
+            if entry is not None:
+                self.hits += 1
+                return entry
+
+            self.misses += 1
+            rows = self._conn.execute(self.QUERIES[name]).fetchall()
+            by_label = {}
+            for key, label in rows:
+                by_label.setdefault(label, key)
+            entry = self._tables[name] = (rows, dict(rows), by_label)
+            return entry
+
+    def rows(self, name):
+        return list(self.table(name)[0])
+
+    def label(self, name, key):
+        return self.table(name)[1].get(key)
+
+    def key(self, name, label):
+        return self.table(name)[2].get(label)
+
+    def invalidate(self):
+        with self._lock:
+            if self._tables:
+                self.invalidations += 1
+            self._tables.clear()
+            self._data_version = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "cached_tables": sorted(self._tables),
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._tables.clear()
+            self._data_version = None
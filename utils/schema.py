@@ -0,0 +1,309 @@
+PRODUCT_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS ProductSearch USING fts5(
+        ProductName,
+        CategoryName,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ProductSearchAfterInsert
+    AFTER INSERT ON Products
+    BEGIN
+        INSERT INTO ProductSearch (rowid, ProductName, CategoryName)
+        VALUES (NEW.ProductID, NEW.ProductName,
+                (SELECT CategoryName FROM Categories WHERE CategoryID = NEW.CategoryID));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ProductSearchAfterDelete
+    AFTER DELETE ON Products
+    BEGIN
+        DELETE FROM ProductSearch WHERE rowid = OLD.ProductID;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ProductSearchAfterUpdate
+    AFTER UPDATE OF ProductID, ProductName, CategoryID ON Products
+    BEGIN
+        DELETE FROM ProductSearch WHERE rowid = OLD.ProductID;
+        INSERT INTO ProductSearch (rowid, ProductName, CategoryName)
+        VALUES (NEW.ProductID, NEW.ProductName,
+                (SELECT CategoryName FROM Categories WHERE CategoryID = NEW.CategoryID));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ProductSearchAfterCategoryRename
+    AFTER UPDATE OF CategoryName ON Categories
+    BEGIN
+        UPDATE ProductSearch SET CategoryName = NEW.CategoryName
+        WHERE rowid IN (SELECT ProductID FROM Products WHERE CategoryID = NEW.CategoryID);
+    END
+    """,
+]
+
+
+IMAGE_VERSION_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS ProductImageVersionAfterInsert
+    AFTER INSERT ON Products
+    WHEN NEW.ProductImage IS NOT NULL
+    BEGIN
+        UPDATE Products SET ImageVersion = 1 WHERE ProductID = NEW.ProductID;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ProductImageVersionAfterUpdate
+    AFTER UPDATE OF ProductImage ON Products
+    WHEN OLD.ProductImage IS NOT NEW.ProductImage
+    BEGIN
+        UPDATE Products
+        SET ImageVersion = CASE WHEN NEW.ProductImage IS NULL THEN NULL ELSE COALESCE(OLD.ImageVersion, 0) + 1 END
+        WHERE ProductID = NEW.ProductID;
+    END
+    """,
+]
+
+
+PRODUCT_THUMBNAILS_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS ProductThumbnails (
+        ProductID INTEGER PRIMARY KEY,
+        ImageVersion INTEGER NOT NULL,
+        Thumbnail BLOB NOT NULL,
+        FOREIGN KEY (ProductID) REFERENCES Products(ProductID) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ProductThumbnailsInvalidate
+    AFTER UPDATE OF ProductImage ON Products
+    WHEN OLD.ProductImage IS NOT NEW.ProductImage
+    BEGIN
+        DELETE FROM ProductThumbnails WHERE ProductID = NEW.ProductID;
+    END
+    """,
+]
+
+
+SORT_INDEXES_DDL = [
+    "CREATE INDEX IF NOT EXISTS idx_products_name ON Products(ProductName)",
+    "CREATE INDEX IF NOT EXISTS idx_products_price ON Products(Price)",
+    "CREATE INDEX IF NOT EXISTS idx_customers_surname ON Customers(Surname, FirstName)",
+    "CREATE INDEX IF NOT EXISTS idx_employees_surname ON Employees(Surname, FirstName)",
+    "CREATE INDEX IF NOT EXISTS idx_branchorders_date ON BranchOrders(OrderDate)",
+]
+
+
+COVERING_INDEXES_DDL = [
+    # Supplier catalogue: SupplierID lookup that also yields the ProductID to join on.
+    "CREATE INDEX IF NOT EXISTS idx_supplierproducts_supplier ON SupplierProducts(SupplierID, ProductID)",
+    # Stock for a product across branches (search results, FK cascades from Products).
+    "CREATE INDEX IF NOT EXISTS idx_branchstock_product ON BranchStock(ProductID, BranchID, StockQuantity)",
+    # Past orders and the purchase-history views, newest first per customer.
+    "CREATE INDEX IF NOT EXISTS idx_orders_customer_date ON Orders(CustomerID, OrderDate)",
+    "CREATE INDEX IF NOT EXISTS idx_customerorders_product ON CustomerOrders(ProductID)",
+    # Category and price filters on the product listings.
+    "CREATE INDEX IF NOT EXISTS idx_products_category_price ON Products(CategoryID, Price)",
+    "CREATE INDEX IF NOT EXISTS idx_branchorders_branch_product ON BranchOrders(BranchID, ProductID)",
+    # Branch lookup by location name at sign-up.
+    "CREATE INDEX IF NOT EXISTS idx_branches_location ON Branches(Location)",
+]
+
+
+def _table_exists(cursor, name):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+def ensure_product_search(cursor):
+    created = not _table_exists(cursor, "ProductSearch")
+    for statement in PRODUCT_SEARCH_DDL:
+        cursor.execute(statement)
+    if created:
+        cursor.execute("""
+            INSERT INTO ProductSearch (rowid, ProductName, CategoryName)
+            SELECT p.ProductID, p.ProductName, c.CategoryName
+            FROM Products p
+            LEFT JOIN Categories c ON c.CategoryID = p.CategoryID
+        """)
+        # Matches on the product name outrank matches on its category.
+        cursor.execute("INSERT INTO ProductSearch (ProductSearch, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+
+
+def _column_exists(cursor, table, column):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
+
+
+def ensure_image_version(cursor):
+    # Listing queries read ImageVersion instead of the ProductImage BLOB; it changes whenever the image does.
+    if not _column_exists(cursor, "Products", "ImageVersion"):
+        cursor.execute("ALTER TABLE Products ADD COLUMN ImageVersion INTEGER")
+        cursor.execute("UPDATE Products SET ImageVersion = 1 WHERE ProductImage IS NOT NULL")
+    for statement in IMAGE_VERSION_DDL:
+        cursor.execute(statement)
+
+
+def ensure_product_thumbnails(cursor):
+    for statement in PRODUCT_THUMBNAILS_DDL:
+        cursor.execute(statement)
+
+
+def ensure_sort_indexes(cursor):
+    # Back the sort orders offered by the keyset-paginated fetch_*_page methods.
+    for statement in SORT_INDEXES_DDL:
+        cursor.execute(statement)
+
+
+def ensure_covering_indexes(cursor):
+    for statement in COVERING_INDEXES_DDL:
+        cursor.execute(statement)
+
+
+def drop_customer_order_stock_trigger(cursor):
+    # Checkout validates stock for the whole order in one statement (Database.checkout); the
+    # per-row trigger re-ran nested lookups for every line and resolved the branch incorrectly
+    # (Orders has no BranchID, so it matched any branch's stock row).
+    cursor.execute("DROP TRIGGER IF EXISTS BeforeInsertCustomerOrder")
+
+
+REFERENCE_TABLES = ("Categories", "Branches", "Suppliers", "JobRoles")
+
+REFERENCE_DATA_VERSION_DDL = [
+    "CREATE TABLE IF NOT EXISTS ReferenceDataVersion (ID INTEGER PRIMARY KEY CHECK (ID = 1), Version INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO ReferenceDataVersion (ID, Version) VALUES (1, 0)",
+] + [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {table}ReferenceVersionAfter{event.capitalize()}
+    AFTER {event} ON {table}
+    BEGIN
+        UPDATE ReferenceDataVersion SET Version = Version + 1 WHERE ID = 1;
+    END
+    """
+    for table in REFERENCE_TABLES
+    for event in ("INSERT", "UPDATE", "DELETE")
+]
+
+
+def ensure_reference_data_version(cursor):
+    # Lets the in-process reference cache notice changes to the lookup tables, whoever makes them.
+    for statement in REFERENCE_DATA_VERSION_DDL:
+        cursor.execute(statement)
+
+
+# Tables whose changes are logged for delta exports, with their primary key columns (at most two).
+# Parents come before the tables whose foreign keys refer to them: deltas are applied in this order.
+CHANGE_TRACKED_TABLES = {
+    "MembershipLevels": ("MembershipLevelID",),
+    "Branches": ("BranchID",),
+    "JobRoles": ("JobRoleID",),
+    "Categories": ("CategoryID",),
+    "Suppliers": ("SupplierID",),
+    "Products": ("ProductID",),
+    "Customers": ("CustomerID",),
+    "Employees": ("EmployeeID",),
+    "Orders": ("OrderID",),
+    "CustomerOrders": ("OrderID", "ProductID"),
+    "BranchStock": ("BranchID", "ProductID"),
+    "BranchOrders": ("OrderID",),
+    "SupplierProducts": ("SupplierProductID",),
+}
+
+
+def _change_log_statements(table, row, operation):
+    """Trigger body that makes the key of row (NEW or OLD) the table's latest change, as operation."""
+    keys = [f"{row}.{column}" for column in CHANGE_TRACKED_TABLES[table]]
+    key2 = keys[1] if len(keys) > 1 else "NULL"
+    return f"""
+        DELETE FROM ChangeLog WHERE TableName = '{table}' AND Key1 = {keys[0]} AND Key2 IS {key2};
+        INSERT INTO ChangeLog (TableName, Key1, Key2, Operation) VALUES ('{table}', {keys[0]}, {key2}, '{operation}');
+    """
+
+
+def _key_changed(table):
+    return " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in CHANGE_TRACKED_TABLES[table])
+
+
+CHANGE_TRACKING_DDL = [
+    # One row per changed key, holding its latest change: a key changed again is moved to the end
+    # with a new Sequence, so the log never holds more than one row per row of the tracked tables.
+    # AUTOINCREMENT keeps sequences increasing even after the newest entries have been deleted.
+    """
+    CREATE TABLE IF NOT EXISTS ChangeLog (
+        Sequence INTEGER PRIMARY KEY AUTOINCREMENT,
+        TableName TEXT NOT NULL,
+        Key1 NOT NULL,
+        Key2,
+        Operation TEXT NOT NULL CHECK (Operation IN ('I', 'U', 'D'))
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_changelog_key ON ChangeLog(TableName, Key1, Key2)",
+    "CREATE INDEX IF NOT EXISTS idx_changelog_table_sequence ON ChangeLog(TableName, Sequence)",
+    # The sequence each delta consumer has applied; the log is compacted up to the lowest of them.
+    """
+    CREATE TABLE IF NOT EXISTS ChangeConsumers (
+        Name TEXT PRIMARY KEY,
+        Watermark INTEGER NOT NULL
+    )
+    """,
+    "CREATE TABLE IF NOT EXISTS ChangeLogState (ID INTEGER PRIMARY KEY CHECK (ID = 1), CompactedThrough INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO ChangeLogState (ID, CompactedThrough) VALUES (1, 0)",
+] + [
+    statement
+    for table in CHANGE_TRACKED_TABLES
+    for statement in (
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}ChangeLogAfterInsert
+        AFTER INSERT ON {table}
+        BEGIN {_change_log_statements(table, "NEW", "I")} END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}ChangeLogAfterUpdate
+        AFTER UPDATE ON {table}
+        BEGIN {_change_log_statements(table, "NEW", "U")} END
+        """,
+        # An update that changes the primary key also removes the row under its old key.
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}ChangeLogAfterKeyUpdate
+        AFTER UPDATE ON {table}
+        WHEN {_key_changed(table)}
+        BEGIN {_change_log_statements(table, "OLD", "D")} END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}ChangeLogAfterDelete
+        AFTER DELETE ON {table}
+        BEGIN {_change_log_statements(table, "OLD", "D")} END
+        """,
+    )
+]
+
+
+def ensure_change_tracking(cursor):
+    # Rows already in the tables are not logged: a delta consumer starts from a full export and the
+    # change sequence it was taken at (see custom_xml_utils.delta).
+    for statement in CHANGE_TRACKING_DDL:
+        cursor.execute(statement)
+
+
+def ensure_full_change_tracking(cursor):
+    # Migration 8 only tracked Products, BranchStock and Orders, so a delta could hold an order whose
+    # new customer it did not carry. CREATE ... IF NOT EXISTS adds the triggers of the other tables.
+    ensure_change_tracking(cursor)
+
+
+def change_sequence(cursor):
+    """The sequence of the latest logged change, 0 if nothing has been logged yet."""
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'ChangeLog'")
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def guard_product_image_triggers(cursor):
+    # Saving a product with the image it already has must not count as a new image or throw away
+    # its thumbnail. Databases migrated before the WHEN clauses were added still have the unguarded
+    # triggers, so recreate them.
+    cursor.execute("DROP TRIGGER IF EXISTS ProductImageVersionAfterUpdate")
+    cursor.execute(IMAGE_VERSION_DDL[1])
+    cursor.execute("DROP TRIGGER IF EXISTS ProductThumbnailsInvalidate")
+    cursor.execute(PRODUCT_THUMBNAILS_DDL[1])
@@ -0,0 +1,133 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+
+class WriteQueue:
+    """Serialises writes onto one dedicated connection and commits them in groups."""
+
+    def __init__(self, open_connection, max_batch=64):
+        self.open_connection = open_connection
+        self.max_batch = max_batch
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopped = False
+
+        self.batches = 0
+        self.jobs_run = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            # Also restarts a writer that died, so queued jobs are never left waiting on a dead thread.
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, fn, *args):
+        if self._stopped:
+            raise RuntimeError("Write queue has been stopped.")
+        future = Future()
+        if threading.current_thread() is self._thread:
+            # Nested write from inside a job: it already runs in the open transaction.
+            future.set_result(fn(self._cursor, *args))
+            return future
+        self._ensure_started()
+        self._jobs.put((future, fn, args))
+        return future
+
+    def execute(self, fn, *args):
+        return self.submit(fn, *args).result()
+
+    def stop(self):
+        self._stopped = True
+        if self._thread is not None:
+            self._jobs.put(None)
+            self._thread.join()
+
+    def _next_batch(self):
+        first = self._jobs.get()
+        if first is None:
+            return None
+        batch = [first]
+        while len(batch) < self.max_batch:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                self._jobs.put(None)
+                break
+            batch.append(job)
+        return batch
+
+    def _open(self):
+        conn = self.open_connection()
+        conn.isolation_level = None
+        self._cursor = conn.cursor()
+        return conn
+
+    def _run(self):
+        conn = None
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+                try:
+                    if conn is None:
+                        conn = self._open()
+                    self._run_batch(batch)
+                except Exception as e:
+                    # The transaction is in an unknown state (a job ended it itself, or the connection
+                    # failed): fail whatever is not resolved yet and start the next batch on a fresh connection.
+                    for future, _, _ in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    if conn is not None:
+                        try:
+                            conn.close()
+                        except Exception:
+                            pass
+                        conn = None
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _run_batch(self, batch):
+        cursor = self._cursor
+        outcomes = []
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+        except Exception as e:
+            for future, _, _ in batch:
+                future.set_exception(e)
+            return
+
+        for future, fn, args in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            cursor.execute("SAVEPOINT job")
+            try:
+                result = fn(cursor, *args)
+                cursor.execute("RELEASE job")
+                outcomes.append((future, result, None))
+            except Exception as e:
+                cursor.execute("ROLLBACK TO job")
+                cursor.execute("RELEASE job")
+                outcomes.append((future, None, e))
+
+        try:
+            cursor.execute("COMMIT")
+        except Exception as e:
+            if self._cursor.connection.in_transaction:
+                cursor.execute("ROLLBACK")
+            outcomes = [(future, None, error or e) for future, _, error in outcomes]
+
+        self.batches += 1
+        self.jobs_run += len(outcomes)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)